@@ -1,10 +1,20 @@
 import json, os
+import numpy as np
 import tensorflow as tf
 from gym.spaces import Discrete, Box
 
-from utils import phis
+from utils import phis, np_capacities
+from utils.budget import BudgetEnv
+from utils.stop_conditions import get_stop_conditions
+from utils.profiler import Profiler
+from utils.tracer import EpisodeTracer, parse_episodes
+from utils.checkpointer import AsyncCheckpointer, get_latest_checkpoint, load_checkpoint
+from utils.replay_memory import get_index_dtype
 
 class BasicAgent(object):
+    # Whether the background checkpoints store the rows changed since the previous one
+    delta_checkpoints = False
+
     def __init__(self, config, env):
         if not 'best' in config:
             config['best'] = False
@@ -12,6 +22,10 @@ class BasicAgent(object):
             config['debug'] = False
         if not 'max_iter' in config:
             config['max_iter'] = 1
+        if not 'max_steps' in config:
+            config['max_steps'] = 0
+        if not 'max_seconds' in config:
+            config['max_seconds'] = 0
         if config['best']:
             config.update(self.get_best_config(config['env_name']))
 
@@ -23,6 +37,8 @@ class BasicAgent(object):
         self.random_seed = config['random_seed']
         self.result_dir = config['result_dir']
         self.max_iter = config['max_iter']
+        self.max_steps = config['max_steps']
+        self.max_seconds = config['max_seconds']
 
         self.env = env
         if 'nb_state' in config:
@@ -36,12 +52,24 @@ class BasicAgent(object):
             raise Exception('Action space {} incompatible with {}. (Only supports Discrete action spaces.)'.format(action_space, self))
         self.action_space = env.action_space
 
+        # Minibatches sampled in the background by the ER agents, see utils/prefetcher.py
+        self.prefetcher = None
+
         # Set custom properties of the agent
         self.set_agent_props()
 
         # Play part
         self.play_counter = 0
 
+        # Why the last training stopped
+        self.stop_reason = None
+
+        # Acting on the host, the acting network is mirrored in NumPy every host_sync_every learner updates
+        self.host_sync_every = config.get('host_sync_every', 0)
+        self.host_nb_updates = 0
+        self.host_weights = None
+        self.host_random = np.random.RandomState(self.random_seed % 2**32)
+
         # Graph part
         self.graph = self.build_graph(tf.Graph())
 
@@ -51,16 +79,51 @@ class BasicAgent(object):
                 max_to_keep=50,
             )
             self.init_op = tf.global_variables_initializer()
+        # The periodic checkpoints of the training are written in the background, the writer
+        # thread is started by the first one
+        self.checkpoint_dir = self.result_dir + '/checkpoints'
+        self.checkpoint_async = config.get('checkpoint_async', False)
+        self.checkpointer = None
 
         gpu_options = tf.GPUOptions(allow_growth=True)
-        sessConfig = tf.ConfigProto(gpu_options=gpu_options)
+        # 0 lets TensorFlow use every core, the processes training in parallel take one each
+        session_threads = config.get('session_threads', 0)
+        sessConfig = tf.ConfigProto(gpu_options=gpu_options, intra_op_parallelism_threads=session_threads, inter_op_parallelism_threads=session_threads)
         self.sess = tf.Session(config=sessConfig, graph=self.graph)
         self.sw = tf.summary.FileWriter(self.result_dir, self.sess.graph)
         self.init()
+        if self.host_sync_every > 0:
+            self.sync_host(reset=True)
+
+        # Profiling part
+        self.profiler = None
+        self.profile_report = None
+        if config.get('profile', False):
+            self.set_profiler(Profiler())
+        self.trace_episodes = parse_episodes(config.get('trace_episodes', ''))
+        self.tracer = EpisodeTracer(self.sess, self.result_dir + '/traces') if len(self.trace_episodes) > 0 else None
 
     def set_agent_props(self):
         pass
 
+    def set_profiler(self, profiler):
+        # Phases are timed by wrapping the methods of this instance, every agent
+        # is profiled without any change to its learn_from_episode
+        self.profiler = profiler
+        self.act = profiler.wrap('act', self.act)
+        if hasattr(self, 'phi'):
+            self.phi = profiler.wrap('phi', self.phi)
+        self.save = profiler.wrap('save', self.save)
+        self.save_async = profiler.wrap('save', self.save_async)
+        self.sw.add_summary = profiler.wrap('summary', self.sw.add_summary)
+        # The session runs of the summaries and of the fixed network updates are not learning updates
+        fetch_phases = []
+        if hasattr(self, 'all_summary_t'):
+            fetch_phases.append((self.all_summary_t, 'summary'))
+        if hasattr(self, 'update_fixed_vars_op'):
+            fetch_phases.append((self.update_fixed_vars_op, 'fixed_net_update'))
+        self.sess.run = profiler.wrap_run(self.sess.run, fetch_phases)
+
     def get_best_config(self, env_name=""):
         return {}
 
@@ -71,26 +134,191 @@ class BasicAgent(object):
     def build_graph(self, graph):
         raise Exception('The build_graph function must be overrided by the agent')
 
+    def get_host_scope(self):
+        raise Exception('The agent {} does not support acting on the host'.format(self))
+
+    def get_network_variable_names(self, scope):
+        # Names of the W1..W3, b1..b3 variables of a value_f or policy network
+        return [ scope + '/' + name + ':0' for name in np_capacities.network_variables ]
+
+    def get_network_weights(self, scope):
+        # Values of the W1..W3, b1..b3 variables of a value_f or policy network
+        names = self.get_network_variable_names(scope)
+        with self.graph.as_default():
+            variables = { var.name: var for var in tf.global_variables() }
+        values = self.sess.run([ variables[name] for name in names ])
+
+        return dict(zip(np_capacities.network_variables, values))
+
+    def sync_host(self, reset=False):
+        # Copies the acting network in NumPy arrays
+        self.host_weights = self.get_network_weights(self.get_host_scope())
+
+    def flush_host(self):
+        # Writes back in the graph the state owned by the host while acting on it
+        pass
+
+    def learner_updated(self):
+        # Called by the agents after each learning update
+        if self.profiler is not None:
+            self.profiler.count_update()
+        if self.host_sync_every <= 0:
+            return
+
+        self.host_nb_updates += 1
+        if self.host_nb_updates >= self.host_sync_every:
+            self.host_nb_updates = 0
+            self.sync_host()
+
     def act(self, obs, eps=None):
         raise Exception('The act function must be overrided by the agent')
 
     def learn_from_episode(self, env):
         raise Exception('The learn_from_episode function must be overrided by the agent')
 
-    def train(self, render=False, save_every=49):
-        for episode_id in range(0, self.max_iter):
-            self.learn_from_episode(self.env, render)
+    def train(self, render=False, save_every=49, stop_conditions=[]):
+        # Training stops after max_iter episodes, exactly when the step/time budget is exhausted
+        # or as soon as one of the stop conditions is met
+        env = BudgetEnv(self.env, self.max_steps, self.max_seconds)
+        stop_conditions = get_stop_conditions(self.config) + list(stop_conditions)
+        if self.profiler is not None:
+            self.profiler.reset()
+            env.reset = self.profiler.wrap('env_reset', env.reset)
+            env.step = self.profiler.wrap('env_step', env.step)
+
+        scores = []
+        self.stop_reason = 'max_iter'
+        episode_id = 0
+        while episode_id < self.max_iter:
+            if env.exhausted():
+                self.stop_reason = 'budget'
+                break
+
+            tracing = self.tracer is not None and episode_id in self.trace_episodes
+            if tracing:
+                self.tracer.start()
+            try:
+                score = self.learn_from_episode(env, render)
+            finally:
+                if tracing:
+                    self.tracer.stop(episode_id)
+            # The score of an episode cut by the budget is only kept if no other episode was completed
+            if not env.truncated or len(scores) == 0:
+                scores.append(score)
+
+            self.save_periodically(episode_id, scores, save_every)
+            episode_id += 1
+
+            if not env.truncated:
+                stopped = [ condition.name for condition in stop_conditions if condition.update(score) ]
+                if len(stopped) > 0:
+                    self.stop_reason = stopped[0]
+                    break
+
+        if self.checkpointer is not None:
+            self.checkpointer.flush()
+        if self.prefetcher is not None:
+            self.prefetcher.close()
+        if self.profiler is not None:
+            self.write_profile(episode_id, env.total_steps)
+
+        if self.config['debug']:
+            print('Training stopped after %d episodes (%s)' % (episode_id, self.stop_reason))
+
+        return scores
+
+    def close(self):
+        # The background threads hold a reference on the agent, they must be stopped to release its graph
+        if self.prefetcher is not None:
+            self.prefetcher.close()
+        if self.checkpointer is not None:
+            self.checkpointer.close()
+            self.checkpointer = None
+        self.sw.close()
+        self.sess.close()
 
-            if save_every > 0 and episode_id % save_every == 0:
+    def save_periodically(self, episode_id, scores, save_every):
+        if save_every > 0 and episode_id % save_every == 0:
+            if self.checkpoint_async:
+                self.save_async(np.mean(scores[-save_every:]))
+            else:
                 self.save()
 
+    def write_profile(self, nb_episodes, nb_steps):
+        self.profile_report = self.profiler.report(nb_episodes, nb_steps)
+
+        values = [
+            tf.Summary.Value(tag='profile/episodes_per_sec', simple_value=self.profile_report['episodes_per_sec'])
+            , tf.Summary.Value(tag='profile/steps_per_sec', simple_value=self.profile_report['steps_per_sec'])
+            , tf.Summary.Value(tag='profile/updates_per_sec', simple_value=self.profile_report['updates_per_sec'])
+        ]
+        for name, phase in self.profile_report['phases'].items():
+            values.append(tf.Summary.Value(tag='profile/' + name + '_seconds', simple_value=phase['seconds']))
+        self.sw.add_summary(tf.Summary(value=values), self.sess.run(self.episode_id))
+
+        with open(self.result_dir + '/profile.json', 'w') as f:
+            json.dump(self.profile_report, f)
+
+    def get_weights(self):
+        if self.host_sync_every > 0:
+            self.flush_host()
+        with self.graph.as_default():
+            variables = tf.global_variables()
+        values = self.sess.run(variables)
+
+        return { var.name: value for var, value in zip(variables, values) }
+
+    def set_weights(self, weights):
+        # Only variables with a matching name and shape are loaded, this allows
+        # to transfer weights between agents built with different hyperparameters
+        with self.graph.as_default():
+            for var in tf.global_variables():
+                if var.name in weights and tuple(var.get_shape().as_list()) == weights[var.name].shape:
+                    var.load(weights[var.name], self.sess)
+        if self.host_sync_every > 0:
+            self.sync_host(reset=True)
+
+    def get_export(self):
+        raise Exception('The agent {} can not be exported'.format(self))
+
+    def export(self, path):
+        # Only what is needed to act is exported, see utils/np_runtime.py
+        arrays = self.get_export()
+        arrays['agent_name'] = np.array(self.__class__.__name__)
+        arrays['env_name'] = np.array(self.config['env_name'])
+        np.savez_compressed(path, **arrays)
+
     def save(self):
+        if self.host_sync_every > 0:
+            self.flush_host()
         global_step_t = tf.train.get_global_step(self.graph)
         global_step, episode_id = self.sess.run([global_step_t, self.episode_id])
         if self.config['debug']:
             print('Saving to %s with global_step %d' % (self.result_dir, global_step))
         self.saver.save(self.sess, self.result_dir + '/agent-ep_' + str(episode_id), global_step)
 
+        self.save_config()
+
+    def get_checkpointer(self):
+        if self.checkpointer is None:
+            self.checkpointer = AsyncCheckpointer(
+                self.checkpoint_dir
+                , keep_last=self.config.get('checkpoint_keep_last', 5)
+                , keep_best=self.config.get('checkpoint_keep_best', 1)
+                , fsync=self.config.get('checkpoint_fsync', True)
+                , full_every=self.config.get('checkpoint_full_every', 10) if self.delta_checkpoints else 1
+            )
+
+        return self.checkpointer
+
+    def save_async(self, score=None):
+        # Only the snapshot of the variables is taken in the training loop
+        weights = self.get_weights()
+        global_step_t = tf.train.get_global_step(self.graph)
+        self.get_checkpointer().save(weights, weights[self.episode_id.name], weights[global_step_t.name], score)
+        self.save_config()
+
+    def save_config(self):
         if not os.path.isfile(self.result_dir + '/config.json'):
             config = self.config
             if 'phi' in config:
@@ -108,6 +336,13 @@ class BasicAgent(object):
                 print('Loading the model from folder: %s' % self.result_dir)
             self.saver.restore(self.sess, checkpoint.model_checkpoint_path)
 
+        # A background checkpoint more recent than the saver one is loaded on top of it
+        async_checkpoint = get_latest_checkpoint(self.checkpoint_dir)
+        if async_checkpoint is not None and async_checkpoint['episode_id'] > self.sess.run(self.episode_id):
+            if self.config['debug']:
+                print('Loading the checkpoint %s' % async_checkpoint['filename'])
+            self.set_weights(load_checkpoint(self.checkpoint_dir, async_checkpoint))
+
     def play(self, env, render=True):
         obs = env.reset()
         score = 0
@@ -136,9 +371,23 @@ class TabularBasicAgent(BasicAgent):
     """
     Agent implementing tabular Q-learning.
     """
+    # Between two checkpoints, only the rows of the visited states change in the tables
+    delta_checkpoints = True
+
     def __init__(self, config, env):
         if 'debug' in config:
             config.update(phis.getPhiConfig(config['env_name'], config['debug']))
         else:
             config.update(phis.getPhiConfig(config['env_name']))
+        # Smallest dtypes of the state ids and actions stored in the replay memories and episode histories,
+        # they are cast to int32 when fed to the graph
+        self.state_dtype = get_index_dtype(config['nb_state'])
+        self.action_dtype = get_index_dtype(env.action_space.n)
         super(TabularBasicAgent, self).__init__(config, env)
+
+    def get_export(self):
+        return {
+            'kind': np.array('tabular')
+            , 'Qs': self.sess.run(self.Qs)
+            , 'debug': np.array(self.config['debug'])
+        }
@@ -14,8 +14,12 @@ def eps_greedy(inputs_t, q_preds_t, nb_actions, N0, min_eps, nb_state=None):
 
     if nb_state == None:
         N = tf.Variable(1., trainable=False, dtype=tf.float32, name='N')
+        # Exposed to the agents mirroring the exploration on the host
+        tf.add_to_collection('eps_greedy_counters', N)
         eps = tf.maximum(N0_t / (N0_t + N), min_eps_t, name="eps")
-        update_N = tf.assign(N, N + 1)
+        # eps is read before the update, as on the host
+        with tf.control_dependencies([eps]):
+            update_N = tf.assign(N, N + 1)
         if reusing_scope is False:
             tf.summary.scalar('N', N)
     else:
@@ -24,9 +28,12 @@ def eps_greedy(inputs_t, q_preds_t, nb_actions, N0, min_eps, nb_state=None):
         update_N = tf.scatter_add(N, inputs_t, 1)
         if reusing_scope is False:
             tf.summary.histogram('N', N)
-    cond = tf.greater(tf.random_uniform([], 0, 1), eps)
+    # The draws can be fed, the agents acting with a session feed the ones of their host RNG
+    uniform = tf.placeholder_with_default(tf.random_uniform([], 0, 1), shape=[], name='uniform')
+    random_action = tf.placeholder_with_default(tf.random_uniform([], 0, nb_actions, dtype=tf.int32), shape=[], name='random_action')
+    tf.add_to_collection('eps_greedy_draws', (uniform, random_action))
+    cond = tf.greater(uniform, eps)
     pred_action = tf.cast(tf.argmax(q_preds_t, 0), tf.int32)
-    random_action = tf.random_uniform([], 0, nb_actions, dtype=tf.int32)
 
     with tf.control_dependencies([update_N]): # Force the update call
         action_t = tf.where(cond, pred_action, random_action)
@@ -296,58 +303,35 @@ def fix_scope(from_scope):
     return update_fixed_vars_op
 
 
-def policy(network_params, inputs):
-    reusing_scope = tf.get_variable_scope().reuse
-    
-    W1 = tf.get_variable('W1'
-        , shape=[ network_params['nb_inputs'], network_params['nb_units'] ]
-        , initializer=tf.random_normal_initializer(mean=network_params['initial_mean'], stddev=network_params['initial_stddev'])
-    )
-    if reusing_scope is False:
-        tf.summary.histogram('W1', W1)
-    b1 = tf.get_variable('b1'
-        , shape=[ network_params['nb_units'] ]
-        , initializer=tf.zeros_initializer()
-    )
-    if reusing_scope is False:
-        tf.summary.histogram('b1', b1)
-    a1 = tf.nn.relu(tf.matmul(inputs, W1) + b1)
-
-    W2 = tf.get_variable('W2'
-        , shape=[ network_params['nb_units'], network_params['nb_units'] ]
-        , initializer=tf.random_normal_initializer(mean=network_params['initial_mean'], stddev=network_params['initial_stddev'])
-    )
-    if reusing_scope is False:
-        tf.summary.histogram('W2', W2)
-    b2 = tf.get_variable('b2'
-        , shape=[ network_params['nb_units'] ]
-        , initializer=tf.zeros_initializer()
-    )
-    if reusing_scope is False:
-        tf.summary.histogram('b2', b2)
-    a2 = tf.nn.relu(tf.matmul(a1, W2) + b2)
+def batched_value_f(network_params, scopes, inputs_list):
+    # Evaluates the value_f networks of several scopes (the same one can be repeated) on
+    # inputs of the same batch size with one batched matmul per layer instead of one per
+    # scope and layer. The networks must exist already, the gradients flow to their variables.
+    weights = {}
+    for name in ['W1', 'b1', 'W2', 'b2', 'W3', 'b3']:
+        variables = []
+        for scope in scopes:
+            with tf.variable_scope(scope, reuse=True):
+                variables.append(tf.get_variable(name))
+        weights[name] = tf.stack(variables)
+    inputs = tf.stack(inputs_list)
 
-    W3 = tf.get_variable('W3'
-        , shape=[ network_params['nb_units'], network_params['nb_outputs'] ]
-        , initializer=tf.random_normal_initializer(mean=network_params['initial_mean'], stddev=network_params['initial_stddev'])
-    )
-    if reusing_scope is False:
-        tf.summary.histogram('W3', W3)
-    b3 = tf.get_variable('b3'
-        , shape=[ network_params['nb_outputs'] ]
-        , initializer=tf.zeros_initializer()
-    )
-    if reusing_scope is False:
-        tf.summary.histogram('b3', b3)
-    logits = tf.matmul(a2, W3) + b3
-    probs_t = tf.nn.softmax(logits)
-
-    actions_t = tf.cast(tf.multinomial(logits, 1), tf.int32)
+    a1 = tf.nn.relu(tf.matmul(inputs, weights['W1']) + tf.expand_dims(weights['b1'], 1))
+    a2 = tf.nn.relu(tf.matmul(a1, weights['W2']) + tf.expand_dims(weights['b2'], 1))
+    values = tf.matmul(a2, weights['W3']) + tf.expand_dims(weights['b3'], 1)
 
-    return (probs_t, actions_t)
+    return tf.unstack(values, num=len(scopes))
 
+def policy(network_params, inputs):
+    return policy_head(network_params, trunk(network_params, inputs))
 
 def value_f(network_params, inputs):
+    return value_head(network_params, trunk(network_params, inputs))
+
+# The networks are a trunk holding the two hidden layers (W1, b1, W2, b2) and a head holding
+# the output layer (W3, b3). In policy and value_f, both are in the current scope, a shared
+# trunk is in its own scope and each head in the scope of its network.
+def trunk(network_params, inputs):
     reusing_scope = tf.get_variable_scope().reuse
 
     W1 = tf.get_variable('W1'
@@ -363,7 +347,6 @@ def value_f(network_params, inputs):
     if reusing_scope is False:
         tf.summary.histogram('b1', b1)
     a1 = tf.nn.relu(tf.matmul(inputs, W1) + b1)
-    # a1 = tf.matmul(inputs, W1) + b1
 
     W2 = tf.get_variable('W2'
         , shape=[ network_params['nb_units'], network_params['nb_units'] ]
@@ -379,6 +362,11 @@ def value_f(network_params, inputs):
         tf.summary.histogram('b2', b2)
     a2 = tf.nn.relu(tf.matmul(a1, W2) + b2)
 
+    return a2
+
+def value_head(network_params, hidden):
+    reusing_scope = tf.get_variable_scope().reuse
+
     W3 = tf.get_variable('W3'
         , shape=[ network_params['nb_units'], network_params['nb_outputs'] ]
         , initializer=tf.random_normal_initializer(mean=network_params['initial_mean'], stddev=network_params['initial_stddev'])
@@ -391,6 +379,21 @@ def value_f(network_params, inputs):
     )
     if reusing_scope is False:
         tf.summary.histogram('b3', b3)
-    values = tf.matmul(a2, W3) + b3
+    values = tf.matmul(hidden, W3) + b3
 
     return values
+
+def policy_head(network_params, hidden):
+    logits = value_head(network_params, hidden)
+    probs_t = tf.nn.softmax(logits)
+
+    # One action per row sampled by inverting the cumulative probabilities at a uniform draw,
+    # the draws can be fed like the ones of eps_greedy
+    uniforms_t = tf.placeholder_with_default(tf.random_uniform(tf.shape(logits)[:1], 0, 1), shape=[None], name='uniforms')
+    tf.add_to_collection('policy_uniforms', uniforms_t)
+    cumulative_probs = tf.cumsum(probs_t, axis=1)
+    thresholds = tf.expand_dims(uniforms_t, 1) * cumulative_probs[:, -1:]
+    actions_t = tf.reduce_sum(tf.cast(cumulative_probs <= thresholds, tf.int32), 1)
+    actions_t = tf.expand_dims(tf.minimum(actions_t, tf.shape(logits)[1] - 1), 1)
+
+    return (probs_t, actions_t)
@@ -1,8 +1,25 @@
+import json, queue, traceback
+import multiprocessing
 import numpy as np
 import tensorflow as tf
+import gym
 
 from agents import BasicAgent, capacities
 from agents.capacities import get_expected_rewards
+from utils import np_capacities
+from utils.stop_conditions import get_stop_conditions
+from utils.hogwild import SharedParams, HogwildStats, get_n_step_returns
+
+def run_a3c_worker(worker_id, config, shared, stats, stop_event, results):
+    # Entry point of an A3C worker process, it builds its own agent on its own environment
+    try:
+        from agents import make_agent
+        env = gym.make(config['env_name'])
+        env.seed(config['random_seed'])
+        agent = make_agent(config, env)
+        agent.work_a3c(worker_id, shared, stats, stop_event, results)
+    except Exception:
+        results.put(('error', worker_id, traceback.format_exc()))
 
 class DeepMCPolicyAgent(BasicAgent):
     """
@@ -17,7 +34,7 @@ class DeepMCPolicyAgent(BasicAgent):
             , 'initial_stddev': self.config['initial_stddev']
         }
         self.lr = self.config['lr']
-        self.discount = config['discount']
+        self.discount = self.config['discount']
 
     def get_best_config(self, env_name=""):
         return {
@@ -83,10 +100,27 @@ class DeepMCPolicyAgent(BasicAgent):
 
         return graph
 
+    def get_host_scope(self):
+        return 'Policy'
+
+    def get_export(self):
+        arrays = self.get_network_weights('Policy')
+        arrays['kind'] = np.array('policy')
+
+        return arrays
+
     def act(self, obs):
         state = [ np.concatenate((obs, [0])) ]
+        if self.host_sync_every > 0:
+            probs = np_capacities.policy(self.host_weights, np.array(state, dtype=np.float32))[0]
+            return (np_capacities.sample(probs, self.host_random), state)
+
+        # The draw comes from the host RNG too, both ways of acting pick the same actions
+        with self.graph.as_default():
+            uniforms_t = tf.get_collection('policy_uniforms')[0]
         act = self.sess.run(self.action_t, feed_dict={
             self.inputs: state
+            , uniforms_t: [ np_capacities.get_uniform(self.host_random) ]
         })
 
         return (act, state)
@@ -119,13 +153,14 @@ class DeepMCPolicyAgent(BasicAgent):
             self.actions: history['actions'],
             self.rewards: get_expected_rewards(history['rewards']),
         })
+        self.learner_updated()
         summary, _, episode_id = self.sess.run([self.all_summary_t, self.inc_ep_id_op, self.episode_id], feed_dict={
             self.score_plh: score,
             self.loss_plh: loss
         })
         self.sw.add_summary(summary, episode_id)
 
-        return
+        return score
 
 class MCActorCriticAgent(DeepMCPolicyAgent):
     """
@@ -142,6 +177,8 @@ class MCActorCriticAgent(DeepMCPolicyAgent):
             , 'initial_stddev': self.config['initial_stddev']
         }
         self.q_scale_lr = self.config['q_scale_lr']
+        # The policy and the critics can be heads on one shared trunk
+        self.shared_trunk = self.config.get('shared_trunk', False)
 
     def get_best_config(self, env_name=""):
         return {
@@ -174,20 +211,72 @@ class MCActorCriticAgent(DeepMCPolicyAgent):
 
         return random_config
 
+    def get_network_variable_names(self, scope):
+        if not self.shared_trunk:
+            return super(MCActorCriticAgent, self).get_network_variable_names(scope)
+
+        # The hidden layers of every head are the ones of the trunk
+        return [ ('Trunk/' if name in ['W1', 'b1', 'W2', 'b2'] else scope + '/') + name + ':0' for name in np_capacities.network_variables ]
+
+    def build_heads(self, inputs, names, reuse=False):
+        # Networks of the agent among 'Policy', 'QValues' and 'VValues' evaluated on inputs.
+        # With shared_trunk, they are heads on one trunk evaluated once for all of them
+        params = {
+            'Policy': self.policy_params
+            , 'QValues': self.q_params
+            , 'VValues': getattr(self, 'v_params', None)
+        }
+        if self.shared_trunk:
+            with tf.variable_scope(tf.VariableScope(reuse=reuse, name='Trunk')):
+                hidden = capacities.trunk(self.policy_params, inputs)
+
+        heads = {}
+        for name in names:
+            with tf.variable_scope(tf.VariableScope(reuse=reuse, name=name)):
+                if name == 'Policy':
+                    heads[name] = capacities.policy_head(params[name], hidden) if self.shared_trunk else capacities.policy(params[name], inputs)
+                else:
+                    heads[name] = capacities.value_head(params[name], hidden) if self.shared_trunk else capacities.value_f(params[name], inputs)
+
+        return heads
+
+    def get_train_ops(self, losses):
+        # losses: (name, loss, lr) of each network, trained by its own Adam at its own lr and
+        # counting its steps in name_global_step. With a shared trunk, each Adam only trains the
+        # variables of its head, the trunk is trained by another Adam on the sum of the losses
+        # weighted by their learning rate, with a single backward pass through the trunk
+        scopes = {
+            'policy': 'Policy'
+            , 'q': 'QValues'
+            , 'v': 'VValues'
+        }
+        train_ops = []
+        for name, loss, lr in losses:
+            collections = [tf.GraphKeys.GLOBAL_STEP, tf.GraphKeys.GLOBAL_VARIABLES] if name == 'policy' else None
+            global_step = tf.Variable(0, trainable=False, name=name + "_global_step", collections=collections)
+            setattr(self, name + '_global_step', global_step)
+            var_list = tf.get_collection(tf.GraphKeys.TRAINABLE_VARIABLES, scope=scopes[name] + '/') if self.shared_trunk else None
+            train_ops.append(tf.train.AdamOptimizer(lr).minimize(loss, global_step=global_step, var_list=var_list))
+
+        if self.shared_trunk:
+            trunk_adam = tf.train.AdamOptimizer(self.lr)
+            trunk_loss = tf.add_n([ lr / self.lr * loss for name, loss, lr in losses ])
+            trunk_variables = tf.get_collection(tf.GraphKeys.TRAINABLE_VARIABLES, scope='Trunk/')
+            trunk_train_op = trunk_adam.apply_gradients(trunk_adam.compute_gradients(trunk_loss, var_list=trunk_variables))
+            train_ops[0] = tf.group(train_ops[0], trunk_train_op)
+
+        return train_ops
+
     def build_graph(self, graph):
         with graph.as_default():
             tf.set_random_seed(self.random_seed)
 
             self.inputs = tf.placeholder(tf.float32, shape=[None, self.observation_space.shape[0] + 1], name='inputs')
 
-            policy_scope = tf.VariableScope(reuse=False, name='Policy')
-            with tf.variable_scope(policy_scope):
-                self.probs, self.actions = capacities.policy(self.policy_params, self.inputs)
+            heads = self.build_heads(self.inputs, ['Policy', 'QValues'])
+            self.probs, self.actions = heads['Policy']
             self.action_t = tf.squeeze(self.actions, 1)[0]
-
-            q_scope = tf.VariableScope(reuse=False, name='QValues')
-            with tf.variable_scope(q_scope):
-                self.q_values = capacities.value_f(self.q_params, self.inputs)
+            self.q_values = heads['QValues']
             self.q = self.q_values[0, tf.stop_gradient(self.action_t)]
 
             with tf.variable_scope('Training'):
@@ -199,8 +288,7 @@ class MCActorCriticAgent(DeepMCPolicyAgent):
                 self.rewards = tf.placeholder(tf.float32, shape=[None], name="rewards")
                 self.next_states = tf.placeholder(tf.float32, shape=[None, self.observation_space.shape[0] + 1], name="next_states")
                 self.next_actions = tf.placeholder(tf.int32, shape=[None], name="next_actions")
-                with tf.variable_scope(q_scope, reuse=True):
-                    next_q_values = capacities.value_f(self.q_params, self.next_states)
+                next_q_values = self.build_heads(self.next_states, ['QValues'], reuse=True)['QValues']
                 next_stacked_actions = tf.stack([tf.range(0, tf.shape(self.next_actions)[0]), self.next_actions], 1)
                 next_qs = tf.gather_nd(next_q_values, next_stacked_actions)
                 target_qs1 = tf.stop_gradient(self.rewards + self.discount * next_qs)
@@ -279,6 +367,7 @@ class MCActorCriticAgent(DeepMCPolicyAgent):
             self.next_states: history['next_states'],
             self.next_actions: history['next_actions'],
         })
+        self.learner_updated()
         summary, _, episode_id = self.sess.run([self.all_summary_t, self.inc_ep_id_op, self.episode_id], feed_dict={
             self.score_plh: score,
             self.policy_loss_plh: policy_loss,
@@ -287,27 +376,34 @@ class MCActorCriticAgent(DeepMCPolicyAgent):
         })
         self.sw.add_summary(summary, episode_id)
 
-        return
+        return score
 
 class ActorCriticAgent(MCActorCriticAgent):
     """
     Agent implementing Actor critic using REINFORCE
     """
+    def set_agent_props(self):
+        super(ActorCriticAgent, self).set_agent_props()
+
+        self.policy_lr = self.lr
+        self.q_lr = self.q_scale_lr * self.lr
+
+        # A3C mode: worker processes update the networks kept in shared memory with n-step gradients
+        self.nb_workers = self.config.get('nb_workers', 0)
+        self.n_step = self.config.get('n_step', 4)
+        self.a3c_report = None
+
     def build_graph(self, graph):
         with graph.as_default():
             tf.set_random_seed(self.random_seed)
 
             self.inputs = tf.placeholder(tf.float32, shape=[None, self.observation_space.shape[0] + 1], name='inputs')
 
-            policy_scope = tf.VariableScope(reuse=False, name='Policy')
-            with tf.variable_scope(policy_scope):
-                self.probs, self.actions = capacities.policy(self.policy_params, self.inputs)
+            heads = self.build_heads(self.inputs, ['Policy', 'QValues'])
+            self.probs, self.actions = heads['Policy']
             self.action_t = tf.squeeze(self.actions, 1)[0]
             # self.action_t = tf.Print(self.action_t, data=[self.probs, self.action_t], message="self.probs, self.action_t:")
-
-            q_scope = tf.VariableScope(reuse=False, name='QValues')
-            with tf.variable_scope(q_scope):
-                self.q_values = capacities.value_f(self.q_params, self.inputs)
+            self.q_values = heads['QValues']
             self.q = self.q_values[0, tf.stop_gradient(self.action_t)]
 
             with tf.control_dependencies([self.probs, self.q]):
@@ -317,15 +413,11 @@ class ActorCriticAgent(MCActorCriticAgent):
                     qs = tf.gather_nd(self.q_values, stacked_actions)
 
                     self.policy_loss = - tf.reduce_sum(log_probs * tf.stop_gradient(qs))
-                    policy_adam = tf.train.AdamOptimizer(self.policy_lr)
-                    self.policy_global_step = tf.Variable(0, trainable=False, name="policy_global_step", collections=[tf.GraphKeys.GLOBAL_STEP, tf.GraphKeys.GLOBAL_VARIABLES])
-                    self.policy_train_op = policy_adam.minimize(self.policy_loss, global_step=self.policy_global_step)
 
                     self.rewards = tf.placeholder(tf.float32, shape=[None], name="rewards")
                     self.next_states = tf.placeholder(tf.float32, shape=[None, self.observation_space.shape[0] + 1], name="next_states")
                     self.next_actions = tf.placeholder(tf.int32, shape=[None], name="next_actions")
-                    with tf.variable_scope(q_scope, reuse=True):
-                        next_q_values = capacities.value_f(self.q_params, self.next_states)
+                    next_q_values = self.build_heads(self.next_states, ['QValues'], reuse=True)['QValues']
                     next_stacked_actions = tf.stack([tf.range(0, tf.shape(self.next_actions)[0]), self.next_actions], 1)
                     next_qs = tf.gather_nd(next_q_values, next_stacked_actions)
                     target_qs1 = tf.stop_gradient(self.rewards + self.discount * next_qs)
@@ -335,9 +427,10 @@ class ActorCriticAgent(MCActorCriticAgent):
                     target_qs = tf.gather_nd(stacked_targets, select_targets)
 
                     self.q_loss = 1/2 * tf.reduce_sum(tf.square(target_qs - qs))
-                    q_adam = tf.train.AdamOptimizer(self.q_lr)
-                    self.q_global_step = tf.Variable(0, trainable=False, name="q_global_step")
-                    self.q_train_op = q_adam.minimize(self.q_loss, global_step=self.q_global_step)
+                    self.policy_train_op, self.q_train_op = self.get_train_ops([
+                        ('policy', self.policy_loss, self.policy_lr)
+                        , ('q', self.q_loss, self.q_lr)
+                    ])
 
             self.score_plh = tf.placeholder(tf.float32, shape=[])
             self.score_sum_t = tf.summary.scalar('score', self.score_plh)
@@ -379,6 +472,7 @@ class ActorCriticAgent(MCActorCriticAgent):
                 self.next_states: [ np.concatenate((next_obs, [1 if done else 0])) ],
                 self.next_actions: [ next_act ]
             })
+            self.learner_updated()
             av_policy_loss.append(policy_loss)
             av_q_loss.append(q_loss)
 
@@ -396,7 +490,219 @@ class ActorCriticAgent(MCActorCriticAgent):
         })
         self.sw.add_summary(summary, episode_id)
 
-        return
+        return score
+
+    def get_a3c_lrs(self):
+        # Learning rate of each network updated by the A3C workers
+        lrs = {
+            'Policy': self.policy_lr
+            , 'QValues': self.q_lr
+        }
+        if self.shared_trunk:
+            lrs['Trunk'] = self.policy_lr
+
+        return lrs
+
+    def get_a3c_critic(self, heads, actions, returns):
+        # The value of a state is the expected Q value under the policy
+        q_values = heads['QValues']
+        probs, _ = heads['Policy']
+        stacked_actions = tf.stack([tf.range(0, tf.shape(actions)[0]), actions], 1)
+        qs = tf.gather_nd(q_values, stacked_actions)
+
+        values = tf.reduce_sum(probs * q_values, 1)
+        critic_loss = 1/2 * tf.reduce_sum(tf.square(returns - qs))
+
+        return values, critic_loss
+
+    def get_a3c_weights(self):
+        scopes = self.get_a3c_lrs()
+        with self.graph.as_default():
+            variables = [ var for var in tf.trainable_variables() if var.name.split('/')[0] in scopes ]
+        values = self.sess.run(variables)
+
+        return { var.name: value for var, value in zip(variables, values) }
+
+    def build_a3c_graph(self):
+        # Gradients of the n-step losses of a worker with respect to the shared networks,
+        # computed on the networks of the agent built by build_heads
+        with self.graph.as_default():
+            variables = { var.name: var for var in tf.global_variables() }
+            self.a3c_names = sorted(self.get_a3c_weights().keys())
+
+            # A name scope only, the networks are found in their own variable scopes
+            with tf.name_scope('A3C'):
+                self.a3c_states = tf.placeholder(tf.float32, shape=[None, self.observation_space.shape[0] + 1], name='states')
+                self.a3c_actions = tf.placeholder(tf.int32, shape=[None], name='actions')
+                self.a3c_returns = tf.placeholder(tf.float32, shape=[None], name='returns')
+
+                heads = self.build_heads(self.a3c_states, [ scope for scope in self.get_a3c_lrs() if scope != 'Trunk' ], reuse=True)
+                probs, _ = heads['Policy']
+                self.a3c_values, critic_loss = self.get_a3c_critic(heads, self.a3c_actions, self.a3c_returns)
+
+                stacked_actions = tf.stack([tf.range(0, tf.shape(self.a3c_actions)[0]), self.a3c_actions], 1)
+                log_probs = tf.log(tf.gather_nd(probs, stacked_actions))
+                advantages = tf.stop_gradient(self.a3c_returns - self.a3c_values)
+                self.a3c_loss = - tf.reduce_sum(log_probs * advantages) + critic_loss
+                self.a3c_grads = tf.gradients(self.a3c_loss, [ variables[name] for name in self.a3c_names ])
+
+                # The local copy of the networks is refreshed from the shared one in one session run
+                self.a3c_weight_plhs = {}
+                load_ops = []
+                for name in self.a3c_names:
+                    self.a3c_weight_plhs[name] = tf.placeholder(tf.float32, shape=variables[name].get_shape())
+                    load_ops.append(tf.assign(variables[name], self.a3c_weight_plhs[name]))
+                self.a3c_load_op = tf.group(*load_ops)
+
+    def work_a3c(self, worker_id, shared, stats, stop_event, results):
+        self.build_a3c_graph()
+        random_state = np.random.RandomState(self.random_seed % 2**32)
+        env = self.env
+
+        while not stop_event.is_set():
+            obs = env.reset()
+            score = 0
+            done = False
+            while not done and not stop_event.is_set():
+                weights = shared.get()
+                self.sess.run(self.a3c_load_op, feed_dict={ self.a3c_weight_plhs[name]: weights[name] for name in self.a3c_names })
+                policy_weights = { name: weights[var_name] for name, var_name in zip(np_capacities.network_variables, self.get_network_variable_names('Policy')) }
+
+                states = []
+                actions = []
+                rewards = []
+                while not done and len(states) < self.n_step:
+                    state = np.concatenate((obs, [0]))
+                    probs = np_capacities.policy(policy_weights, np.array([state], dtype=np.float32))[0]
+                    act = np_capacities.sample(probs, random_state)
+                    obs, reward, done, info = env.step(act)
+
+                    states.append(state)
+                    actions.append(act)
+                    rewards.append(reward)
+                    score += reward
+
+                bootstrap = 0. if done else self.sess.run(self.a3c_values, feed_dict={
+                    self.a3c_states: [ np.concatenate((obs, [0])) ]
+                })[0]
+                grads = self.sess.run(self.a3c_grads, feed_dict={
+                    self.a3c_states: states,
+                    self.a3c_actions: actions,
+                    self.a3c_returns: get_n_step_returns(rewards, bootstrap, self.discount)
+                })
+                shared.apply(dict(zip(self.a3c_names, grads)))
+                stats.add(worker_id, len(states))
+
+            if done:
+                results.put(('episode', worker_id, score))
+
+    def get_worker_config(self, worker_id):
+        config = dict(self.config)
+        config.update({
+            'result_dir': self.result_dir + '/workers/' + str(worker_id)
+            , 'random_seed': (self.random_seed + worker_id + 1) % 2**32
+            , 'nb_workers': 0
+            , 'best': False
+            , 'host_sync_every': 0
+            , 'checkpoint_async': False
+            , 'profile': False
+            , 'trace_episodes': ''
+            # One core per worker, the workers scale with the processes
+            , 'session_threads': 1
+        })
+
+        return config
+
+    def load_a3c_weights(self, shared, stats):
+        self.set_weights(shared.get())
+        self.policy_global_step.load(stats.nb_updates(), self.sess)
+
+    def train(self, render=False, save_every=49, stop_conditions=[]):
+        if self.nb_workers > 0:
+            return self.train_a3c(save_every, stop_conditions)
+
+        return super(ActorCriticAgent, self).train(render, save_every, stop_conditions)
+
+    def train_a3c(self, save_every=49, stop_conditions=[]):
+        stop_conditions = get_stop_conditions(self.config) + list(stop_conditions)
+        lrs = self.get_a3c_lrs()
+        weights = self.get_a3c_weights()
+        shared = SharedParams(weights, { name: lrs[name.split('/')[0]] for name in weights })
+        stats = HogwildStats(self.nb_workers)
+
+        # The workers build their own graph and session, TensorFlow can not be forked
+        context = multiprocessing.get_context('spawn')
+        stop_event = context.Event()
+        results = context.Queue()
+        workers = [
+            context.Process(target=run_a3c_worker, args=(worker_id, self.get_worker_config(worker_id), shared, stats, stop_event, results), name='a3c-worker-' + str(worker_id))
+            for worker_id in range(self.nb_workers)
+        ]
+
+        scores = []
+        episode_id = 0
+        self.stop_reason = 'max_iter'
+        for worker in workers:
+            worker.daemon = True
+            worker.start()
+        try:
+            while episode_id < self.max_iter:
+                if (self.max_steps > 0 and stats.nb_steps() >= self.max_steps) or (self.max_seconds > 0 and stats.seconds() >= self.max_seconds):
+                    self.stop_reason = 'budget'
+                    break
+
+                try:
+                    kind, worker_id, value = results.get(timeout=1.)
+                except queue.Empty:
+                    if any(worker.exitcode not in [None, 0] for worker in workers):
+                        raise Exception('An A3C worker exited with the code {}'.format([ worker.exitcode for worker in workers ]))
+                    continue
+                if kind == 'error':
+                    raise Exception('The A3C worker {} failed: {}'.format(worker_id, value))
+
+                score = value
+                scores.append(score)
+                summary, _, ep_id = self.sess.run([self.score_sum_t, self.inc_ep_id_op, self.episode_id], feed_dict={
+                    self.score_plh: score
+                })
+                self.sw.add_summary(summary, ep_id)
+                if save_every > 0 and episode_id % save_every == 0:
+                    self.load_a3c_weights(shared, stats)
+                    self.save_periodically(episode_id, scores, save_every)
+                episode_id += 1
+
+                stopped = [ condition.name for condition in stop_conditions if condition.update(score) ]
+                if len(stopped) > 0:
+                    self.stop_reason = stopped[0]
+                    break
+        finally:
+            stop_event.set()
+            for worker in workers:
+                worker.join(5.)
+                if worker.is_alive():
+                    worker.terminate()
+
+        self.load_a3c_weights(shared, stats)
+        if self.checkpointer is not None:
+            self.checkpointer.flush()
+        self.write_a3c_report(stats.report())
+
+        if self.config['debug']:
+            print('Training stopped after %d episodes (%s)' % (episode_id, self.stop_reason))
+
+        return scores
+
+    def write_a3c_report(self, report):
+        self.a3c_report = report
+
+        values = [
+            tf.Summary.Value(tag='a3c/' + name, simple_value=report[name])
+            for name in ['env_steps_per_sec', 'updates_per_sec']
+        ]
+        self.sw.add_summary(tf.Summary(value=values), self.sess.run(self.episode_id))
+
+        with open(self.result_dir + '/a3c.json', 'w') as f:
+            json.dump(report, f)
 
 class A2CAgent(ActorCriticAgent):
     """
@@ -414,25 +720,35 @@ class A2CAgent(ActorCriticAgent):
         }
         self.v_lr = self.lr
 
+    def get_a3c_lrs(self):
+        lrs = super(A2CAgent, self).get_a3c_lrs()
+        lrs['VValues'] = self.v_lr
+
+        return lrs
+
+    def get_a3c_critic(self, heads, actions, returns):
+        # Both critics learn the n-step returns, the advantages are taken against V
+        q_values = heads['QValues']
+        vs = tf.squeeze(heads['VValues'], 1)
+        stacked_actions = tf.stack([tf.range(0, tf.shape(actions)[0]), actions], 1)
+        qs = tf.gather_nd(q_values, stacked_actions)
+
+        critic_loss = 1/2 * tf.reduce_sum(tf.square(returns - qs)) + 1/2 * tf.reduce_sum(tf.square(returns - vs))
+
+        return vs, critic_loss
+
     def build_graph(self, graph):
         with graph.as_default():
             tf.set_random_seed(self.random_seed)
 
             self.inputs = tf.placeholder(tf.float32, shape=[None, self.observation_space.shape[0] + 1], name='inputs')
 
-            policy_scope = tf.VariableScope(reuse=False, name='Policy')
-            with tf.variable_scope(policy_scope):
-                self.probs, self.actions = capacities.policy(self.policy_params, self.inputs)
+            heads = self.build_heads(self.inputs, ['Policy', 'QValues', 'VValues'])
+            self.probs, self.actions = heads['Policy']
             self.action_t = tf.squeeze(self.actions, 1)[0]
             # self.action_t = tf.Print(self.action_t, data=[self.probs, self.action_t], message="self.probs, self.action_t:")
-
-            q_scope = tf.VariableScope(reuse=False, name='QValues')
-            with tf.variable_scope(q_scope):
-                self.q_values = capacities.value_f(self.q_params, self.inputs)
-
-            v_scope = tf.VariableScope(reuse=False, name='VValues')
-            with tf.variable_scope(v_scope):
-                vs = capacities.value_f(self.v_params, self.inputs)
+            self.q_values = heads['QValues']
+            vs = heads['VValues']
 
             with tf.control_dependencies([self.probs, self.q_values, vs]):
                 with tf.variable_scope('Training'):
@@ -443,8 +759,8 @@ class A2CAgent(ActorCriticAgent):
                     self.next_states = tf.placeholder(tf.float32, shape=[None, self.observation_space.shape[0] + 1], name="next_states")
                     self.next_actions = tf.placeholder(tf.int32, shape=[None], name="next_actions")
 
-                    with tf.variable_scope(v_scope, reuse=True):
-                        next_vs = tf.squeeze(capacities.value_f(self.v_params, self.next_states), 1)
+                    next_heads = self.build_heads(self.next_states, ['QValues', 'VValues'], reuse=True)
+                    next_vs = tf.squeeze(next_heads['VValues'], 1)
 
                     with tf.variable_scope('TargetVs'):
                         target_vs1 = tf.stop_gradient(self.rewards + self.discount * next_vs)
@@ -453,8 +769,7 @@ class A2CAgent(ActorCriticAgent):
                         select_targets = tf.stack([tf.range(0, tf.shape(self.next_states)[0]), tf.cast(self.next_states[:, -1], tf.int32)], 1)
                         target_vs = tf.gather_nd(stacked_targets, select_targets)
 
-                    with tf.variable_scope(q_scope, reuse=True):
-                        next_q_values = capacities.value_f(self.q_params, self.next_states)
+                    next_q_values = next_heads['QValues']
 
                     with tf.variable_scope('TargetQs'):
                         next_stacked_actions = tf.stack([tf.range(0, tf.shape(self.next_actions)[0]), self.next_actions], 1)
@@ -469,20 +784,14 @@ class A2CAgent(ActorCriticAgent):
 
                     with tf.control_dependencies([log_probs, target_qs, target_vs]):
                         self.v_loss = 1/2 * tf.reduce_sum(tf.square(target_vs - vs))
-                        v_adam = tf.train.AdamOptimizer(self.v_lr)
-                        self.v_global_step = tf.Variable(0, trainable=False, name="v_global_step")
-                        self.v_train_op = v_adam.minimize(self.v_loss, global_step=self.v_global_step)
-
                         self.q_loss = 1/2 * tf.reduce_sum(tf.square(target_qs - qs))
-                        q_adam = tf.train.AdamOptimizer(self.q_lr)
-                        self.q_global_step = tf.Variable(0, trainable=False, name="q_global_step")
-                        self.q_train_op = q_adam.minimize(self.q_loss, global_step=self.q_global_step)
-
                         advantages = qs - vs
                         self.policy_loss = - tf.reduce_sum(log_probs * tf.stop_gradient(advantages))
-                        policy_adam = tf.train.AdamOptimizer(self.policy_lr)
-                        self.policy_global_step = tf.Variable(0, trainable=False, name="policy_global_step", collections=[tf.GraphKeys.GLOBAL_STEP, tf.GraphKeys.GLOBAL_VARIABLES])
-                        self.policy_train_op = policy_adam.minimize(self.policy_loss, global_step=self.policy_global_step)
+                        self.v_train_op, self.q_train_op, self.policy_train_op = self.get_train_ops([
+                            ('v', self.v_loss, self.v_lr)
+                            , ('q', self.q_loss, self.q_lr)
+                            , ('policy', self.policy_loss, self.policy_lr)
+                        ])
 
             self.score_plh = tf.placeholder(tf.float32, shape=[])
             self.score_sum_t = tf.summary.scalar('score', self.score_plh)
@@ -527,6 +836,7 @@ class A2CAgent(ActorCriticAgent):
                 self.next_states: [ np.concatenate((next_obs, [1 if done else 0])) ],
                 self.next_actions: [ next_act ]
             })
+            self.learner_updated()
             av_policy_loss.append(policy_loss)
             av_q_loss.append(q_loss)
             av_v_loss.append(v_loss)
@@ -545,7 +855,7 @@ class A2CAgent(ActorCriticAgent):
         })
         self.sw.add_summary(summary, episode_id)
 
-        return
+        return score
 
 class TDACAgent(DeepMCPolicyAgent):
     """
@@ -652,6 +962,7 @@ class TDACAgent(DeepMCPolicyAgent):
                 self.next_states: [ np.concatenate((next_obs, [1 if done else 0])) ],
                 self.next_actions: [ next_act ]
             })
+            self.learner_updated()
             av_policy_loss.append(policy_loss)
             av_v_loss.append(v_loss)
 
@@ -669,4 +980,4 @@ class TDACAgent(DeepMCPolicyAgent):
         })
         self.sw.add_summary(summary, episode_id)
 
-        return
+        return score
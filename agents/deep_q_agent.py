@@ -1,7 +1,15 @@
+import json, queue, threading
 import numpy as np
 import tensorflow as tf
+import gym
 
 from agents import BasicAgent, capacities
+from utils import np_capacities
+from utils.stop_conditions import get_stop_conditions
+from utils.actor_learner import Actor, ActorLearnerStats, drain
+from utils.replay_memory import FrameReplayMemory
+from utils.replay_buffer import ReplayBuffer
+from utils.prefetcher import Prefetcher
 
 class DeepTDAgent(BasicAgent):
     """
@@ -17,9 +25,10 @@ class DeepTDAgent(BasicAgent):
         }
 
         self.lr = self.config['lr']
-        self.discount = config['discount']
+        self.discount = self.config['discount']
         self.N0 = self.config['N0']
         self.min_eps = self.config['min_eps']
+        self.host_N = None
 
     def get_best_config(self, env_name=""):
         return {
@@ -83,7 +92,7 @@ class DeepTDAgent(BasicAgent):
                     next_q_values = tf.squeeze(capacities.value_f(self.q_params, self.next_state))
                 target_q1 = tf.stop_gradient(self.reward + self.discount * next_q_values[self.next_action])
                 target_q2 = self.reward
-                is_done = tf.cast(self.next_state[0, 4], tf.bool)
+                is_done = tf.cast(self.next_state[0, -1], tf.bool)
                 target_q = tf.where(is_done, target_q2, target_q1)
                 with tf.control_dependencies([target_q]):
                     self.loss = 1/2 * tf.square(target_q - self.q_t)
@@ -107,13 +116,56 @@ class DeepTDAgent(BasicAgent):
 
         return graph
 
+    def get_host_scope(self):
+        return 'QValues'
+
+    def get_export(self):
+        arrays = self.get_network_weights('QValues')
+        arrays['kind'] = np.array('q')
+
+        return arrays
+
+    def get_eps_counter(self):
+        with self.graph.as_default():
+            return tf.get_collection('eps_greedy_counters')[0]
+
+    def get_eps_draws(self):
+        with self.graph.as_default():
+            return tf.get_collection('eps_greedy_draws')[0]
+
+    def sync_host(self, reset=False):
+        super(DeepTDAgent, self).sync_host(reset)
+        # The exploration counter is owned by the host until it is flushed
+        if reset:
+            self.host_N = self.sess.run(self.get_eps_counter())
+
+    def flush_host(self):
+        self.get_eps_counter().load(self.host_N, self.sess)
+
+    def host_act(self, state):
+        q_values = np_capacities.value_f(self.host_weights, np.array([ state ], dtype=np.float32))[0]
+        act = np_capacities.eps_greedy(q_values, self.host_N, self.N0, self.min_eps, self.host_random)
+        self.host_N += 1
+
+        return act
+
+    def session_act(self, state):
+        # The exploration draws come from the host RNG too, both ways of acting pick the same actions
+        uniform, random_action = np_capacities.get_eps_greedy_draws(self.action_space.n, self.host_random)
+        uniform_t, random_action_t = self.get_eps_draws()
+
+        return self.sess.run(self.action_t, feed_dict={
+            self.inputs: [ state ]
+            , uniform_t: uniform
+            , random_action_t: random_action
+        })
+
     def act(self, obs):
         state = [ np.concatenate((obs, [0])) ]
-        act = self.sess.run(self.action_t, feed_dict={
-            self.inputs: state
-        })
+        if self.host_sync_every > 0:
+            return (self.host_act(state[0]), state)
 
-        return (act, state)
+        return (self.session_act(state[0]), state)
 
     def learn_from_episode(self, env, render):
         obs = env.reset()
@@ -137,6 +189,7 @@ class DeepTDAgent(BasicAgent):
                 self.next_state: [ np.concatenate((next_obs, [1 if done else 0])) ],
                 self.next_action: next_act
             })
+            self.learner_updated()
             av_loss.append(loss)
 
             score += reward
@@ -151,7 +204,7 @@ class DeepTDAgent(BasicAgent):
         })
         self.sw.add_summary(summary, episode_id)
 
-        return
+        return score
 
 class DQNAgent(DeepTDAgent):
     """
@@ -163,14 +216,45 @@ class DQNAgent(DeepTDAgent):
         self.er_every = self.config['er_every']
         self.er_batch_size = self.config['er_batch_size']
         self.er_rm_size = self.config['er_rm_size']
+        # The online and fixed Q networks of an update are evaluated in one batched forward pass
+        self.er_fused = self.config.get('er_fused', True)
+
+        # With er_in_graph, a single session run appends the transition to a replay buffer
+        # held in the graph, samples the minibatch and trains on it
+        self.er_in_graph = self.config.get('er_in_graph', False)
+        self.replay_buffer = None
+        self.replayMemory = None
+        if not self.er_in_graph:
+            # Each observation is stored once, the trailing done flag of the states is rebuilt when sampling
+            compact = self.config.get('er_compact', False) and self.action_space.n <= 256
+            # On disk, the replay memory is reopened when training again from the same result_dir
+            rm_path = self.config['result_dir'] + '/replay_memory' if self.config.get('er_memmap', False) else None
+            self.replayMemory = FrameReplayMemory(
+                self.observation_space.shape
+                , self.er_rm_size
+                , rm_path
+                , obs_dtype='float16' if compact else 'float32'
+                , action_dtype='uint8' if compact else 'int32'
+            )
 
-        self.replayMemoryDt = np.dtype([
-            ('states', 'float32', (self.observation_space.shape[0] + 1,))
-            , ('actions', 'int32')
-            , ('rewards', 'float32')
-            , ('next_states', 'float32', (self.observation_space.shape[0] + 1,))
-        ])
-        self.replayMemory = np.array([], dtype=self.replayMemoryDt)
+        # The next minibatches can be sampled by a background thread during the updates
+        if self.replayMemory is not None and self.config.get('er_prefetch', 0) > 0:
+            prefetch_random = np.random.RandomState((self.random_seed + 1) % 2**32)
+            self.prefetcher = Prefetcher(
+                lambda: self.replayMemory.sample(self.er_batch_size, prefetch_random)
+                , self.get_er_feed
+                , self.config['er_prefetch']
+            )
+        # Held to write in the replay memory while it can be sampled by another thread
+        self.replay_lock = self.prefetcher.lock if self.prefetcher is not None else threading.Lock()
+
+        # Actor/learner mode: actor threads step their own environment and the learner trains continuously
+        self.nb_actors = self.config.get('nb_actors', 0)
+        self.actor_queue_size = self.config.get('actor_queue_size', 100)
+        self.actor_sync_every = self.config.get('actor_sync_every', 100)
+        self.actor_weights = None
+        self.actor_N = 0
+        self.actor_learner_report = None
 
     def get_best_config(self, env_name=""):
         return {
@@ -239,22 +323,26 @@ class DQNAgent(DeepTDAgent):
                 self.er_actions = tf.placeholder(tf.int32, shape=[None], name="ERInputs")
                 self.er_rewards = tf.placeholder(tf.float32, shape=[None], name="ERReward")
                 self.er_next_states = tf.placeholder(tf.float32, shape=[None, self.observation_space.shape[0] + 1], name="ERNextState")
-
-                with tf.variable_scope(q_scope, reuse=True):
-                    er_q_values = capacities.value_f(self.q_params, self.er_inputs)
-                er_stacked_actions = tf.stack([tf.range(0, tf.shape(self.er_actions)[0]), self.er_actions], 1)
+                er_inputs, er_actions, er_rewards, er_next_states = self.get_er_batch()
+
+                if self.er_fused:
+                    er_q_values, er_next_q_values = capacities.batched_value_f(self.q_params, [q_scope, fixed_q_scope], [er_inputs, er_next_states])
+                else:
+                    with tf.variable_scope(q_scope, reuse=True):
+                        er_q_values = capacities.value_f(self.q_params, er_inputs)
+                    with tf.variable_scope(fixed_q_scope, reuse=True):
+                        er_next_q_values = capacities.value_f(self.q_params, er_next_states)
+                er_stacked_actions = tf.stack([tf.range(0, tf.shape(er_actions)[0]), er_actions], 1)
                 er_qs = tf.gather_nd(er_q_values, er_stacked_actions)
 
-                with tf.variable_scope(fixed_q_scope, reuse=True):
-                    er_next_q_values = capacities.value_f(self.q_params, self.er_next_states)
                 er_next_max_action_t = tf.cast(tf.argmax(er_next_q_values, 1), tf.int32)
-                er_next_stacked_actions = tf.stack([tf.range(0, tf.shape(self.er_next_states)[0]), er_next_max_action_t], 1)
+                er_next_stacked_actions = tf.stack([tf.range(0, tf.shape(er_next_states)[0]), er_next_max_action_t], 1)
                 er_next_qs = tf.gather_nd(er_next_q_values, er_next_stacked_actions)
 
-                er_target_qs1 = tf.stop_gradient(self.er_rewards + self.discount * er_next_qs)
-                er_target_qs2 = self.er_rewards
+                er_target_qs1 = tf.stop_gradient(er_rewards + self.discount * er_next_qs)
+                er_target_qs2 = er_rewards
                 er_stacked_targets = tf.stack([er_target_qs1, er_target_qs2], 1)
-                select_targets = tf.stack([tf.range(0, tf.shape(self.er_next_states)[0]), tf.cast(self.er_next_states[:, -1], tf.int32)], 1)
+                select_targets = tf.stack([tf.range(0, tf.shape(er_next_states)[0]), tf.cast(er_next_states[:, -1], tf.int32)], 1)
                 er_target_qs = tf.gather_nd(er_stacked_targets, select_targets)
 
                 self.er_loss = 1/2 * tf.reduce_sum(tf.square(er_target_qs - er_qs))
@@ -277,19 +365,48 @@ class DQNAgent(DeepTDAgent):
 
         return graph
 
+    def get_er_batch(self):
+        # Minibatch of the learning: the fed transitions, or with er_in_graph a sample of the
+        # replay buffer taken once the fed transition is appended
+        if not self.er_in_graph:
+            return self.er_inputs, self.er_actions, self.er_rewards, self.er_next_states
+
+        state_shape = (self.observation_space.shape[0] + 1,)
+        self.replay_buffer = ReplayBuffer([
+            ('states', tf.float32, state_shape)
+            , ('actions', tf.int32, ())
+            , ('rewards', tf.float32, ())
+            , ('next_states', tf.float32, state_shape)
+        ], self.er_rm_size)
+        append_op = self.replay_buffer.append([ self.er_inputs[0], self.er_actions[0], self.er_rewards[0], self.er_next_states[0] ])
+        with tf.control_dependencies([append_op]):
+            return self.replay_buffer.sample(self.er_batch_size)
+
+    def get_er_feed(self, memories):
+        return {
+            self.er_inputs: np.concatenate((memories['observations'], np.zeros((len(memories['dones']), 1))), 1).astype(np.float32),
+            self.er_actions: memories['actions'],
+            self.er_rewards: memories['rewards'],
+            self.er_next_states: np.concatenate((memories['next_observations'], np.reshape(memories['dones'], (-1, 1))), 1).astype(np.float32),
+        }
+
     def act(self, obs):
         state = np.concatenate( (obs, [0]) )
-        act = self.sess.run(self.action_t, feed_dict={
-            self.inputs: [ state ]
-        })
+        if self.host_sync_every > 0:
+            return (self.host_act(state), state)
 
-        return (act, state)
+        return (self.session_act(state), state)
 
     def learn_from_episode(self, env, render):
         obs = env.reset()
         score = 0
         av_loss = []
         done = False
+        # The memory can end with a segment waiting for its next transition (actor/learner mode,
+        # reopened er_memmap memory), it must not be continued by this episode
+        if self.replayMemory is not None:
+            with self.replay_lock:
+                self.replayMemory.cut()
 
         while True:
             if render:
@@ -297,22 +414,17 @@ class DQNAgent(DeepTDAgent):
 
             act, state = self.act(obs)
             next_obs, reward, done, info = env.step(act)
-            next_state = np.concatenate( (next_obs, [1. if done else 0.]) )
-
-            if self.replayMemory.shape[0] >= self.er_rm_size:
-                self.replayMemory = np.delete(self.replayMemory, 0)
-            memory = np.array([(state, act, reward, next_state)], dtype=self.replayMemoryDt)
-            self.replayMemory = np.append(self.replayMemory, memory)
-
-            memories = np.random.choice(self.replayMemory, self.er_batch_size)
-            loss, _, timestep, _ = self.sess.run([self.er_loss, self.inc_timestep_op, self.timestep, self.er_train_op], feed_dict={
-                self.er_inputs: memories['states'],
-                self.er_actions: memories['actions'],
-                self.er_rewards: memories['rewards'],
-                self.er_next_states: memories['next_states'],
-            })
-            if timestep % self.er_every == 0:
-                self.sess.run(self.update_fixed_vars_op)
+
+            if self.er_in_graph:
+                feed_dict = self.get_er_feed({ 'observations': [ obs ], 'actions': [ act ], 'rewards': [ reward ], 'next_observations': [ next_obs ], 'dones': [ done ] })
+            elif self.prefetcher is not None:
+                with self.replay_lock:
+                    self.replayMemory.append(obs, act, reward, next_obs, done)
+                feed_dict = self.prefetcher.get()
+            else:
+                self.replayMemory.append(obs, act, reward, next_obs, done)
+                feed_dict = self.get_er_feed(self.replayMemory.sample(self.er_batch_size))
+            loss = self.er_update(feed_dict)
 
             av_loss.append(loss)
             score += reward
@@ -326,7 +438,135 @@ class DQNAgent(DeepTDAgent):
         })
         self.sw.add_summary(summary, episode_id)
 
-        return
+        return score
+
+    def er_update(self, feed_dict):
+        loss, _, timestep, _ = self.sess.run([self.er_loss, self.inc_timestep_op, self.timestep, self.er_train_op], feed_dict=feed_dict)
+        self.learner_updated()
+        if timestep % self.er_every == 0:
+            self.sess.run(self.update_fixed_vars_op)
+
+        return loss
+
+    def train(self, render=False, save_every=49, stop_conditions=[]):
+        if self.nb_actors > 0:
+            return self.train_actor_learner(save_every, stop_conditions)
+
+        return super(DQNAgent, self).train(render, save_every, stop_conditions)
+
+    def get_actor_act(self, actor_id):
+        # Actors select their actions with the NumPy copy of the Q network published by the learner,
+        # the exploration decays with the number of steps received by the learner
+        random_state = np.random.RandomState((self.random_seed + 2 + actor_id) % 2**32)
+        def act(obs):
+            state = np.concatenate( (obs, [0]) ).astype(np.float32)
+            q_values = np_capacities.value_f(self.actor_weights, state[None])[0]
+            return np_capacities.eps_greedy(q_values, self.actor_N, self.N0, self.min_eps, random_state)
+
+        return act
+
+    def train_actor_learner(self, save_every=49, stop_conditions=[]):
+        if self.replayMemory is None:
+            raise Exception('The actor/learner mode needs the replay memory on the host, er_in_graph must be off')
+
+        stop_conditions = get_stop_conditions(self.config) + list(stop_conditions)
+        transitions = queue.Queue(self.actor_queue_size)
+        stop_event = threading.Event()
+        self.actor_weights = self.get_network_weights('QValues')
+        self.actor_N = self.sess.run(self.get_eps_counter())
+        actors = []
+        for actor_id in range(self.nb_actors):
+            env = gym.make(self.config['env_name'])
+            env.seed((self.random_seed + actor_id) % 2**32)
+            actors.append(Actor(env, self.get_actor_act(actor_id), transitions, stop_event))
+
+        stats = ActorLearnerStats(self.nb_actors, self.er_batch_size)
+        scores = []
+        av_loss = []
+        episode_id = 0
+        self.stop_reason = 'max_iter'
+        for actor in actors:
+            actor.start()
+        try:
+            while episode_id < self.max_iter and self.stop_reason == 'max_iter':
+                if (self.max_steps > 0 and stats.nb_steps >= self.max_steps) or (self.max_seconds > 0 and stats.seconds() >= self.max_seconds):
+                    self.stop_reason = 'budget'
+                    break
+
+                stats.add_depth(transitions.qsize())
+                # The learner only waits for the actors while its replay memory is empty
+                for kind, value in drain(transitions, block=stats.nb_steps == 0):
+                    if kind == 'error':
+                        raise Exception('An actor failed: {}'.format(value))
+                    elif kind == 'segment':
+                        with self.replay_lock:
+                            self.replayMemory.cut()
+                            for transition in value:
+                                self.replayMemory.append(*transition)
+                        stats.nb_steps += len(value)
+                        self.actor_N += len(value)
+                    elif episode_id < self.max_iter and self.stop_reason == 'max_iter':
+                        score = value
+                        scores.append(score)
+                        summary, _, ep_id = self.sess.run([self.all_summary_t, self.inc_ep_id_op, self.episode_id], feed_dict={
+                            self.score_plh: score,
+                            self.loss_plh: np.mean(av_loss) if len(av_loss) > 0 else 0.
+                        })
+                        self.sw.add_summary(summary, ep_id)
+                        av_loss = []
+                        self.save_periodically(episode_id, scores, save_every)
+                        episode_id += 1
+
+                        stopped = [ condition.name for condition in stop_conditions if condition.update(score) ]
+                        if len(stopped) > 0:
+                            self.stop_reason = stopped[0]
+
+                if stats.nb_steps == 0:
+                    continue
+                feed_dict = self.prefetcher.get() if self.prefetcher is not None else self.get_er_feed(self.replayMemory.sample(self.er_batch_size))
+                av_loss.append(self.er_update(feed_dict))
+                stats.nb_updates += 1
+                if stats.nb_updates % self.actor_sync_every == 0:
+                    self.actor_weights = self.get_network_weights('QValues')
+        finally:
+            stop_event.set()
+            for actor in actors:
+                actor.join(1.)
+            if self.prefetcher is not None:
+                self.prefetcher.close()
+
+        # The exploration schedule goes on from the steps made by the actors
+        self.get_eps_counter().load(self.actor_N, self.sess)
+        if self.checkpointer is not None:
+            self.checkpointer.flush()
+        self.write_actor_learner_report(stats.report())
+
+        if self.config['debug']:
+            print('Training stopped after %d episodes (%s)' % (episode_id, self.stop_reason))
+
+        return scores
+
+    def write_actor_learner_report(self, report):
+        self.actor_learner_report = report
+
+        values = [
+            tf.Summary.Value(tag='actor_learner/' + name, simple_value=report[name])
+            for name in ['env_steps_per_sec', 'updates_per_sec', 'replay_ratio', 'queue_depth_mean', 'queue_depth_max']
+        ]
+        self.sw.add_summary(tf.Summary(value=values), self.sess.run(self.episode_id))
+
+        with open(self.result_dir + '/actor_learner.json', 'w') as f:
+            json.dump(report, f)
+
+    def save(self):
+        if self.replayMemory is not None:
+            self.replayMemory.flush()
+        super(DQNAgent, self).save()
+
+    def save_async(self, score=None):
+        if self.replayMemory is not None:
+            self.replayMemory.flush()
+        super(DQNAgent, self).save_async(score)
 
 class DDQNAgent(DQNAgent):
     """
@@ -370,24 +610,30 @@ class DDQNAgent(DQNAgent):
                 self.er_actions = tf.placeholder(tf.int32, shape=[None], name="ERInputs")
                 self.er_rewards = tf.placeholder(tf.float32, shape=[None], name="ERReward")
                 self.er_next_states = tf.placeholder(tf.float32, shape=[None, self.observation_space.shape[0] + 1], name="ERNextState")
-
-                with tf.variable_scope(q_scope, reuse=True):
-                    er_q_values = capacities.value_f(self.q_params, self.er_inputs)
-                er_stacked_actions = tf.stack([tf.range(0, tf.shape(self.er_actions)[0]), self.er_actions], 1)
+                er_inputs, er_actions, er_rewards, er_next_states = self.get_er_batch()
+
+                if self.er_fused:
+                    er_q_values, er_next_q_values, er_fixed_next_q_values = capacities.batched_value_f(
+                        self.q_params, [q_scope, q_scope, fixed_q_scope], [er_inputs, er_next_states, er_next_states]
+                    )
+                else:
+                    with tf.variable_scope(q_scope, reuse=True):
+                        er_q_values = capacities.value_f(self.q_params, er_inputs)
+                    with tf.variable_scope(fixed_q_scope, reuse=True):
+                        er_fixed_next_q_values = capacities.value_f(self.q_params, er_next_states)
+                    with tf.variable_scope(q_scope, reuse=True):
+                        er_next_q_values = capacities.value_f(self.q_params, er_next_states)
+                er_stacked_actions = tf.stack([tf.range(0, tf.shape(er_actions)[0]), er_actions], 1)
                 er_qs = tf.gather_nd(er_q_values, er_stacked_actions)
 
-                with tf.variable_scope(fixed_q_scope, reuse=True):
-                    er_fixed_next_q_values = capacities.value_f(self.q_params, self.er_next_states)
-                with tf.variable_scope(q_scope, reuse=True):
-                    er_next_q_values = capacities.value_f(self.q_params, self.er_next_states)
                 er_next_max_action_t = tf.cast(tf.argmax(er_next_q_values, 1), tf.int32)
-                er_next_stacked_actions = tf.stack([tf.range(0, tf.shape(self.er_next_states)[0]), er_next_max_action_t], 1)
+                er_next_stacked_actions = tf.stack([tf.range(0, tf.shape(er_next_states)[0]), er_next_max_action_t], 1)
                 er_next_qs = tf.gather_nd(er_fixed_next_q_values, er_next_stacked_actions)
 
-                er_target_qs1 = tf.stop_gradient(self.er_rewards + self.discount * er_next_qs)
-                er_target_qs2 = self.er_rewards
+                er_target_qs1 = tf.stop_gradient(er_rewards + self.discount * er_next_qs)
+                er_target_qs2 = er_rewards
                 er_stacked_targets = tf.stack([er_target_qs1, er_target_qs2], 1)
-                select_targets = tf.stack([tf.range(0, tf.shape(self.er_next_states)[0]), tf.cast(self.er_next_states[:, -1], tf.int32)], 1)
+                select_targets = tf.stack([tf.range(0, tf.shape(er_next_states)[0]), tf.cast(er_next_states[:, -1], tf.int32)], 1)
                 er_target_qs = tf.gather_nd(er_stacked_targets, select_targets)
 
                 self.er_loss = 1/2 * tf.reduce_sum(tf.square(er_target_qs - er_qs))
@@ -133,6 +133,7 @@ class TabularExpectedSarsaAgent(TabularBasicAgent):
                 self.next_states_plh: [ next_state_id ],
                 self.next_probs_plh: next_probs,
             })
+            self.learner_updated()
 
             av_loss.append(loss)
             score += reward
@@ -147,4 +148,4 @@ class TabularExpectedSarsaAgent(TabularBasicAgent):
         })
         self.sw.add_summary(summary, episode_id)
 
-        return
\ No newline at end of file
+        return score
\ No newline at end of file
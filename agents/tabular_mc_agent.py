@@ -139,8 +139,11 @@ class TabularMCAgent(TabularBasicAgent):
             self.actions_t: episode['actions'],
             self.rewards_plh: episode['rewards'],
         })
+        self.learner_updated()
         summary, _, episode_id = self.sess.run([self.all_summary_t, self.inc_ep_id_op, self.episode_id], feed_dict={
             self.score_plh: score,
             self.loss_plh: loss
         })
-        self.sw.add_summary(summary, episode_id)
\ No newline at end of file
+        self.sw.add_summary(summary, episode_id)
+
+        return score
\ No newline at end of file
@@ -83,10 +83,11 @@ class TabularQAgent(TabularBasicAgent):
             with tf.variable_scope(learning_scope):
                 self.rewards_plh = tf.placeholder(tf.float32, shape=[None], name="rewards_plh")
                 self.next_states_plh = tf.placeholder(tf.int32, shape=[None], name="next_states_plh")
+                states_t, actions_t, rewards_t, next_states_t = self.get_learning_batch()
 
-                self.targets_t = capacities.get_q_learning_target(self.Qs, self.rewards_plh, self.next_states_plh, self.discount)
+                self.targets_t = capacities.get_q_learning_target(self.Qs, rewards_t, next_states_t, self.discount)
                 self.loss, self.train_op = capacities.tabular_learning_with_lr(
-                    self.lr, self.lr_decay_steps, self.Qs, self.inputs_plh, self.actions_t, self.targets_t
+                    self.lr, self.lr_decay_steps, self.Qs, states_t, actions_t, self.targets_t
                 )
 
             self.score_plh = tf.placeholder(tf.float32, shape=[])
@@ -103,6 +104,9 @@ class TabularQAgent(TabularBasicAgent):
 
         return graph
 
+    def get_learning_batch(self):
+        return self.inputs_plh, self.actions_t, self.rewards_plh, self.next_states_plh
+
     def act(self, obs):
         state_id = self.phi(obs)
         act = self.sess.run(self.action_t, feed_dict={
@@ -131,6 +135,7 @@ class TabularQAgent(TabularBasicAgent):
                 self.rewards_plh: [ reward ],
                 self.next_states_plh: [ next_state_id ], 
             })
+            self.learner_updated()
 
             av_loss.append(loss)
             score += reward
@@ -142,4 +147,4 @@ class TabularQAgent(TabularBasicAgent):
         })
         self.sw.add_summary(summary, episode_id)
 
-        return
\ No newline at end of file
+        return score
\ No newline at end of file
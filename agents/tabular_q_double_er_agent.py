@@ -92,11 +92,12 @@ class TabularQDoubleERAgent(TabularQERAgent):
 
                 self.rewards_plh = tf.placeholder(tf.float32, shape=[None], name="rewards_plh")
                 self.next_states_plh = tf.placeholder(tf.int32, shape=[None], name="next_states_plh")
+                states_t, actions_t, rewards_t, next_states_t = self.get_learning_batch()
 
                 # Note that we use the fixed Qs to create the targets
-                self.targets_t = capacities.get_q_learning_target(fixed_Qs, self.rewards_plh, self.next_states_plh, self.discount)
+                self.targets_t = capacities.get_q_learning_target(fixed_Qs, rewards_t, next_states_t, self.discount)
                 self.loss, self.train_op = capacities.tabular_learning_with_lr(
-                    self.lr, self.lr_decay_steps, self.Qs, self.inputs_plh, self.actions_t, self.targets_t
+                    self.lr, self.lr_decay_steps, self.Qs, states_t, actions_t, self.targets_t
                 )
 
             self.score_plh = tf.placeholder(tf.float32, shape=[])
@@ -128,18 +129,17 @@ class TabularQDoubleERAgent(TabularQERAgent):
             next_obs, reward, done, info = env.step(act)
             next_state_id = self.phi(next_obs, done)
 
-            memory = np.array([(state_id, act, reward, next_state_id)], dtype=self.replayMemoryDt)
-            if self.replayMemory.shape[0] >= self.er_rm_size:
-                self.replayMemory = np.delete(self.replayMemory, 0)
-            self.replayMemory = np.append(self.replayMemory, memory)
-
-            memories = np.random.choice(self.replayMemory, self.er_batch_size)
-            loss, _, event_count, _ = self.sess.run([self.loss, self.inc_event_count_op, self.event_count, self.train_op], feed_dict={
-                self.inputs_plh: memories['states'],
-                self.actions_t: memories['actions'],
-                self.rewards_plh: memories['rewards'],
-                self.next_states_plh: memories['next_states'],
-            })
+            if self.er_in_graph:
+                feed_dict = self.get_er_feed({ 'states': [ state_id ], 'actions': [ act ], 'rewards': [ reward ], 'next_states': [ next_state_id ] })
+            elif self.prefetcher is not None:
+                with self.prefetcher.lock:
+                    self.replayMemory.append((state_id, act, reward, next_state_id))
+                feed_dict = self.prefetcher.get()
+            else:
+                self.replayMemory.append((state_id, act, reward, next_state_id))
+                feed_dict = self.get_er_feed(self.replayMemory.sample(self.er_batch_size))
+            loss, _, event_count, _ = self.sess.run([self.loss, self.inc_event_count_op, self.event_count, self.train_op], feed_dict=feed_dict)
+            self.learner_updated()
             if event_count % self.update_every == 0:
                 self.sess.run(self.update_fixed_vars_op)
 
@@ -153,4 +153,4 @@ class TabularQDoubleERAgent(TabularQERAgent):
         })
         self.sw.add_summary(summary, episode_id)
 
-        return
\ No newline at end of file
+        return score
\ No newline at end of file
@@ -2,6 +2,9 @@ import numpy as np
 import tensorflow as tf
 
 from agents import TabularQAgent, capacities
+from utils.replay_memory import ReplayMemory
+from utils.replay_buffer import ReplayBuffer
+from utils.prefetcher import Prefetcher
 
 class TabularQERAgent(TabularQAgent):
     """
@@ -13,8 +16,28 @@ class TabularQERAgent(TabularQAgent):
         self.er_batch_size = self.config['er_batch_size']
         self.er_rm_size = self.config['er_rm_size']
 
-        self.replayMemoryDt = np.dtype([('states', 'int32'), ('actions', 'int32'), ('rewards', 'float32'), ('next_states', 'int32')])
-        self.replayMemory = np.array([], dtype=self.replayMemoryDt)
+        # With er_in_graph, a single session run appends the transition to a replay buffer
+        # held in the graph, samples the minibatch and trains on it
+        self.er_in_graph = self.config.get('er_in_graph', False)
+        self.replay_buffer = None
+        self.replayMemory = None
+        if not self.er_in_graph:
+            self.replayMemoryDt = np.dtype([
+                ('states', self.state_dtype)
+                , ('actions', self.action_dtype)
+                , ('rewards', 'float32')
+                , ('next_states', self.state_dtype)
+            ])
+            self.replayMemory = ReplayMemory(self.replayMemoryDt, self.er_rm_size)
+
+        # The next minibatches can be sampled by a background thread during the updates
+        if self.replayMemory is not None and self.config.get('er_prefetch', 0) > 0:
+            prefetch_random = np.random.RandomState((self.random_seed + 1) % 2**32)
+            self.prefetcher = Prefetcher(
+                lambda: self.replayMemory.sample(self.er_batch_size, prefetch_random)
+                , self.get_er_feed
+                , self.config['er_prefetch']
+            )
 
     def get_best_config(self, env_name=""):
         return {
@@ -53,6 +76,28 @@ class TabularQERAgent(TabularQAgent):
 
         return random_config
 
+    def get_learning_batch(self):
+        if not self.er_in_graph:
+            return super(TabularQERAgent, self).get_learning_batch()
+
+        self.replay_buffer = ReplayBuffer([
+            ('states', tf.int32, ())
+            , ('actions', tf.int32, ())
+            , ('rewards', tf.float32, ())
+            , ('next_states', tf.int32, ())
+        ], self.er_rm_size)
+        append_op = self.replay_buffer.append([ self.inputs_plh[0], self.actions_t[0], self.rewards_plh[0], self.next_states_plh[0] ])
+        with tf.control_dependencies([append_op]):
+            return self.replay_buffer.sample(self.er_batch_size)
+
+    def get_er_feed(self, memories):
+        return {
+            self.inputs_plh: np.asarray(memories['states'], dtype=np.int32),
+            self.actions_t: np.asarray(memories['actions'], dtype=np.int32),
+            self.rewards_plh: memories['rewards'],
+            self.next_states_plh: np.asarray(memories['next_states'], dtype=np.int32),
+        }
+
     def learn_from_episode(self, env, render=False):
         score = 0
         av_loss = []
@@ -67,18 +112,17 @@ class TabularQERAgent(TabularQAgent):
             next_obs, reward, done, info = env.step(act)
             next_state_id = self.phi(next_obs, done)
 
-            memory = np.array([(state_id, act, reward, next_state_id)], dtype=self.replayMemoryDt)
-            if self.replayMemory.shape[0] >= self.er_rm_size:
-                self.replayMemory = np.delete(self.replayMemory, 0)
-            self.replayMemory = np.append(self.replayMemory, memory)
-
-            memories = np.random.choice(self.replayMemory, self.er_batch_size)
-            loss, _ = self.sess.run([self.loss, self.train_op], feed_dict={
-                self.inputs_plh: memories['states'],
-                self.actions_t: memories['actions'],
-                self.rewards_plh: memories['rewards'],
-                self.next_states_plh: memories['next_states'],
-            })
+            if self.er_in_graph:
+                feed_dict = self.get_er_feed({ 'states': [ state_id ], 'actions': [ act ], 'rewards': [ reward ], 'next_states': [ next_state_id ] })
+            elif self.prefetcher is not None:
+                with self.prefetcher.lock:
+                    self.replayMemory.append((state_id, act, reward, next_state_id))
+                feed_dict = self.prefetcher.get()
+            else:
+                self.replayMemory.append((state_id, act, reward, next_state_id))
+                feed_dict = self.get_er_feed(self.replayMemory.sample(self.er_batch_size))
+            loss, _ = self.sess.run([self.loss, self.train_op], feed_dict=feed_dict)
+            self.learner_updated()
 
             av_loss.append(loss)
             score += reward
@@ -90,4 +134,4 @@ class TabularQERAgent(TabularQAgent):
         })
         self.sw.add_summary(summary, episode_id)
 
-        return
\ No newline at end of file
+        return score
\ No newline at end of file
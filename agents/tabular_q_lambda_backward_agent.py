@@ -131,4 +131,4 @@ class TabularQLambdaBackwardAgent(TabularQAgent):
     def learn_from_episode(self, env, render=False):
         self.sess.run(self.reset_et_op)
 
-        super(TabularQLambdaBackwardAgent, self).learn_from_episode(env, render)
\ No newline at end of file
+        return super(TabularQLambdaBackwardAgent, self).learn_from_episode(env, render)
\ No newline at end of file
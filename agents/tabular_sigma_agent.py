@@ -138,6 +138,7 @@ class TabularSigmaAgent(TabularBasicAgent):
                 self.next_actions_plh: [ next_act ],
                 self.next_probs_plh: next_probs,
             })
+            self.learner_updated()
 
             av_loss.append(loss)
             score += reward
@@ -152,4 +153,4 @@ class TabularSigmaAgent(TabularBasicAgent):
         })
         self.sw.add_summary(summary, episode_id)
 
-        return
\ No newline at end of file
+        return score
\ No newline at end of file
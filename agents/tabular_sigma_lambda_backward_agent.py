@@ -136,4 +136,4 @@ class TabularSigmaLambdaBackwardAgent(TabularSigmaAgent):
     def learn_from_episode(self, env, render=False):
         self.sess.run(self.reset_et_op)
 
-        super(TabularSigmaLambdaBackwardAgent, self).learn_from_episode(env, render)
\ No newline at end of file
+        return super(TabularSigmaLambdaBackwardAgent, self).learn_from_episode(env, render)
\ No newline at end of file
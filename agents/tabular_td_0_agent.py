@@ -141,6 +141,7 @@ class TabularTD0Agent(TabularMCAgent):
                 self.next_states_plh: [ next_state_id ],
                 self.next_actions_plh: [ next_act ],
             })
+            self.learner_updated()
 
             av_loss.append(loss)
             score += reward
@@ -154,4 +155,4 @@ class TabularTD0Agent(TabularMCAgent):
         })
         self.sw.add_summary(summary, episode_id)
 
-        return
\ No newline at end of file
+        return score
\ No newline at end of file
@@ -115,7 +115,7 @@ class TabularNStepTD0Agent(TabularMCAgent):
         t = 0
         score = 0
         av_loss = []
-        historyType = np.dtype([('states', 'int32', ()), ('actions', 'int32', ()), ('rewards', 'float32'), ('estimates', 'float32')])
+        historyType = np.dtype([('states', self.state_dtype), ('actions', self.action_dtype), ('rewards', 'float32'), ('estimates', 'float32')])
         history = np.array([], dtype=historyType)
         done = False
 
@@ -134,10 +134,11 @@ class TabularNStepTD0Agent(TabularMCAgent):
                 # In this case, it is a lot faster to use Python directly to compute the targets
                 targets = capacities.get_n_step_expected_rewards(history['rewards'][- self.n_step:], history['estimates'][- self.n_step:], self.discount, self.n_step)
                 _, loss = self.sess.run([self.train_op, self.loss], feed_dict={
-                    self.inputs_plh: [ history['states'][- self.n_step] ],
-                    self.actions_t: [ history['actions'][- self.n_step] ],
+                    self.inputs_plh: [ int(history['states'][- self.n_step]) ],
+                    self.actions_t: [ int(history['actions'][- self.n_step]) ],
                     self.targets_t: [ targets[0] ],
                 })
+                self.learner_updated()
                 av_loss.append(loss)
 
             t += 1
@@ -151,10 +152,11 @@ class TabularNStepTD0Agent(TabularMCAgent):
             min_step = min(self.n_step, len(history))
             targets = capacities.get_expected_rewards(history['rewards'][- min_step:], self.discount)
             _, loss = self.sess.run([self.train_op, self.loss], feed_dict={
-                self.inputs_plh: history['states'][-min_step:],
-                self.actions_t: history['actions'][-min_step:],
+                self.inputs_plh: history['states'][-min_step:].astype(np.int32),
+                self.actions_t: history['actions'][-min_step:].astype(np.int32),
                 self.targets_t: targets,
             })
+            self.learner_updated()
             av_loss.append(loss)
 
         summary, _, episode_id = self.sess.run([self.all_summary_t, self.inc_ep_id_op, self.episode_id], feed_dict={
@@ -162,3 +164,5 @@ class TabularNStepTD0Agent(TabularMCAgent):
             self.loss_plh: np.mean(av_loss),
         })
         self.sw.add_summary(summary, episode_id)
+
+        return score
@@ -108,7 +108,7 @@ class TabularTDLambdaAgent(TabularBasicAgent):
 
     def learn_from_episode(self, env, render=False):
         score = 0        
-        historyType = np.dtype([('states', 'int32'), ('actions', 'int32'), ('rewards', 'float32'), ('estimates', 'float32')])
+        historyType = np.dtype([('states', self.state_dtype), ('actions', self.action_dtype), ('rewards', 'float32'), ('estimates', 'float32')])
         history = np.array([], dtype=historyType)
         done = False
         
@@ -130,13 +130,16 @@ class TabularTDLambdaAgent(TabularBasicAgent):
 
         targets = capacities.get_lambda_expected_rewards(history['rewards'], history['estimates'], self.discount, self.lambda_value)
         _, loss = self.sess.run([self.train_op, self.loss], feed_dict={
-            self.inputs_plh: history['states'],
-            self.actions_t: history['actions'],
+            self.inputs_plh: history['states'].astype(np.int32),
+            self.actions_t: history['actions'].astype(np.int32),
             self.targets_plh: targets,
         })
+        self.learner_updated()
 
         summary, _, episode_id = self.sess.run([self.all_summary_t, self.inc_ep_id_op, self.episode_id], feed_dict={
             self.score_plh: score,
             self.loss_plh: loss
         })
-        self.sw.add_summary(summary, episode_id)
\ No newline at end of file
+        self.sw.add_summary(summary, episode_id)
+
+        return score
\ No newline at end of file
@@ -0,0 +1,107 @@
+import os, sys, json
+import tensorflow as tf
+
+dir = os.path.dirname(os.path.realpath(__file__))
+sys.path.append(dir + '/..')
+
+flags = tf.app.flags
+flags.DEFINE_string('baseline', dir + '/../results/benchmarks/baseline/throughput.json', 'Throughput report used as the reference')
+flags.DEFINE_string('current', '', 'Throughput report to check against the baseline')
+flags.DEFINE_float('tolerance', .1, 'Relative change of a median tolerated before reporting a regression')
+
+# Checked metrics and whether a higher value is better
+checked_metrics = [
+    ('steps_per_sec', True)
+    , ('construction_seconds', False)
+]
+
+def get_median_and_iqr(result, metric):
+    # Reports made with a single repetition have no distribution, their noise is unknown
+    distribution = result.get(metric + '_distribution')
+    if distribution is None:
+        return result[metric], 0.
+
+    return distribution['median'], distribution['q3'] - distribution['q1']
+
+def compare(baseline, current, tolerance=.1):
+    """
+    A metric regresses when its median got worse by more than both the relative tolerance
+    and the sum of the interquartile ranges of both reports (the measure noise).
+    """
+    current_results = { (result['agent_name'], result['env_name']): result for result in current['results'] }
+
+    rows = []
+    for base_result in baseline['results']:
+        key = (base_result['agent_name'], base_result['env_name'])
+        if 'error' in base_result:
+            continue
+        if key not in current_results:
+            rows.append({'key': key, 'metric': None, 'status': 'missing'})
+            continue
+
+        result = current_results[key]
+        if 'error' in result:
+            rows.append({'key': key, 'metric': None, 'status': 'regression', 'error': result['error_message']})
+            continue
+
+        for metric, higher_is_better in checked_metrics:
+            base_median, base_iqr = get_median_and_iqr(base_result, metric)
+            median, iqr = get_median_and_iqr(result, metric)
+
+            worsening = base_median - median if higher_is_better else median - base_median
+            threshold = max(tolerance * abs(base_median), base_iqr + iqr)
+            if worsening > threshold:
+                status = 'regression'
+            elif -worsening > threshold:
+                status = 'improvement'
+            else:
+                status = 'ok'
+            rows.append({
+                'key': key
+                , 'metric': metric
+                , 'baseline': base_median
+                , 'current': median
+                , 'change': (median - base_median) / base_median if base_median != 0 else 0.
+                , 'threshold': threshold
+                , 'status': status
+            })
+
+    return rows
+
+def get_failures(rows):
+    # A pair missing from the current report is a failure too, its benchmark crashed or was dropped
+    return [row for row in rows if row['status'] in ['regression', 'missing']]
+
+def format_row(row):
+    name = '{} on {}'.format(*row['key'])
+    if row['metric'] is None:
+        if row['status'] == 'missing':
+            return '{}: missing from the current report'.format(name)
+        return '{}: {} ({})'.format(name, row['status'].upper(), row['error'])
+
+    return '{}: {} {:.3f} -> {:.3f} ({:+.1%}, noise threshold {:.3f}) {}'.format(
+        name, row['metric'], row['baseline'], row['current'], row['change'], row['threshold'], row['status'].upper()
+    )
+
+def main(_):
+    with open(flags.FLAGS.baseline, 'r') as f:
+        baseline = json.load(f)
+    with open(flags.FLAGS.current, 'r') as f:
+        current = json.load(f)
+
+    print('Baseline: %s, current: %s' % (baseline['machine']['commit'], current['machine']['commit']))
+    rows = compare(baseline, current, flags.FLAGS.tolerance)
+    for row in rows:
+        print(format_row(row))
+
+    failures = get_failures(rows)
+    if len(failures) > 0:
+        print('%d regression(s) or missing result(s) found' % len(failures))
+        return 1
+
+    print('No regression found')
+    return 0
+
+
+if __name__ == '__main__':
+    tf.app.run()
@@ -0,0 +1,99 @@
+import copy, os, sys, time, json, shutil, tempfile
+import numpy as np
+import tensorflow as tf
+import gym
+
+dir = os.path.dirname(os.path.realpath(__file__))
+sys.path.append(dir + '/..')
+
+# Importing main defines the training flags, their defaults are used to build the agents
+import main as rl_main
+from agents import make_agent
+from benchmarks.utils import get_machine_info, get_base_config, get_distribution, write_markdown_table
+
+flags = tf.app.flags
+flags.DEFINE_string('bench_agents', 'DQNAgent,DDQNAgent', 'Comma separated experience replay agents to benchmark')
+flags.DEFINE_string('bench_env', 'CartPole-v0', 'Environment of the benchmarked agents')
+flags.DEFINE_string('bench_batch_sizes', '32,64,128,256,512,1024', 'Comma separated er_batch_size measured')
+flags.DEFINE_integer('bench_updates', 500, 'Number of measured updates for each agent and batch size')
+flags.DEFINE_integer('bench_warmup', 50, 'Number of updates run before measuring')
+flags.DEFINE_string('bench_dir', dir + '/../results/benchmarks/er_update-' + str(int(time.time())), 'Directory of the JSON and Markdown reports')
+
+columns = [
+    ('Agent', 'agent_name', '{}')
+    , ('Batch size', 'er_batch_size', '{}')
+    , ('Separate (ms)', 'separate_ms', '{:.3f}')
+    , ('Fused (ms)', 'fused_ms', '{:.3f}')
+    , ('Speedup', 'speedup', '{:.2f}')
+]
+
+def get_memories(env, batch_size, random_state):
+    # Random transitions, the latency of an update does not depend on their values
+    obs_shape = env.observation_space.shape
+    return {
+        'observations': random_state.randn(batch_size, *obs_shape).astype(np.float32)
+        , 'actions': random_state.randint(env.action_space.n, size=batch_size).astype(np.int32)
+        , 'rewards': random_state.randn(batch_size).astype(np.float32)
+        , 'next_observations': random_state.randn(batch_size, *obs_shape).astype(np.float32)
+        , 'dones': (random_state.random_sample(batch_size) < .05).astype(np.uint8)
+    }
+
+def bench_update(config, nb_updates, nb_warmup):
+    # Latency of the learning updates alone, fed with the same minibatch
+    config['result_dir'] = tempfile.mkdtemp()
+    try:
+        env = gym.make(config['env_name'])
+        env.seed(0)
+        agent = make_agent(config, env)
+        feed_dict = agent.get_er_feed(get_memories(env, config['er_batch_size'], np.random.RandomState(0)))
+        for i in range(nb_warmup):
+            agent.er_update(feed_dict)
+
+        latencies = []
+        for i in range(nb_updates):
+            start_time = time.perf_counter()
+            agent.er_update(feed_dict)
+            latencies.append(time.perf_counter() - start_time)
+        agent.sess.close()
+    finally:
+        shutil.rmtree(config['result_dir'], ignore_errors=True)
+
+    return get_distribution([ latency * 1000 for latency in latencies ])
+
+def main(_):
+    base_config = get_base_config(flags)
+    base_config['env_name'] = flags.FLAGS.bench_env
+    base_config['er_in_graph'] = False
+    base_config['checkpoint_async'] = False
+
+    results = []
+    for agent_name in [name for name in flags.FLAGS.bench_agents.split(',') if name]:
+        for batch_size in [int(size) for size in flags.FLAGS.bench_batch_sizes.split(',') if size]:
+            result = {
+                'agent_name': agent_name
+                , 'er_batch_size': batch_size
+            }
+            for name, fused in [('separate', False), ('fused', True)]:
+                config = copy.deepcopy(base_config)
+                config['agent_name'] = agent_name
+                config['er_batch_size'] = batch_size
+                config['er_fused'] = fused
+                result[name + '_distribution'] = bench_update(config, flags.FLAGS.bench_updates, flags.FLAGS.bench_warmup)
+                result[name + '_ms'] = result[name + '_distribution']['median']
+            result['speedup'] = result['separate_ms'] / result['fused_ms']
+            print('{} with a batch of {}: {:.3f} ms separate, {:.3f} ms fused'.format(agent_name, batch_size, result['separate_ms'], result['fused_ms']))
+            results.append(result)
+
+    if not os.path.exists(flags.FLAGS.bench_dir):
+        os.makedirs(flags.FLAGS.bench_dir)
+    with open(flags.FLAGS.bench_dir + '/er_update.json', 'w') as f:
+        json.dump({
+            'machine': get_machine_info()
+            , 'nb_updates': flags.FLAGS.bench_updates
+            , 'results': results
+        }, f, indent=2)
+    write_markdown_table(flags.FLAGS.bench_dir + '/er_update.md', columns, results)
+
+
+if __name__ == '__main__':
+    tf.app.run()
@@ -0,0 +1,156 @@
+import copy, os, sys, time, json, shutil, tempfile, multiprocessing
+import concurrent.futures
+import numpy as np
+import tensorflow as tf
+import gym
+
+dir = os.path.dirname(os.path.realpath(__file__))
+sys.path.append(dir + '/..')
+
+# Importing main defines the training flags, their defaults are used to build the agents
+import main as rl_main
+from agents import make_agent, __all__ as agent_names
+from utils.phis import supported_envs
+from benchmarks.utils import get_machine_info, get_base_config, get_distribution, write_markdown_table
+
+flags = tf.app.flags
+flags.DEFINE_integer('bench_seeds', 5, 'Number of seeds trained for each agent and environment')
+flags.DEFINE_integer('bench_max_episodes', 1000, 'Maximum number of episodes of a run not reaching the threshold')
+flags.DEFINE_string('bench_agents', '', 'Comma separated agents to benchmark (all the agents by default)')
+flags.DEFINE_string('bench_envs', '', 'Comma separated environments to benchmark (all the supported ones by default)')
+flags.DEFINE_string('bench_dir', dir + '/../results/benchmarks/sample_efficiency', 'Directory of the reports, one per commit')
+
+# An environment is solved when the mean score over the last 100 episodes reaches its threshold
+solve_window = 100
+solve_thresholds = {
+    'CartPole-v0': 195.
+    , 'CartPole-v1': 475.
+    , 'MountainCar-v0': -110.
+    , 'Acrobot-v1': -100.
+}
+
+columns = [
+    ('Agent', 'agent_name', '{}')
+    , ('Env', 'env_name', '{}')
+    , ('Solved', 'solved', '{}')
+    , ('Episodes to threshold', 'episodes_to_threshold', '{}')
+    , ('Seconds to threshold', 'seconds_to_threshold', '{}')
+    , ('Final score', 'final_score', '{}')
+]
+
+def format_distribution(distribution, fmt='{:.0f}'):
+    if distribution is None:
+        return '-'
+
+    return (fmt + ' [' + fmt + ', ' + fmt + ']').format(distribution['median'], distribution['q1'], distribution['q3'])
+
+def run_seed(config):
+    result = {
+        'agent_name': config['agent_name']
+        , 'env_name': config['env_name']
+        , 'seed': config['random_seed']
+    }
+    config['result_dir'] = tempfile.mkdtemp()
+    try:
+        np.random.seed(config['random_seed'])
+        start_time = time.perf_counter()
+        env = gym.make(config['env_name'])
+        env.seed(config['random_seed'])
+        agent = make_agent(config, env)
+        scores = agent.train(save_every=-1)
+        seconds = time.perf_counter() - start_time
+
+        solved = agent.stop_reason == 'solved'
+        result.update({
+            'solved': solved
+            , 'episodes': len(scores)
+            , 'seconds': seconds
+            , 'episodes_to_threshold': len(scores) if solved else None
+            , 'seconds_to_threshold': seconds if solved else None
+            , 'final_score': float(np.mean(scores[-solve_window:]))
+        })
+    except:
+        result.update({
+            'error': str(sys.exc_info()[0])
+            , 'error_message': str(sys.exc_info()[1])
+        })
+
+    shutil.rmtree(config['result_dir'], ignore_errors=True)
+
+    return result
+
+def summarize(runs):
+    summary = {
+        'agent_name': runs[0]['agent_name']
+        , 'env_name': runs[0]['env_name']
+        , 'nb_seeds': len(runs)
+        , 'nb_errors': len([run for run in runs if 'error' in run])
+    }
+    runs = [run for run in runs if 'error' not in run]
+    solved_runs = [run for run in runs if run['solved']]
+    summary.update({
+        'nb_solved': len(solved_runs)
+        , 'episodes_to_threshold': get_distribution([run['episodes_to_threshold'] for run in solved_runs])
+        , 'seconds_to_threshold': get_distribution([run['seconds_to_threshold'] for run in solved_runs])
+        , 'final_score': get_distribution([run['final_score'] for run in runs])
+    })
+
+    return summary
+
+def main(_):
+    base_config = get_base_config(flags)
+    base_config['max_iter'] = flags.FLAGS.bench_max_episodes
+    base_config['stop_window'] = solve_window
+
+    bench_agents = [name for name in flags.FLAGS.bench_agents.split(',') if name] or [name for name in agent_names if name != 'BasicAgent']
+    bench_envs = [name for name in flags.FLAGS.bench_envs.split(',') if name] or supported_envs
+
+    futures = {}
+    with concurrent.futures.ProcessPoolExecutor(min(multiprocessing.cpu_count(), base_config['nb_process'])) as executor:
+        for env_name in bench_envs:
+            for agent_name in bench_agents:
+                for seed in range(flags.FLAGS.bench_seeds):
+                    config = copy.deepcopy(base_config)
+                    config['agent_name'] = agent_name
+                    config['env_name'] = env_name
+                    config['random_seed'] = seed
+                    config['stop_score'] = solve_thresholds[env_name]
+                    futures.setdefault((agent_name, env_name), []).append(executor.submit(run_seed, config))
+        concurrent.futures.wait([future for group in futures.values() for future in group])
+
+    runs = []
+    summaries = []
+    for key, group in futures.items():
+        group_runs = [future.result() for future in group]
+        runs += group_runs
+        summaries.append(summarize(group_runs))
+        print('{} on {}: solved {}/{}'.format(key[0], key[1], summaries[-1]['nb_solved'], summaries[-1]['nb_seeds']))
+
+    # Reports are stored per commit to follow the convergence speed of the agents through the history
+    machine = get_machine_info()
+    report_name = machine['commit'] + ('-dirty' if machine['dirty'] else '')
+    if not os.path.exists(flags.FLAGS.bench_dir):
+        os.makedirs(flags.FLAGS.bench_dir)
+    with open(flags.FLAGS.bench_dir + '/' + report_name + '.json', 'w') as f:
+        json.dump({
+            'machine': machine
+            , 'nb_seeds': flags.FLAGS.bench_seeds
+            , 'max_episodes': flags.FLAGS.bench_max_episodes
+            , 'thresholds': solve_thresholds
+            , 'summaries': summaries
+            , 'runs': runs
+        }, f, indent=2)
+
+    rows = [{
+        'agent_name': summary['agent_name']
+        , 'env_name': summary['env_name']
+        , 'solved': '%d/%d' % (summary['nb_solved'], summary['nb_seeds'])
+        , 'episodes_to_threshold': format_distribution(summary['episodes_to_threshold'])
+        , 'seconds_to_threshold': format_distribution(summary['seconds_to_threshold'], '{:.1f}')
+        , 'final_score': format_distribution(summary['final_score'], '{:.1f}')
+    } for summary in summaries]
+    write_markdown_table(flags.FLAGS.bench_dir + '/' + report_name + '.md', columns, rows)
+
+
+if __name__ == '__main__':
+    tf.app.run()
@@ -0,0 +1,145 @@
+import copy, os, sys, time, json, shutil, tempfile
+import concurrent.futures
+import tensorflow as tf
+import gym
+
+dir = os.path.dirname(os.path.realpath(__file__))
+sys.path.append(dir + '/..')
+
+# Importing main defines the training flags, their defaults are used to build the agents
+import main as rl_main
+from agents import make_agent, __all__ as agent_names
+from utils.phis import supported_envs
+from benchmarks.utils import get_peak_rss_mb, get_machine_info, get_base_config, get_distribution, write_markdown_table
+
+flags = tf.app.flags
+flags.DEFINE_integer('bench_steps', 2000, 'Number of environment steps of training measured for each agent')
+flags.DEFINE_integer('bench_repeats', 3, 'Number of measures of each agent, the reports use their median')
+flags.DEFINE_string('bench_agents', '', 'Comma separated agents to benchmark (all the agents by default)')
+flags.DEFINE_string('bench_envs', '', 'Comma separated environments to benchmark (all the supported ones by default)')
+flags.DEFINE_string('bench_dir', dir + '/../results/benchmarks/throughput-' + str(int(time.time())), 'Directory of the JSON and Markdown reports')
+
+columns = [
+    ('Agent', 'agent_name', '{}')
+    , ('Env', 'env_name', '{}')
+    , ('Construction (s)', 'construction_seconds', '{:.2f}')
+    , ('Steps/s', 'steps_per_sec', '{:.1f}')
+    , ('Updates/s', 'updates_per_sec', '{:.1f}')
+    , ('Raw env steps/s', 'env_steps_per_sec', '{:.0f}')
+    , ('Peak RSS (MB)', 'peak_rss_mb', '{:.0f}')
+]
+
+def measure_env(env_name, nb_steps):
+    # Throughput of the environment alone with a random policy, the upper bound of any agent
+    env = gym.make(env_name)
+    env.seed(0)
+    env.reset()
+    start_time = time.perf_counter()
+    for i in range(nb_steps):
+        obs, reward, done, info = env.step(env.action_space.sample())
+        if done:
+            env.reset()
+
+    return nb_steps / (time.perf_counter() - start_time)
+
+def bench_agent(config, nb_steps):
+    result = {
+        'agent_name': config['agent_name']
+        , 'env_name': config['env_name']
+    }
+    config['result_dir'] = tempfile.mkdtemp()
+    try:
+        result['env_steps_per_sec'] = measure_env(config['env_name'], nb_steps)
+
+        start_time = time.perf_counter()
+        env = gym.make(config['env_name'])
+        env.seed(0)
+        agent = make_agent(config, env)
+        result['construction_seconds'] = time.perf_counter() - start_time
+
+        agent.train(save_every=-1)
+        report = agent.profile_report
+        result.update({
+            'steps': report['steps']
+            , 'episodes': report['episodes']
+            , 'seconds': report['seconds']
+            , 'steps_per_sec': report['steps_per_sec']
+            , 'updates': report['updates']
+            , 'updates_per_sec': report['updates_per_sec']
+            , 'sess_runs': report['sess_runs']
+            , 'phases': report['phases']
+        })
+    except:
+        result.update({
+            'error': str(sys.exc_info()[0])
+            , 'error_message': str(sys.exc_info()[1])
+        })
+    result['peak_rss_mb'] = get_peak_rss_mb()
+
+    shutil.rmtree(config['result_dir'], ignore_errors=True)
+
+    return result
+
+# Metrics aggregated over the repetitions of a measure
+metrics = ['construction_seconds', 'steps_per_sec', 'updates_per_sec', 'env_steps_per_sec', 'peak_rss_mb']
+
+def aggregate(repeats):
+    errors = [repeat for repeat in repeats if 'error' in repeat]
+    if len(errors) > 0:
+        result = copy.deepcopy(errors[0])
+        result['repeats'] = repeats
+        return result
+
+    result = {
+        'agent_name': repeats[0]['agent_name']
+        , 'env_name': repeats[0]['env_name']
+        , 'repeats': repeats
+    }
+    for metric in metrics:
+        result[metric + '_distribution'] = get_distribution([repeat[metric] for repeat in repeats])
+        result[metric] = result[metric + '_distribution']['median']
+
+    return result
+
+def main(_):
+    base_config = get_base_config(flags)
+    base_config['profile'] = True
+    base_config['max_iter'] = sys.maxsize
+    base_config['max_steps'] = flags.FLAGS.bench_steps
+
+    bench_agents = [name for name in flags.FLAGS.bench_agents.split(',') if name] or [name for name in agent_names if name != 'BasicAgent']
+    bench_envs = [name for name in flags.FLAGS.bench_envs.split(',') if name] or supported_envs
+
+    results = []
+    for env_name in bench_envs:
+        for agent_name in bench_agents:
+            config = copy.deepcopy(base_config)
+            config['agent_name'] = agent_name
+            config['env_name'] = env_name
+
+            # Each measure is made in a fresh process so that its peak RSS is its own
+            repeats = []
+            for repeat_id in range(flags.FLAGS.bench_repeats):
+                with concurrent.futures.ProcessPoolExecutor(1) as executor:
+                    repeats.append(executor.submit(bench_agent, copy.deepcopy(config), flags.FLAGS.bench_steps).result())
+            result = aggregate(repeats)
+            if 'error' in result:
+                print('{} on {}: {} {}'.format(agent_name, env_name, result['error'], result['error_message']))
+            else:
+                print('{} on {}: {:.1f} steps/s, {:.1f} updates/s'.format(agent_name, env_name, result['steps_per_sec'], result['updates_per_sec']))
+            results.append(result)
+
+    if not os.path.exists(flags.FLAGS.bench_dir):
+        os.makedirs(flags.FLAGS.bench_dir)
+    with open(flags.FLAGS.bench_dir + '/throughput.json', 'w') as f:
+        json.dump({
+            'machine': get_machine_info()
+            , 'nb_steps': flags.FLAGS.bench_steps
+            , 'nb_repeats': flags.FLAGS.bench_repeats
+            , 'results': results
+        }, f, indent=2)
+    write_markdown_table(flags.FLAGS.bench_dir + '/throughput.md', columns, results)
+
+
+if __name__ == '__main__':
+    tf.app.run()
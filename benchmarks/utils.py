@@ -0,0 +1,77 @@
+import os, sys, platform, resource, subprocess, multiprocessing
+import numpy as np
+import tensorflow as tf
+
+dir = os.path.dirname(os.path.realpath(__file__))
+
+def get_peak_rss_mb():
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes on Linux
+    if sys.platform == 'darwin':
+        return peak_rss / 1024 / 1024
+    return peak_rss / 1024
+
+def get_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', 'HEAD'], cwd=dir, stderr=subprocess.DEVNULL).decode('utf-8').strip()
+    except:
+        return 'unknown'
+
+def is_dirty():
+    try:
+        return len(subprocess.check_output(['git', 'status', '--porcelain', '--untracked-files=no'], cwd=dir, stderr=subprocess.DEVNULL).strip()) > 0
+    except:
+        return False
+
+def get_machine_info():
+    return {
+        'commit': get_commit()
+        , 'dirty': is_dirty()
+        , 'platform': platform.platform()
+        , 'python': platform.python_version()
+        , 'tensorflow': tf.__version__
+        , 'cpu_count': multiprocessing.cpu_count()
+    }
+
+def get_base_config(flags):
+    # The training flags defaults of main.py are the base config of every benchmarked agent
+    config = flags.FLAGS.__flags.copy()
+    config['fixed_params'] = {}
+    config['random_seed'] = 0
+    config['debug'] = False
+    config['best'] = True
+    config['trial_cache'] = ''
+
+    return config
+
+def get_distribution(values):
+    if len(values) == 0:
+        return None
+
+    q1, median, q3 = np.percentile(values, [25, 50, 75])
+    return {
+        'median': float(median)
+        , 'q1': float(q1)
+        , 'q3': float(q3)
+        , 'min': float(np.min(values))
+        , 'max': float(np.max(values))
+        , 'count': len(values)
+    }
+
+def write_markdown_table(path, columns, rows):
+    # columns: list of (title, key, format)
+    lines = [
+        '| ' + ' | '.join(title for title, key, fmt in columns) + ' |'
+        , '|' + '|'.join('---' for column in columns) + '|'
+    ]
+    for row in rows:
+        cells = []
+        for title, key, fmt in columns:
+            if 'error' in row and key not in row:
+                cells.append('error')
+            else:
+                cells.append(fmt.format(row[key]))
+        lines.append('| ' + ' | '.join(cells) + ' |')
+
+    with open(path, 'w') as f:
+        f.write('\n'.join(lines) + '\n')
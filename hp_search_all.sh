@@ -1,7 +1,7 @@
 agentList="
   TabularMCAgent
   TabularTD0Agent
-  TabularTDNAgent
+  TabularNStepTD0Agent
   TabularTDLambdaAgent
   TabularQAgent
   TabularQLambdaBackwardAgent
@@ -14,7 +14,7 @@ agentList="
   DeepTDAgent
   DQNAgent
   DDQNAgent
-  
+
   DeepMCPolicyAgent
   MCActorCriticAgent
   ActorCriticAgent
@@ -23,5 +23,5 @@ agentList="
 "
 
 for agent in $agentList; do
-  python3 main.py --fullsearch --agent_name "$agent" --nb_process 3
+  python3 main.py --fullsearch --agent_name "$agent" --nb_process 3 --random_seed 0
 done
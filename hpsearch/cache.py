@@ -0,0 +1,105 @@
+import os, json, hashlib, sqlite3, shutil, glob, time
+import tensorflow as tf
+
+from hpsearch.utils import to_json
+
+# Those config entries only drive the search itself, they have no impact on the trained agent
+excluded_keys = [
+    'result_dir', 'result_dir_prefix', 'budget', 'max_iter', 'max_steps', 'max_seconds', 'id', 'fixed_params', 'debug', 'dry_run'
+    , 'nb_process', 'games_per_epoch', 'trial_cache', 'play', 'play_nb', 'export', 'profile', 'trace_episodes', 'er_memmap', 'er_fused'
+    , 'hyperband', 'fullsearch', 'randomsearch', 'pbt', 'tpe'
+    # Derived from the env_name when the tabular agents are created
+    , 'nb_state', 'phi'
+]
+excluded_prefixes = ['pbt_', 'tpe_']
+
+def get_config_key(config):
+    trial_config = {
+        key: value for key, value in config.items()
+        if key not in excluded_keys and not any(key.startswith(prefix) for prefix in excluded_prefixes)
+    }
+    canonical = json.dumps(trial_config, sort_keys=True, default=to_json)
+
+    return hashlib.sha1(canonical.encode('utf-8')).hexdigest()
+
+def copy_checkpoint(src_dir, dst_dir):
+    checkpoint = tf.train.get_checkpoint_state(src_dir)
+    if checkpoint is None:
+        return False
+
+    if not os.path.exists(dst_dir):
+        os.makedirs(dst_dir)
+    for filename in glob.glob(checkpoint.model_checkpoint_path + '.*'):
+        shutil.copy(filename, dst_dir)
+    tf.train.update_checkpoint_state(dst_dir, os.path.join(dst_dir, os.path.basename(checkpoint.model_checkpoint_path)))
+
+    return True
+
+def get_trial_cache(config):
+    if not config.get('trial_cache'):
+        return None
+
+    return TrialCache(config['trial_cache'])
+
+class TrialCache:
+    """
+    Persistent cache of trial results, keyed by the agent config and the training budget.
+    """
+    def __init__(self, path):
+        self.path = path
+        self.checkpoints_dir = os.path.splitext(path)[0] + '-checkpoints'
+
+        if not os.path.exists(os.path.dirname(os.path.abspath(path))):
+            os.makedirs(os.path.dirname(os.path.abspath(path)))
+        with self._connect() as conn:
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS trials ('
+                + 'key TEXT PRIMARY KEY, config_key TEXT, budget INTEGER, result TEXT, checkpoint_dir TEXT, created REAL'
+                + ')'
+            )
+            conn.execute('CREATE INDEX IF NOT EXISTS trials_config_key ON trials (config_key)')
+
+    def _connect(self):
+        # Trials run in parallel processes, we wait for the other writers instead of failing
+        return sqlite3.connect(self.path, timeout=60)
+
+    def get(self, config, budget):
+        config_key = get_config_key(config)
+        with self._connect() as conn:
+            row = conn.execute('SELECT result FROM trials WHERE key = ?', (config_key + '-' + str(budget),)).fetchone()
+
+        return None if row is None else json.loads(row[0])
+
+    def get_warm_start(self, config, budget):
+        # Returns the biggest cached budget smaller than the requested one having a checkpoint,
+        # with the scores of its games: the continued trial is scored on the whole budget.
+        # Trials cached without their scores can not be continued
+        config_key = get_config_key(config)
+        with self._connect() as conn:
+            rows = conn.execute(
+                'SELECT budget, checkpoint_dir, result FROM trials WHERE config_key = ? AND budget < ? AND checkpoint_dir IS NOT NULL ORDER BY budget DESC'
+                , (config_key, budget)
+            ).fetchall()
+
+        for warm_budget, checkpoint_dir, result in rows:
+            scores = json.loads(result).get('scores')
+            if scores is not None and tf.train.get_checkpoint_state(checkpoint_dir) is not None:
+                return warm_budget, checkpoint_dir, scores
+
+        return None
+
+    def put(self, config, budget, result, checkpoint_dir=None):
+        if 'error' in result:
+            return
+
+        config_key = get_config_key(config)
+        key = config_key + '-' + str(budget)
+        if checkpoint_dir is not None:
+            cached_checkpoint_dir = os.path.join(self.checkpoints_dir, key)
+            checkpoint_dir = cached_checkpoint_dir if copy_checkpoint(checkpoint_dir, cached_checkpoint_dir) else None
+
+        with self._connect() as conn:
+            conn.execute(
+                'INSERT OR REPLACE INTO trials (key, config_key, budget, result, checkpoint_dir, created) VALUES (?, ?, ?, ?, ?, ?)'
+                , (key, config_key, budget, json.dumps(result, default=to_json), checkpoint_dir, time.time())
+            )
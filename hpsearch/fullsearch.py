@@ -9,7 +9,9 @@ sys.path.append(dir + '/..')
 
 from agents import make_agent, get_agent_class
 from hpsearch.hyperband import Hyperband, run_params
-from hpsearch.utils import get_score_stat
+from hpsearch.utils import get_score_stat, set_budget
+from hpsearch.cache import get_trial_cache
+from hpsearch.journal import Journal
 
 
 def exec_first_pass(counter, config, params):
@@ -17,6 +19,12 @@ def exec_first_pass(counter, config, params):
 
     config['result_dir'] = config['result_dir_prefix'] + '/run-' + str(counter).zfill(3)
 
+    cache = get_trial_cache(config)
+    if cache is not None:
+        result = cache.get(config, config['budget'])
+        if result is not None:
+            return result
+
     try:
         # We create the agent
         env = gym.make(config['env_name'])
@@ -29,7 +37,11 @@ def exec_first_pass(counter, config, params):
             'params': params
             , 'mean_score': mean_score
             , 'stddev_score': stddev_score
+            , 'stop_reason': agent.stop_reason
         }
+        agent.close()
+        if cache is not None:
+            cache.put(config, config['budget'], result)
 
         seconds = int( round( time.time() - start_time ))
         print("Run: {} | {}, mean_score {}".format(counter, time.ctime(), mean_score))
@@ -55,27 +67,39 @@ def first_pass(config):
     if config['debug']:
         print('Removing fixed params')
     config["fixed_params"] = {}
-    config['max_iter'] = 5 if config['debug'] else 150
+    set_budget(config, 5 if config['debug'] else 150)
     if config['debug']:
-        print('Overriding max_iter params to %d' % config['max_iter'])
+        print('Overriding the budget to %d games' % config['budget'])
     dry_run = True if config['debug'] else False
 
     get_params = get_agent_class(config).get_random_config
 
-    results = []
-    futures = []
-    with concurrent.futures.ProcessPoolExecutor(min(multiprocessing.cpu_count(), config['nb_process'])) as executor:
+    # The configurations and the finished runs are journaled to resume the pass after a crash,
+    # the failed runs are run again
+    journal = Journal(config['result_dir_prefix'] + '/journal.jsonl')
+    drawn_configs = journal.get('configs')
+    if len(drawn_configs) > 0:
+        all_params = drawn_configs[0]['configs']
+    else:
         nb_config = 5 if config['debug'] else 1000
-        for i in range(nb_config): 
-            params = get_params()
+        all_params = [ get_params() for i in range(nb_config) ]
+        journal.append({ 'type': 'configs', 'configs': all_params })
+    results = { entry['counter']: entry['result'] for entry in journal.get('run') if 'error' not in entry['result'] }
+
+    futures = {}
+    with concurrent.futures.ProcessPoolExecutor(min(multiprocessing.cpu_count(), config['nb_process'])) as executor:
+        for i, params in enumerate(all_params):
+            if i in results:
+                continue
             config.update(params)
 
-            futures.append(executor.submit(exec_first_pass, i, copy.deepcopy(config), params))
-        concurrent.futures.wait(futures)
-    
-    results = []
-    for future in futures:
-        results.append(future.result())
+            futures[executor.submit(exec_first_pass, i, copy.deepcopy(config), params)] = i
+
+        for future in concurrent.futures.as_completed(futures):
+            results[futures[future]] = future.result()
+            journal.append({ 'type': 'run', 'counter': futures[future], 'result': results[futures[future]] })
+
+    results = list(results.values())
         
     return {
         'results': sorted(results, key=lambda result: result['mean_score'], reverse=True)
@@ -86,6 +110,12 @@ def exec_second_pass(config):
 
     config['result_dir'] = config['result_dir_prefix'] + '/lr-' + str(config['lr'])
 
+    cache = get_trial_cache(config)
+    if cache is not None:
+        result = cache.get(config, config['budget'])
+        if result is not None:
+            return result
+
     try:
         # We create the agent
         env = gym.make(config['env_name'])
@@ -98,7 +128,11 @@ def exec_second_pass(config):
             'lr': config['lr']
             , 'mean_score': mean_score
             , 'stddev_score': stddev_score
+            , 'stop_reason': agent.stop_reason
         }
+        agent.close()
+        if cache is not None:
+            cache.put(config, config['budget'], result)
 
         seconds = int( round( time.time() - start_time ))
         print("Run with lr: {} | {}".format(config['lr'], time.ctime()))
@@ -119,7 +153,13 @@ def second_pass(config, best_agent_config):
 
     config.update(best_agent_config)
     config['result_dir_prefix'] = config['result_dir_prefix'] + '/second-pass'
-    config['max_iter'] = 5 if config['debug'] else 500
+    set_budget(config, 5 if config['debug'] else 500)
+
+    # The finished runs are journaled to resume the pass after a crash, the failed runs are run again
+    journal = Journal(config['result_dir_prefix'] + '/journal.jsonl')
+    results = [ entry['result'] for entry in journal.get('run') if 'error' not in entry['result'] ]
+    done_lrs = [ result['lr'] for result in results ]
+
     futures = []
     with concurrent.futures.ProcessPoolExecutor(min(multiprocessing.cpu_count(), config['nb_process'])) as executor:
         if config['debug']:
@@ -127,13 +167,14 @@ def second_pass(config, best_agent_config):
         else:
             lrs = [1e-4, 2e-4, 3e-4, 4e-4, 5e-4, 6e-4, 7e-4, 8e-4, 9e-4, 1e-3, 2e-3, 3e-3, 4e-3, 5e-3, 6e-3, 7e-3, 8e-3, 9e-3, 1e-2, 2e-2, 3e-2, 4e-2, 5e-2, 6e-2, 7e-2, 8e-2, 9e-2, 1e-1, 2e-1, 3e-1, 4e-1, 5e-1, 6e-1, 7e-1, 8e-1, 9e-1, 1]
         for lr in lrs:
+            if lr in done_lrs:
+                continue
             config['lr'] = lr
             futures.append(executor.submit(exec_second_pass, copy.deepcopy(config)))
-        concurrent.futures.wait(futures)
 
-    results = []
-    for future in futures:
-        results.append(future.result())
+        for future in concurrent.futures.as_completed(futures):
+            results.append(future.result())
+            journal.append({ 'type': 'run', 'result': results[-1] })
 
 
     return {
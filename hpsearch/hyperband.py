@@ -11,7 +11,7 @@
 #                       9     9         3     27        1     81
 #                       3     27        1     81
 #                       1     81
-import gym, os, shutil, re, multiprocessing, json, copy
+import gym, os, sys, shutil, re, multiprocessing, json, copy
 import concurrent.futures
 import numpy as np
 
@@ -20,7 +20,9 @@ from math import log, ceil
 from time import time, ctime
 
 from agents import make_agent
-from hpsearch.utils import get_score_stat
+from hpsearch.utils import get_scores, get_score_stat, set_budget
+from hpsearch.cache import get_trial_cache, copy_checkpoint
+from hpsearch.journal import Journal
 
 dir = os.path.dirname(os.path.realpath(__file__))
 
@@ -60,7 +62,12 @@ class Hyperband:
         print("*** max_iter: %d, eta: %d, s_max: %d, B %d" % (self.max_iter, self.eta, self.s_max, self.B))
 
     # can be called multiple times
+    # if a journal exists in the result_dir_prefix, the finished runs are not executed again
     def run( self, main_config, skip_last = 0, dry_run = False ):
+        journal = None if dry_run else Journal(main_config['result_dir_prefix'] + '/hb_journal.jsonl')
+        if journal is not None:
+            self.counter = max([self.counter] + [ entry['result']['counter'] for entry in journal.get('run') ])
+
         for s in reversed( range( self.s_max + 1 )):
 
             # initial number of configurations
@@ -69,10 +76,16 @@ class Hyperband:
             # initial number of iterations per config
             r = self.max_iter * self.eta ** ( -s )
 
-            # n random configurations
-            T = [ self.get_params(main_config['fixed_params']) for i in range( n )]
-            for i, params in enumerate(T):
-                params['id'] = i
+            # n random configurations, unless they were already drawn before a restart
+            brackets = [] if journal is None else journal.get('bracket', s=s)
+            if len(brackets) > 0:
+                T = brackets[0]['configs']
+            else:
+                T = [ self.get_params(main_config['fixed_params']) for i in range( n )]
+                for i, params in enumerate(T):
+                    params['id'] = i
+                if journal is not None:
+                    journal.append({ 'type': 'bracket', 's': s, 'configs': T })
 
             for i in range(( s + 1 ) - int( skip_last )): # changed from s + 1
 
@@ -89,18 +102,34 @@ class Hyperband:
                 val_losses = []
                 early_stops = []
 
+                # runs of this set finished before a restart, the failed ones are run again
+                set_results = {} if journal is None else { entry['id']: entry['result'] for entry in journal.get('run', s=s, i=i) if 'error' not in entry['result'] }
+
                 futures = []
                 with concurrent.futures.ProcessPoolExecutor(min(multiprocessing.cpu_count(), main_config['nb_process'])) as executor:
                     for t in T:
+                        if t['id'] in set_results:
+                            continue
                         self.counter += 1
                         futures.append(executor.submit(execute_run, self.counter, self.try_params, n_iterations, t, main_config, dry_run))
-                    concurrent.futures.wait(futures)
 
-                for future in futures:
-                    counter, result, n_iterations, t, seconds = future.result()
+                    for future in concurrent.futures.as_completed(futures):
+                        counter, result, n_iterations, t, seconds = future.result()
+
+                        assert( type( result ) == dict )
+                        assert( 'loss' in result )
+
+                        result['counter'] = counter
+                        result['seconds'] = seconds
+                        result['params'] = t
+                        result['iterations'] = n_iterations
 
-                    assert( type( result ) == dict )
-                    assert( 'loss' in result )
+                        set_results[t['id']] = result
+                        if journal is not None:
+                            journal.append({ 'type': 'run', 's': s, 'i': i, 'id': t['id'], 'result': result })
+
+                for t in T:
+                    result = set_results[t['id']]
 
                     loss = result['loss']
                     val_losses.append( loss )
@@ -112,12 +141,7 @@ class Hyperband:
                     # could do it be checking results each time, but hey
                     if loss < self.best_loss:
                         self.best_loss = loss
-                        self.best_counter = counter
-
-                    result['counter'] = counter
-                    result['seconds'] = seconds
-                    result['params'] = t
-                    result['iterations'] = n_iterations
+                        self.best_counter = result['counter']
 
                     self.results.append( result )
 
@@ -141,12 +165,29 @@ def run_params(nb_epochs, params, main_config):
     config = copy.deepcopy(main_config)
     config.update(params)
     config['result_dir'] = config['result_dir_prefix'] + '/' + config['env_name'] + '/' + config['agent_name'] + '/run-' + str(config['id']).zfill(3)
-    config['max_iter'] = int(nb_epochs) * config['games_per_epoch']
+    budget = int(nb_epochs) * config['games_per_epoch']
+    set_budget(config, budget)
+
+    cache = get_trial_cache(config)
+    if cache is not None:
+        result = cache.get(config, budget)
+        if result is not None:
+            return result
 
     # If we are reusing a configuration, we remove its folder before next training
     if os.path.exists(config['result_dir']):
         shutil.rmtree(config['result_dir'])
 
+    # A checkpoint trained with a smaller budget is restored by the agent, we only train for the remaining
+    # games and the scores of the games played before are added to the ones of the continuation
+    warm_scores = []
+    if cache is not None:
+        warm_start = cache.get_warm_start(config, budget)
+        if warm_start is not None:
+            warm_budget, checkpoint_dir, warm_scores = warm_start
+            copy_checkpoint(checkpoint_dir, config['result_dir'])
+            set_budget(config, budget - warm_budget)
+
     try:
         # We create the agent
         env = gym.make(config['env_name'])
@@ -155,12 +196,17 @@ def run_params(nb_epochs, params, main_config):
         # We train the agent
         agent.train(save_every=-1)
         agent.save()
-        mean_score, stddev_score = get_score_stat(config['result_dir'])
+        mean_score, stddev_score = get_score_stat(config['result_dir'], warm_scores)
         result = {
             'loss': -mean_score
             , 'mean_score': mean_score
             , 'stddev_score': stddev_score
+            , 'stop_reason': agent.stop_reason
         }
+        agent.close()
+        if cache is not None:
+            scores = warm_scores + get_scores(config['result_dir'])
+            cache.put(config, budget, dict(result, scores=scores), checkpoint_dir=config['result_dir'])
     except:
         result = {
             'loss': 0
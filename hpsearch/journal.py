@@ -0,0 +1,38 @@
+import os, json
+
+from hpsearch.utils import to_json
+
+class Journal:
+    """
+    Append-only log of a search, one JSON entry per line, used to resume a crashed search.
+    """
+    def __init__(self, path):
+        self.path = path
+        self.entries = []
+
+        if not os.path.exists(os.path.dirname(os.path.abspath(path))):
+            os.makedirs(os.path.dirname(os.path.abspath(path)))
+
+        if os.path.isfile(path):
+            with open(path, 'r') as f:
+                content = f.read()
+            # A crash can leave a partially written entry at the end of the file
+            if not content.endswith('\n'):
+                content = content[:content.rfind('\n') + 1]
+                with open(path, 'w') as f:
+                    f.write(content)
+            self.entries = [json.loads(line) for line in content.splitlines() if line]
+
+    def get(self, entry_type, **filters):
+        return [
+            entry for entry in self.entries
+            if entry['type'] == entry_type and all(entry.get(key) == value for key, value in filters.items())
+        ]
+
+    def append(self, entry):
+        line = json.dumps(entry, default=to_json)
+        with open(self.path, 'a') as f:
+            f.write(line + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+        self.entries.append(json.loads(line))
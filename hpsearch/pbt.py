@@ -0,0 +1,130 @@
+import copy, os, sys, multiprocessing, time
+import concurrent.futures
+import numpy as np
+import gym
+
+dir = os.path.dirname(os.path.realpath(__file__))
+sys.path.append(dir + '/..')
+
+from agents import make_agent, get_agent_class
+from hpsearch.utils import get_params_bounds, set_budget
+
+# Those hyperparameters define the shape of the agent variables,
+# perturbing them would prevent any weights transfer between members
+frozen_params = ['nb_units']
+
+def exec_member(member_id, round_id, config, params, weights, save):
+    start_time = time.time()
+
+    config.update(params)
+    config['result_dir'] = config['result_dir_prefix'] + '/member-' + str(member_id).zfill(3)
+
+    try:
+        # We create the agent and load the weights inherited from the previous round
+        env = gym.make(config['env_name'])
+        agent = make_agent(config, env)
+        if weights is not None:
+            agent.set_weights(weights)
+
+        # We train the agent until it is ready for the next exploit/explore step
+        scores = agent.train(save_every=-1)
+        if save:
+            agent.save()
+        result = {
+            'member_id': member_id
+            , 'params': params
+            , 'mean_score': np.mean(scores)
+            , 'stddev_score': np.sqrt(np.var(scores))
+            , 'stop_reason': agent.stop_reason
+            , 'weights': agent.get_weights()
+        }
+        agent.close()
+
+        seconds = int( round( time.time() - start_time ))
+        print("Round: {}, member: {} | {}, mean_score {}".format(round_id, member_id, time.ctime(), result['mean_score']))
+        print("%d seconds." % seconds )
+    except:
+        result = {
+            'member_id': member_id
+            , 'params': params
+            , 'mean_score': 0
+            , 'stddev_score': 0
+            , 'weights': None
+            , 'error': str(sys.exc_info()[0])
+            , 'error_message': str(sys.exc_info()[1])
+        }
+
+    return result
+
+def perturb(params, get_params, fixed_params, bounds, resample_prob=.25):
+    new_params = copy.deepcopy(params)
+    prior_params = get_params(fixed_params)
+    for key, value in params.items():
+        if key in fixed_params or key in frozen_params or key not in bounds:
+            continue
+
+        if np.random.random() < resample_prob:
+            new_params[key] = prior_params[key]
+        else:
+            factor = 0.8 if np.random.random() < .5 else 1.2
+            low, high = bounds[key]
+            if isinstance(value, (int, np.integer)):
+                new_params[key] = int(min(max(round(value * factor), low), high))
+            else:
+                new_params[key] = float(min(max(value * factor, low), high))
+
+    return new_params
+
+def exploit_and_explore(results, population, weights, get_params, fixed_params, bounds, quantile):
+    # Errored members are always ranked last
+    ranking = sorted(range(len(results)), key=lambda i: ('error' not in results[i], results[i]['mean_score']), reverse=True)
+    nb_members = max(1, int(len(ranking) * quantile))
+    top_members = ranking[:nb_members]
+    bottom_members = ranking[-nb_members:]
+
+    population = list(population)
+    weights = list(weights)
+    for member_id in bottom_members:
+        if member_id in top_members:
+            continue
+        source_id = top_members[np.random.randint(len(top_members))]
+        population[member_id] = perturb(population[source_id], get_params, fixed_params, bounds)
+        weights[member_id] = weights[source_id]
+
+    return population, weights
+
+def search(config):
+    config = copy.deepcopy(config)
+
+    population_size = 4 if config['debug'] else config['pbt_population']
+    nb_rounds = 2 if config['debug'] else config['pbt_rounds']
+    set_budget(config, 5 if config['debug'] else config['pbt_ready'])
+
+    get_params = get_agent_class(config).get_random_config
+    bounds = get_params_bounds(get_params, config['fixed_params'])
+
+    population = [ get_params(config['fixed_params']) for i in range(population_size) ]
+    weights = [ None ] * population_size
+    history = []
+    with concurrent.futures.ProcessPoolExecutor(min(multiprocessing.cpu_count(), config['nb_process'])) as executor:
+        for round_id in range(nb_rounds):
+            last_round = round_id == nb_rounds - 1
+
+            futures = []
+            for member_id in range(population_size):
+                futures.append(executor.submit(exec_member, member_id, round_id, copy.deepcopy(config), population[member_id], weights[member_id], last_round))
+            concurrent.futures.wait(futures)
+
+            results = [future.result() for future in futures]
+            weights = [result.pop('weights') for result in results]
+            history.append(results)
+
+            if not last_round:
+                population, weights = exploit_and_explore(
+                    results, population, weights, get_params, config['fixed_params'], bounds, config['pbt_quantile']
+                )
+
+    return {
+        'results': sorted(history[-1], key=lambda result: result['mean_score'], reverse=True)
+        , 'history': history
+    }
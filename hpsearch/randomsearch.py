@@ -8,7 +8,8 @@ dir = os.path.dirname(os.path.realpath(__file__))
 sys.path.append(dir + '/..')
 
 from agents import make_agent, get_agent_class
-from hpsearch.utils import get_score_stat
+from hpsearch.utils import get_score_stat, set_budget
+from hpsearch.cache import get_trial_cache
 
 
 def search(config):
@@ -19,7 +20,7 @@ def search(config):
     if config['debug']:
         print('*** Number of hyper-parameters: %d' % nb_hp_params)
 
-    config['max_iter'] = 5 if config['debug'] else 500
+    set_budget(config, 5 if config['debug'] else 500)
     futures = []
     with concurrent.futures.ProcessPoolExecutor(min(multiprocessing.cpu_count(), config['nb_process'])) as executor:
         nb_config = 5 if config['debug'] else 200 * nb_hp_params
@@ -45,6 +46,12 @@ def test_params(counter, config, params):
 
     config['result_dir'] = config['result_dir_prefix'] + '/run-' + str(counter).zfill(3)
 
+    cache = get_trial_cache(config)
+    if cache is not None:
+        result = cache.get(config, config['budget'])
+        if result is not None:
+            return result
+
     try:
         # We create the agent
         env = gym.make(config['env_name'])
@@ -57,7 +64,11 @@ def test_params(counter, config, params):
             'params': params
             , 'mean_score': mean_score
             , 'stddev_score': stddev_score
+            , 'stop_reason': agent.stop_reason
         }
+        agent.close()
+        if cache is not None:
+            cache.put(config, config['budget'], result)
 
         seconds = int( round( time.time() - start_time ))
         print("Run: {} | {}, mean_score {}".format(counter, time.ctime(), mean_score))
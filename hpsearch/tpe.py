@@ -0,0 +1,185 @@
+import copy, os, sys, multiprocessing, time, shutil
+import concurrent.futures
+import numpy as np
+import gym
+
+from math import ceil
+
+dir = os.path.dirname(os.path.realpath(__file__))
+sys.path.append(dir + '/..')
+
+from agents import make_agent, get_agent_class
+from hpsearch.utils import get_params_bounds, get_params_choices, set_budget
+
+# Tree-structured Parzen Estimator: completed trials are split between good and bad
+# ones, and we keep the candidate (sampled from the agent random config) maximising
+# the density ratio l(x) / g(x) of both Parzen estimators. The categorical
+# hyperparameters use the smoothed frequencies of their values in each group instead.
+
+def is_log_scaled(bounds):
+    low, high = bounds
+    return low > 0 and high / low > 100
+
+def parzen_log_density(points, candidates, bounds):
+    low, high = bounds
+    if is_log_scaled(bounds):
+        points, candidates, low, high = np.log(points), np.log(candidates), np.log(low), np.log(high)
+
+    nb_points = len(points)
+    bandwidth = max((high - low) * nb_points**(-1/5), 1e-12)
+    diffs = (candidates[:, None] - points[None, :]) / bandwidth
+    kde = np.mean(np.exp(-0.5 * diffs**2) / (np.sqrt(2 * np.pi) * bandwidth), 1)
+
+    # We mix the estimator with the uniform prior so that no region gets a null density
+    prior = 1. / (high - low)
+    return np.log(nb_points / (nb_points + 1) * kde + 1 / (nb_points + 1) * prior)
+
+def categorical_log_density(points, candidates, choices):
+    # Laplace smoothing, so that a value absent from the group keeps a non null probability
+    counts = [ sum(1 for point in points if point == candidate) for candidate in candidates ]
+    return np.log((np.array(counts, dtype=np.float64) + 1) / (len(points) + len(choices)))
+
+def suggest(results, get_params, fixed_params, bounds, nb_startup=20, gamma=.25, nb_candidates=24, choices={}):
+    candidates = [ get_params(fixed_params) for i in range(nb_candidates) ]
+    observations = [ result for result in results if 'error' not in result ]
+    if len(observations) < nb_startup:
+        return candidates[0]
+
+    observations = sorted(observations, key=lambda result: result['mean_score'], reverse=True)
+    nb_good = max(1, int(ceil(gamma * len(observations))))
+    good, bad = observations[:nb_good], observations[nb_good:]
+    # Both estimators need at least one point, the candidates are random until then
+    if len(good) == 0 or len(bad) == 0:
+        return candidates[0]
+
+    ratios = np.zeros(nb_candidates)
+    for key, key_bounds in bounds.items():
+        if key in fixed_params or key_bounds[0] >= key_bounds[1]:
+            continue
+        values = np.array([ candidate[key] for candidate in candidates ], dtype=np.float64)
+        good_values = np.array([ result['params'][key] for result in good ], dtype=np.float64)
+        bad_values = np.array([ result['params'][key] for result in bad ], dtype=np.float64)
+        ratios += parzen_log_density(good_values, values, key_bounds) - parzen_log_density(bad_values, values, key_bounds)
+    for key, key_choices in choices.items():
+        if key in fixed_params or len(key_choices) < 2:
+            continue
+        values = [ candidate[key] for candidate in candidates ]
+        good_values = [ result['params'][key] for result in good ]
+        bad_values = [ result['params'][key] for result in bad ]
+        ratios += categorical_log_density(good_values, values, key_choices) - categorical_log_density(bad_values, values, key_choices)
+
+    return candidates[int(np.argmax(ratios))]
+
+def median_stop(intermediates, counter, step, min_trials=5):
+    # Median stopping rule: a trial is pruned if its running score is below
+    # the median of the other trials' running scores at the same step
+    values = [ scores[step] for trial, scores in intermediates.items() if trial != counter and len(scores) > step ]
+    if len(values) < min_trials:
+        return False
+
+    return intermediates[counter][step] < np.median(values)
+
+class MedianStop(object):
+    """
+    Stop condition reporting the running score of a trial every report_every episodes
+    and pruning it with the median stopping rule.
+    """
+    name = 'pruned'
+
+    def __init__(self, intermediates, counter, report_every):
+        self.intermediates = intermediates
+        self.counter = counter
+        self.report_every = report_every
+        self.nb_episodes = 0
+        self.total_score = 0.
+        self.running_scores = []
+
+    def update(self, score):
+        self.nb_episodes += 1
+        self.total_score += score
+        if self.nb_episodes % self.report_every != 0:
+            return False
+
+        self.running_scores.append(self.total_score / self.nb_episodes)
+        self.intermediates[self.counter] = self.running_scores
+        return median_stop(self.intermediates, self.counter, len(self.running_scores) - 1)
+
+def exec_trial(counter, config, params, intermediates):
+    start_time = time.time()
+
+    config['result_dir'] = config['result_dir_prefix'] + '/run-' + str(counter).zfill(3)
+
+    try:
+        # We create the agent
+        env = gym.make(config['env_name'])
+        agent = make_agent(config, env)
+
+        # We train the agent, reporting its running score to the pruner
+        scores = agent.train(save_every=-1, stop_conditions=[
+            MedianStop(intermediates, counter, config['tpe_report_every'])
+        ])
+        pruned = agent.stop_reason == 'pruned'
+
+        result = {
+            'params': params
+            , 'mean_score': np.mean(scores)
+            , 'stddev_score': np.sqrt(np.var(scores))
+            , 'nb_episodes': len(scores)
+            , 'pruned': pruned
+            , 'stop_reason': agent.stop_reason
+        }
+        agent.close()
+
+        seconds = int( round( time.time() - start_time ))
+        print("Run: {} | {}, mean_score {}{}".format(counter, time.ctime(), result['mean_score'], ' (pruned)' if pruned else ''))
+        print("%d seconds." % seconds )
+    except:
+        result = {
+            'params': params
+            , 'mean_score': 0
+            , 'stddev_score': 0
+            , 'error': str(sys.exc_info()[0])
+            , 'error_message': str(sys.exc_info()[1])
+        }
+
+    if os.path.exists(config['result_dir']):
+        shutil.rmtree(config['result_dir'])
+
+    return result
+
+def search(config):
+    config = copy.deepcopy(config)
+
+    get_params = get_agent_class(config).get_random_config
+    bounds = get_params_bounds(get_params, config['fixed_params'])
+    choices = get_params_choices(get_params, config['fixed_params'])
+
+    set_budget(config, 5 if config['debug'] else 500)
+    nb_trials = 5 if config['debug'] else config['tpe_trials']
+    nb_process = min(multiprocessing.cpu_count(), config['nb_process'])
+
+    results = []
+    with multiprocessing.Manager() as manager:
+        intermediates = manager.dict()
+        with concurrent.futures.ProcessPoolExecutor(nb_process) as executor:
+            counter = 0
+            running = set()
+            while counter < nb_trials or len(running) > 0:
+                # We keep the pool busy, each new trial is proposed from all the completed ones
+                while counter < nb_trials and len(running) < nb_process:
+                    params = suggest(results, get_params, config['fixed_params'], bounds, config['tpe_startup'], choices=choices)
+                    trial_config = copy.deepcopy(config)
+                    trial_config.update(params)
+                    running.add(executor.submit(exec_trial, counter, trial_config, copy.deepcopy(params), intermediates))
+                    counter += 1
+
+                done, running = concurrent.futures.wait(running, return_when=concurrent.futures.FIRST_COMPLETED)
+                results += [ future.result() for future in done ]
+
+    results = sorted(results, key=lambda result: result['mean_score'], reverse=True)
+    best_params = results[0]['params']
+
+    return {
+        'best_params': best_params
+        , 'results': results
+    }
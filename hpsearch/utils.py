@@ -1,8 +1,8 @@
-import os
+import os, sys
 import tensorflow as tf 
 import numpy as np
 
-def get_score_stat(result_dir):
+def get_scores(result_dir):
     eventFile = [f for f in os.listdir(result_dir) if os.path.isfile(os.path.join(result_dir, f)) and 'events' in f][0]
     scores = []
     try:
@@ -13,4 +13,60 @@ def get_score_stat(result_dir):
     except:
         pass
 
-    return ( np.mean(scores), np.sqrt(np.var(scores)) )
\ No newline at end of file
+    return scores
+
+def get_score_stat(result_dir, previous_scores=[]):
+    # previous_scores are the games played before a warm start, the stats cover the whole budget
+    scores = list(previous_scores) + get_scores(result_dir)
+
+    return ( np.mean(scores), np.sqrt(np.var(scores)) )
+
+def get_params_bounds(get_params, fixed_params={}, nb_samples=100):
+    # The agents only expose a sampling function of their hyperparameters space,
+    # we estimate the bounds of each numerical hyperparameter from it
+    samples = [get_params(fixed_params) for i in range(nb_samples)]
+    bounds = {}
+    for key in samples[0].keys():
+        values = [sample[key] for sample in samples]
+        if all(isinstance(value, (int, float, np.integer, np.floating)) and not isinstance(value, bool) for value in values):
+            bounds[key] = (min(values), max(values))
+
+    return bounds
+
+def get_params_choices(get_params, fixed_params={}, nb_samples=100):
+    # The other hyperparameters (booleans, strings) are categorical, we list the
+    # values seen in the samples
+    samples = [get_params(fixed_params) for i in range(nb_samples)]
+    choices = {}
+    for key in samples[0].keys():
+        values = [sample[key] for sample in samples]
+        if all(isinstance(value, (bool, str, np.bool_)) or value is None for value in values):
+            choices[key] = sorted(set(values), key=repr)
+
+    return choices
+
+
+def to_json(value):
+    # Numpy scalars are not JSON serializable
+    if hasattr(value, 'item'):
+        return value.item()
+    raise TypeError('%s is not JSON serializable' % repr(value))
+
+
+def set_budget(config, nb_games):
+    # Budgets are expressed in games and converted in the resource unit chosen for the search
+    resource = config.get('resource', 'episodes')
+    config['budget'] = nb_games
+    config['max_iter'] = nb_games
+    config['max_steps'] = 0
+    config['max_seconds'] = 0
+    if resource == 'steps':
+        config['max_iter'] = sys.maxsize
+        config['max_steps'] = int(nb_games * config['steps_per_game'])
+    elif resource == 'seconds':
+        config['max_iter'] = sys.maxsize
+        config['max_seconds'] = nb_games * config['seconds_per_game']
+    elif resource != 'episodes':
+        raise Exception('The resource %s does not exist (episodes, steps or seconds)' % resource)
+
+    return config
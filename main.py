@@ -6,6 +6,9 @@ from agents import make_agent, get_agent_class
 from hpsearch.hyperband import Hyperband, run_params
 from hpsearch import fullsearch
 from hpsearch import randomsearch
+from hpsearch import pbt
+from hpsearch import tpe
+from utils.checkpointer import get_latest_checkpoint
 
 dir = os.path.dirname(os.path.realpath(__file__))
 
@@ -15,11 +18,27 @@ flags = tf.app.flags
 flags.DEFINE_boolean('randomsearch', False, 'Perform a random search fixing one HP at a time')
 flags.DEFINE_boolean('fullsearch', False, 'Perform a full search of hyperparameter space (hyperband -> lr search -> hyperband with best lr)')
 flags.DEFINE_string('fixed_params', "{}", 'JSON inputs to fix some params in a random search, ex: \'{"lr": 0.001}\'')
+flags.DEFINE_string('result_dir_prefix', '', 'Directory of an interrupted hyperband or full search to resume')
 # Hyperband
 flags.DEFINE_boolean('hyperband', False, 'Perform a hyperband search of hyperparameters')
 flags.DEFINE_boolean('dry_run', False, 'Perform a hyperband dry_run')
 flags.DEFINE_integer('nb_process', 4, 'Number of parallel process to perform a hyperband search')
 flags.DEFINE_integer('games_per_epoch', 100, 'Number of parallel process to perform a hyperband search')
+flags.DEFINE_string('resource', 'episodes', 'Unit of the training budgets in the hyperparameter searches: episodes, steps or seconds')
+flags.DEFINE_integer('steps_per_game', 200, 'Number of environment steps counted as one game when the resource is steps')
+flags.DEFINE_float('seconds_per_game', 1., 'Number of seconds counted as one game when the resource is seconds')
+flags.DEFINE_string('trial_cache', dir + '/results/trial_cache.sqlite', 'SQLite file caching the hyperparameter search trials across runs (empty to disable)')
+# Population based training
+flags.DEFINE_boolean('pbt', False, 'Perform a population based training of hyperparameters')
+flags.DEFINE_integer('pbt_population', 16, 'Number of agents trained in parallel in the population')
+flags.DEFINE_integer('pbt_ready', 50, 'Number of games played by each member between two exploit/explore steps')
+flags.DEFINE_integer('pbt_rounds', 20, 'Number of exploit/explore steps')
+flags.DEFINE_float('pbt_quantile', .25, 'Fraction of the population replaced by the best members at each step')
+# Model based search
+flags.DEFINE_boolean('tpe', False, 'Perform a sequential model based search (TPE) with median stopping of the trials')
+flags.DEFINE_integer('tpe_trials', 200, 'Number of trials of the TPE search')
+flags.DEFINE_integer('tpe_startup', 20, 'Number of random trials before using the TPE model')
+flags.DEFINE_integer('tpe_report_every', 50, 'Number of games between two reports of a trial score to the median stopping rule')
 
 # Agent
 flags.DEFINE_string('agent_name', 'DQNAgent', 'Name of the agent')
@@ -33,6 +52,7 @@ flags.DEFINE_float('lr', 1e-3, 'Learning rate')
 flags.DEFINE_integer('lr_decay_steps', 50000, 'Learning rate decay steps for tabular methods')
 flags.DEFINE_integer('nb_units', 20, 'Number of hidden units in Deep learning agents')
 flags.DEFINE_float('q_scale_lr', 1., 'For actor critic agents, scale variables between q loss and policy loss')
+flags.DEFINE_boolean('shared_trunk', False, 'For actor critic agents, the policy and the critics are heads on one shared trunk of hidden layers')
 flags.DEFINE_integer('n_step', 4, 'Number of step used in TD(n) algorithm')
 
 # Policy
@@ -41,19 +61,43 @@ flags.DEFINE_integer('N0', 100, 'Offset used in the decay algorithm of epsilon')
 flags.DEFINE_float('min_eps', 1e-2, 'Limit after which the decay stops')
 
 # Experience replay
+flags.DEFINE_integer('host_sync_every', 0, 'Deep agents select their actions with a NumPy copy of their network synced every chosen learner update (0 to act with the session)')
 flags.DEFINE_integer('er_batch_size', 512, 'Batch size of the experience replay learning')
 flags.DEFINE_integer('er_epoch_size', 50, 'Number of sampled contained in an epoch of experience replay')
 flags.DEFINE_integer('er_rm_size', 20000, 'Size of the replay memory buffer')
+flags.DEFINE_boolean('er_memmap', False, 'Store the replay memory of the DQN agents in memory mapped files of result_dir/replay_memory, reopened when training again from the same result_dir')
+flags.DEFINE_boolean('er_compact', False, 'Store the observations of the DQN replay memory in float16 and its actions in uint8')
+flags.DEFINE_boolean('er_in_graph', False, 'Keep the replay memory of the DQN and tabular ER agents in the graph: one session run appends the transition, samples the minibatch and trains')
+flags.DEFINE_boolean('er_fused', True, 'Evaluate the online and fixed Q networks of the DQN and DDQN updates in one batched forward pass (see benchmarks/er_update.py)')
+flags.DEFINE_integer('er_prefetch', 0, 'Number of minibatches of the ER agents sampled ahead by a background thread during the updates (0 to sample them on the training step)')
+flags.DEFINE_integer('nb_actors', 0, 'For the DQN agents, number of actor threads stepping their own environment while the learner trains continuously (0 to alternate acting and learning)')
+flags.DEFINE_integer('actor_queue_size', 100, 'Number of segments of transitions waiting for the learner before the actors block')
+flags.DEFINE_integer('actor_sync_every', 100, 'Number of learner updates between two copies of the Q network to the actors')
+flags.DEFINE_integer('nb_workers', 0, 'For the ActorCriticAgent and A2CAgent, number of A3C worker processes updating the networks kept in shared memory with n_step gradients (0 to train on one environment)')
 flags.DEFINE_integer('update_every', 20, 'Update the fixed Q network every chosen step')
 
 # Environment
 flags.DEFINE_string('env_name', 'CartPole-v0', 'The name of gym environment to use')
 flags.DEFINE_boolean('debug', False, 'Debug mode')
 flags.DEFINE_integer('max_iter', 2000, 'Number of training step')
+flags.DEFINE_float('stop_score', None, 'Stop the training once the mean score over the last stop_window games reaches this value (e.g. 195 to solve CartPole-v0)')
+flags.DEFINE_integer('stop_window', 100, 'Number of games of the moving average used by the stop conditions')
+flags.DEFINE_integer('stop_patience', 0, 'Stop the training when the moving average score did not improve for this number of games (0 to disable)')
+flags.DEFINE_float('stop_min_delta', 0., 'Minimum increase of the moving average score considered as an improvement')
+flags.DEFINE_boolean('profile', False, 'Time each phase of the training (env step, phi, act, learning updates, summaries, save) and write a profile.json report')
+flags.DEFINE_string('trace_episodes', '', 'Episodes of the training to trace (e.g. "10-12,50"): FULL_TRACE timelines of the session runs and a cProfile of the loop are written in result_dir/traces')
+flags.DEFINE_boolean('checkpoint_async', True, 'Write the periodic checkpoints of the training from a background thread in result_dir/checkpoints')
+flags.DEFINE_integer('checkpoint_keep_last', 5, 'Number of most recent background checkpoints kept')
+flags.DEFINE_integer('checkpoint_keep_best', 1, 'Number of background checkpoints with the best mean score kept in addition to the most recent ones')
+flags.DEFINE_integer('checkpoint_full_every', 10, 'For tabular agents, one background checkpoint out of this number is a full snapshot, the others only store the rows changed since the previous one')
+flags.DEFINE_boolean('checkpoint_fsync', True, 'Sync the background checkpoints to the disk before considering them written')
+flags.DEFINE_integer('max_steps', 0, 'Maximum number of environment steps of the training (0 for no limit)')
+flags.DEFINE_float('max_seconds', 0., 'Maximum duration of the training in seconds (0 for no limit)')
 
 flags.DEFINE_string('result_dir', dir + '/results/' + flags.FLAGS.env_name + '/' + flags.FLAGS.agent_name + '/' + str(int(time.time())), 'Name of the directory to store/log the agent (if it exists, the agent will be loaded from it)')
 
 flags.DEFINE_boolean('play', False, 'Load an agent for playing')
+flags.DEFINE_boolean('export', False, 'Export the agent found in result_dir to an agent.npz file playable by utils/np_runtime.py without TensorFlow')
 flags.DEFINE_integer('play_nb', 10, 'Number of games to play')
 flags.DEFINE_integer('random_seed', random.randint(0, sys.maxsize), 'Value of random seed')
 
@@ -69,7 +113,8 @@ def main(_):
     if config['hyperband']:
         print('Starting hyperband search')
 
-        config['result_dir_prefix'] = dir + '/results/hyperband/' + str(int(time.time()))
+        if not config['result_dir_prefix']:
+            config['result_dir_prefix'] = dir + '/results/hyperband/' + str(int(time.time()))
 
         get_params = get_agent_class(config).get_random_config
         hb = Hyperband( get_params, run_params )
@@ -82,8 +127,10 @@ def main(_):
 
     elif config['fullsearch']:
         print('*** Starting full search')
-        config['result_dir_prefix'] = dir + '/results/fullsearch/' + str(int(time.time())) + '-' + config['agent_name']
-        os.makedirs(config['result_dir_prefix'])
+        if not config['result_dir_prefix']:
+            config['result_dir_prefix'] = dir + '/results/fullsearch/' + str(int(time.time())) + '-' + config['agent_name']
+        if not os.path.exists(config['result_dir_prefix']):
+            os.makedirs(config['result_dir_prefix'])
         
         print('*** Starting first pass: full random search')
         summary = fullsearch.first_pass(config)
@@ -109,16 +156,45 @@ def main(_):
         summary = randomsearch.search(config)
         with open(config['result_dir_prefix'] + '/fullsearch_results1.json', 'w') as f:
             json.dump(summary, f)
+    elif config['pbt']:
+        print('*** Starting population based training')
+        config['result_dir_prefix'] = dir + '/results/pbt/' + str(int(time.time())) + '-' + config['agent_name']
+        os.makedirs(config['result_dir_prefix'])
+
+        summary = pbt.search(config)
+        with open(config['result_dir_prefix'] + '/pbt_results.json', 'w') as f:
+            json.dump(summary, f)
+    elif config['tpe']:
+        print('*** Starting TPE search')
+        config['result_dir_prefix'] = dir + '/results/tpe/' + str(int(time.time())) + '-' + config['agent_name']
+        os.makedirs(config['result_dir_prefix'])
+
+        summary = tpe.search(config)
+        with open(config['result_dir_prefix'] + '/tpe_results.json', 'w') as f:
+            json.dump(summary, f)
     else:
         env = gym.make(config['env_name'])
         agent = make_agent(config, env)
 
-        if config['play']:
+        if config['export']:
+            # Exporting the random initial weights is never wanted
+            if tf.train.get_checkpoint_state(agent.result_dir) is None and get_latest_checkpoint(agent.checkpoint_dir) is None:
+                raise Exception('No checkpoint to export in %s' % agent.result_dir)
+            agent.export(config['result_dir'] + '/agent.npz')
+            print('Agent exported to %s' % (config['result_dir'] + '/agent.npz'))
+        elif config['play']:
             for i in range(config['play_nb']):
                 agent.play(env)
         else:
             agent.train()
             agent.save()
+            print('Training stopped: %s' % agent.stop_reason)
+            if config['profile']:
+                print(json.dumps(agent.profile_report, indent=2))
+            if getattr(agent, 'actor_learner_report', None) is not None:
+                print(json.dumps(agent.actor_learner_report, indent=2))
+            if getattr(agent, 'a3c_report', None) is not None:
+                print(json.dumps(agent.a3c_report, indent=2))
 
 
 if __name__ == '__main__':
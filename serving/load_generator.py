@@ -0,0 +1,82 @@
+import argparse, asyncio, json, os, sys, time
+import numpy as np
+
+dir = os.path.dirname(os.path.realpath(__file__))
+sys.path.append(dir + '/..')
+
+async def connect(host, port, socket_path):
+    if socket_path:
+        return await asyncio.open_unix_connection(socket_path)
+
+    return await asyncio.open_connection(host, port)
+
+async def run_client(host, port, socket_path, observations, latencies):
+    # Each client mimics a simulator sending one observation at a time
+    reader, writer = await connect(host, port, socket_path)
+    for obs in observations:
+        start_time = time.perf_counter()
+        writer.write((json.dumps({ 'obs': obs }) + '\n').encode('utf-8'))
+        await writer.drain()
+        response = json.loads((await reader.readline()).decode('utf-8'))
+        latencies.append(time.perf_counter() - start_time)
+        if 'error' in response:
+            raise Exception(response['error_message'])
+    writer.close()
+
+async def get_server_stats(host, port, socket_path):
+    reader, writer = await connect(host, port, socket_path)
+    writer.write((json.dumps({ 'stats': True }) + '\n').encode('utf-8'))
+    await writer.drain()
+    stats = json.loads((await reader.readline()).decode('utf-8'))
+    writer.close()
+
+    return stats
+
+def get_observations(env_name, nb_observations):
+    import gym
+    env = gym.make(env_name)
+    np.random.seed(0)
+
+    return [ [ float(value) for value in env.observation_space.sample() ] for i in range(nb_observations) ]
+
+async def run_load(host, port, socket_path, observations, nb_clients, nb_requests):
+    latencies = []
+    start_time = time.perf_counter()
+    await asyncio.gather(*[
+        run_client(host, port, socket_path, [ observations[(client_id + i) % len(observations)] for i in range(nb_requests) ], latencies)
+        for client_id in range(nb_clients)
+    ])
+    seconds = time.perf_counter() - start_time
+
+    return {
+        'nb_clients': nb_clients
+        , 'nb_requests': len(latencies)
+        , 'seconds': seconds
+        , 'requests_per_sec': len(latencies) / seconds
+        , 'p50_ms': float(np.percentile(latencies, 50) * 1000)
+        , 'p99_ms': float(np.percentile(latencies, 99) * 1000)
+        , 'server': await get_server_stats(host, port, socket_path)
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Load the serving endpoint with concurrent clients and report its latency and throughput')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--socket', default='', help='Unix socket of the server')
+    parser.add_argument('--env_name', default='CartPole-v0', help='Environment sampled for the observations')
+    parser.add_argument('--clients', type=int, default=32, help='Number of concurrent clients')
+    parser.add_argument('--requests', type=int, default=500, help='Number of requests sent by each client')
+    parser.add_argument('--output', default='', help='JSON file of the report')
+    args = parser.parse_args()
+
+    observations = get_observations(args.env_name, 1000)
+    report = asyncio.get_event_loop().run_until_complete(
+        run_load(args.host, args.port, args.socket, observations, args.clients, args.requests)
+    )
+    print('{} requests from {} clients: {:.0f} requests/s, p50 {:.2f} ms, p99 {:.2f} ms, mean batch size {:.1f}'.format(
+        report['nb_requests'], report['nb_clients'], report['requests_per_sec'], report['p50_ms'], report['p99_ms'], report['server']['mean_batch_size']
+    ))
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
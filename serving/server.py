@@ -0,0 +1,128 @@
+import argparse, asyncio, json, os, sys, time
+
+dir = os.path.dirname(os.path.realpath(__file__))
+sys.path.append(dir + '/..')
+
+from utils.np_runtime import NumpyAgent
+
+# Newline delimited JSON protocol:
+#   {"obs": [...]}    -> {"action": 1}
+#   {"stats": true}   -> {"nb_requests": ..., "nb_batches": ..., "mean_batch_size": ...}
+
+class BatchingServer(object):
+    """
+    Serves the actions of an agent, the concurrent requests received during the
+    latency window are answered with a single batched forward pass.
+    """
+    def __init__(self, agent, max_batch_size=64, window=.002):
+        self.agent = agent
+        self.max_batch_size = max_batch_size
+        self.window = window
+
+        self.queue = asyncio.Queue()
+        self.nb_requests = 0
+        self.nb_batches = 0
+        self.max_seen_batch_size = 0
+        self.batch_task = None
+
+    def get_stats(self):
+        return {
+            'nb_requests': self.nb_requests
+            , 'nb_batches': self.nb_batches
+            , 'mean_batch_size': self.nb_requests / self.nb_batches if self.nb_batches > 0 else 0.
+            , 'max_batch_size': self.max_seen_batch_size
+        }
+
+    async def next_batch(self):
+        loop = asyncio.get_event_loop()
+        batch = [ await self.queue.get() ]
+        deadline = loop.time() + self.window
+        while len(batch) < self.max_batch_size:
+            if not self.queue.empty():
+                batch.append(self.queue.get_nowait())
+                continue
+
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+
+        return batch
+
+    async def run_batches(self):
+        while True:
+            batch = await self.next_batch()
+            try:
+                actions = self.agent.act_batch([ obs for obs, future in batch ])
+                for (obs, future), action in zip(batch, actions):
+                    future.set_result(action)
+            except Exception:
+                # Retry one by one so only the malformed observations fail
+                for obs, future in batch:
+                    try:
+                        future.set_result(self.agent.act_batch([ obs ])[0])
+                    except Exception as e:
+                        future.set_exception(e)
+
+            self.nb_requests += len(batch)
+            self.nb_batches += 1
+            self.max_seen_batch_size = max(self.max_seen_batch_size, len(batch))
+
+    async def act(self, obs):
+        future = asyncio.get_event_loop().create_future()
+        await self.queue.put((obs, future))
+
+        return await future
+
+    async def handle(self, reader, writer):
+        while True:
+            line = await reader.readline()
+            if not line:
+                break
+
+            try:
+                request = json.loads(line.decode('utf-8'))
+                if request.get('stats', False):
+                    response = self.get_stats()
+                else:
+                    response = { 'action': await self.act(request['obs']) }
+            except Exception as e:
+                response = { 'error': str(type(e)), 'error_message': str(e) }
+
+            writer.write((json.dumps(response) + '\n').encode('utf-8'))
+            await writer.drain()
+
+        writer.close()
+
+    async def start(self, host='127.0.0.1', port=8765, socket_path=None):
+        self.batch_task = asyncio.ensure_future(self.run_batches())
+        if socket_path:
+            return await asyncio.start_unix_server(self.handle, path=socket_path)
+
+        return await asyncio.start_server(self.handle, host, port)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Serve the actions of an exported agent with micro-batching')
+    parser.add_argument('--result_dir', required=True, help='Directory of the agent, exported beforehand with main.py --export')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--socket', default='', help='Serve on this Unix socket instead of TCP')
+    parser.add_argument('--max_batch_size', type=int, default=64, help='Maximum number of requests answered by a forward pass')
+    parser.add_argument('--window_ms', type=float, default=2., help='Time waited for other requests once a request is received')
+    parser.add_argument('--sample', action='store_true', help='Sample the actions of the policy agents instead of taking the most probable one')
+    args = parser.parse_args()
+
+    agent = NumpyAgent(args.result_dir + '/agent.npz', greedy=not args.sample)
+    server = BatchingServer(agent, args.max_batch_size, args.window_ms / 1000)
+
+    loop = asyncio.get_event_loop()
+    loop.run_until_complete(server.start(args.host, args.port, args.socket))
+    print('Serving {} on {} ({})'.format(agent.agent_name, args.socket or '%s:%d' % (args.host, args.port), time.ctime()))
+    try:
+        loop.run_forever()
+    except KeyboardInterrupt:
+        print(json.dumps(server.get_stats()))
@@ -6,6 +6,7 @@ dir = os.path.dirname(os.path.realpath(__file__))
 sys.path.append(dir + '/../..')
 
 from agents import capacities
+from utils import np_capacities
 
 class TestCapacities(unittest.TestCase):
 
@@ -80,10 +81,163 @@ class TestCapacities(unittest.TestCase):
 
                 probs, actions = sess.run([probs_t, actions_t], feed_dict={
                     inputs: [ [ -24, 10, 10 ]]
+                    , tf.get_collection('policy_uniforms')[0]: [ .2 ]
                 })
                 self.assertEqual(np.array_equal(np.round(probs, 1), [[ 0.5 , 0.5]]), True)
                 self.assertEqual(np.array_equal(actions, [[0]]), True)
 
+    def test_np_value_f(self):
+        # The host mirror of the network must give the same values as the graph
+        q_params = {
+            'nb_inputs': 3
+            , 'nb_units': 5
+            , 'nb_outputs': 2
+            , 'initial_mean': 0.
+            , 'initial_stddev': .5
+        }
+        with tf.Graph().as_default():
+            tf.set_random_seed(1)
+
+            inputs = tf.placeholder(tf.float32, shape=[None, 3])
+            with tf.variable_scope('QValues'):
+                values_t = capacities.value_f(q_params, inputs)
+
+            with tf.Session() as sess:
+                sess.run(tf.global_variables_initializer())
+
+                state = np.array([[ .1, -2, 3 ]], dtype=np.float32)
+                values = sess.run(values_t, feed_dict={ inputs: state })
+                weights = dict(zip(np_capacities.network_variables, sess.run([
+                    tf.get_default_graph().get_tensor_by_name('QValues/' + name + ':0') for name in np_capacities.network_variables
+                ])))
+                np_values = np_capacities.value_f(weights, state)
+                self.assertEqual(np.allclose(values, np_values, atol=1e-6), True)
+                self.assertEqual(np.argmax(values) == np.argmax(np_values), True)
+
+    def test_np_eps_greedy(self):
+        # Fed with the draws of the same RNG, the graph picks the same actions as the host
+        q_values = np.array([.1, .7, .3], dtype=np.float32)
+        graph_random = np.random.RandomState(0)
+        host_random = np.random.RandomState(0)
+        with tf.Graph().as_default():
+            action_t = capacities.eps_greedy(None, tf.constant(q_values), 3, 10, .01)
+            uniform_t, random_action_t = tf.get_collection('eps_greedy_draws')[0]
+
+            with tf.Session() as sess:
+                sess.run(tf.global_variables_initializer())
+                # eps goes from 10 / 11 to 10 / 210
+                for N in range(1, 201):
+                    uniform, random_action = np_capacities.get_eps_greedy_draws(3, graph_random)
+                    action = sess.run(action_t, feed_dict={ uniform_t: uniform, random_action_t: random_action })
+                    self.assertEqual(int(action), np_capacities.eps_greedy(q_values, N, 10, .01, host_random))
+
+    def test_np_sample(self):
+        # Fed with the draws of the same RNG, the graph samples the same actions as the host
+        logits = np.array([[.1, 1.2, .3, -.5]], dtype=np.float32)
+        graph_random = np.random.RandomState(0)
+        host_random = np.random.RandomState(0)
+        with tf.Graph().as_default():
+            # With null weights, the logits are the biases
+            with tf.variable_scope('Policy'):
+                probs_t, actions_t = capacities.policy_head({
+                    'nb_units': 4
+                    , 'nb_outputs': 4
+                    , 'initial_mean': 0.
+                    , 'initial_stddev': 0.
+                }, tf.ones([1, 4]))
+            with tf.variable_scope('Policy', reuse=True):
+                b3 = tf.get_variable('b3')
+            uniforms_t = tf.get_collection('policy_uniforms')[0]
+
+            with tf.Session() as sess:
+                sess.run(tf.global_variables_initializer())
+                b3.load(logits[0], sess)
+                probs = sess.run(probs_t)[0]
+                actions = []
+                for i in range(200):
+                    action = sess.run(actions_t, feed_dict={ uniforms_t: [ np_capacities.get_uniform(graph_random) ] })[0, 0]
+                    self.assertEqual(int(action), np_capacities.sample(probs, host_random))
+                    actions.append(action)
+                self.assertEqual(set(actions), {0, 1, 2, 3})
+
+    def test_batched_value_f(self):
+        # The fused evaluation must match one value_f per scope, values and gradients
+        q_params = {
+            'nb_inputs': 3
+            , 'nb_units': 5
+            , 'nb_outputs': 2
+            , 'initial_mean': 0.
+            , 'initial_stddev': .5
+        }
+        with tf.Graph().as_default():
+            tf.set_random_seed(1)
+
+            inputs = tf.placeholder(tf.float32, shape=[None, 3])
+            next_inputs = tf.placeholder(tf.float32, shape=[None, 3])
+            q_scope = tf.VariableScope(reuse=False, name='QValues')
+            with tf.variable_scope(q_scope):
+                capacities.value_f(q_params, inputs)
+            fixed_scope = tf.VariableScope(reuse=False, name='FixedQValues')
+            with tf.variable_scope(fixed_scope):
+                capacities.value_f(q_params, inputs)
+
+            with tf.variable_scope(q_scope, reuse=True):
+                values_t = capacities.value_f(q_params, inputs)
+                next_values_t = capacities.value_f(q_params, next_inputs)
+            with tf.variable_scope(fixed_scope, reuse=True):
+                fixed_values_t = capacities.value_f(q_params, next_inputs)
+            batched_t = capacities.batched_value_f(q_params, [q_scope, q_scope, fixed_scope], [inputs, next_inputs, next_inputs])
+
+            q_variables = tf.get_collection(tf.GraphKeys.TRAINABLE_VARIABLES, scope='QValues')
+            grads_t = tf.gradients(tf.reduce_sum(values_t) + tf.reduce_sum(next_values_t), q_variables)
+            batched_grads_t = tf.gradients(tf.reduce_sum(batched_t[0]) + tf.reduce_sum(batched_t[1]), q_variables)
+
+            with tf.Session() as sess:
+                sess.run(tf.global_variables_initializer())
+
+                feed_dict = {
+                    inputs: np.random.RandomState(0).randn(4, 3)
+                    , next_inputs: np.random.RandomState(1).randn(4, 3)
+                }
+                values = sess.run([values_t, next_values_t, fixed_values_t, grads_t], feed_dict=feed_dict)
+                batched_values = sess.run([batched_t, batched_grads_t], feed_dict=feed_dict)
+                for value, batched_value in zip(values[:3], batched_values[0]):
+                    self.assertEqual(np.allclose(value, batched_value, atol=1e-5), True)
+                for grad, batched_grad in zip(values[3], batched_values[1]):
+                    self.assertEqual(np.allclose(grad, batched_grad, atol=1e-5), True)
+
+    def test_trunk(self):
+        # A head on the trunk is the value_f network made of the trunk and head variables
+        q_params = {
+            'nb_inputs': 3
+            , 'nb_units': 5
+            , 'nb_outputs': 2
+            , 'initial_mean': 0.
+            , 'initial_stddev': .5
+        }
+        with tf.Graph().as_default():
+            tf.set_random_seed(1)
+
+            inputs = tf.placeholder(tf.float32, shape=[None, 3])
+            with tf.variable_scope('Trunk'):
+                hidden = capacities.trunk(q_params, inputs)
+            with tf.variable_scope('QValues'):
+                values_t = capacities.value_head(q_params, hidden)
+            with tf.variable_scope('Policy'):
+                probs_t, actions_t = capacities.policy_head(q_params, hidden)
+
+            with tf.Session() as sess:
+                sess.run(tf.global_variables_initializer())
+
+                state = np.array([[ .1, -2, 3 ]], dtype=np.float32)
+                values, probs = sess.run([values_t, probs_t], feed_dict={ inputs: state })
+                names = [ 'Trunk/W1', 'Trunk/b1', 'Trunk/W2', 'Trunk/b2', 'QValues/W3', 'QValues/b3' ]
+                weights = dict(zip(np_capacities.network_variables, sess.run([
+                    tf.get_default_graph().get_tensor_by_name(name + ':0') for name in names
+                ])))
+                self.assertEqual(np.allclose(values, np_capacities.value_f(weights, state), atol=1e-6), True)
+                self.assertEqual(np.allclose(np.sum(probs), 1, atol=1e-6), True)
+
     def test_eligibility_traces(self):
         with tf.Graph().as_default():
             Qs_t = tf.constant([[1, 1], [1, 1], [1, 1]], dtype=tf.float32)
@@ -1,12 +1,108 @@
-import os, sys, unittest
+import gym, os, sys, unittest, shutil
 import numpy as np
 import tensorflow as tf
 
 dir = os.path.dirname(os.path.realpath(__file__))
+sys.path.append(dir + '/../..')
 
+from agents import make_agent
+
+# Silent gym logger
+import logging
+logging.getLogger("gym").setLevel(logging.WARNING)
+
+def record_actions(agent):
+    actions = []
+    act = agent.act
+    def recorded_act(obs):
+        result = act(obs)
+        actions.append(int(result[0]))
+        return result
+    agent.act = recorded_act
+
+    return actions
 
 class TestDeepPoliciAgent(unittest.TestCase):
-    pass
+
+    def tearDown(self):
+        if os.path.isdir(dir + '/results/'):
+            shutil.rmtree(dir + '/results/')
+
+    def get_agent(self, agent_name, q_scale_lr=1.):
+        config = {
+            'agent_name': agent_name
+            , 'env_name': 'CartPole-v0'
+            , 'random_seed': 0
+            , 'result_dir': dir + '/results'
+            , 'lr': 1e-2
+            , 'discount': .99
+            , 'nb_units': 8
+            , 'initial_mean': 0.
+            , 'initial_stddev': .1
+            , 'q_scale_lr': q_scale_lr
+            , 'shared_trunk': True
+        }
+        env = gym.make(config['env_name'])
+        env.seed(0)
+
+        return make_agent(config, env), env
+
+    def test_shared_trunk(self):
+        agent, env = self.get_agent('A2CAgent')
+        weights = agent.get_weights()
+        self.assertEqual('Trunk/W1:0' in weights, True)
+        self.assertEqual('Policy/W1:0' in weights, False)
+        self.assertEqual('QValues/W3:0' in weights, True)
+        self.assertEqual('VValues/W3:0' in weights, True)
+
+        # The host copy of the policy is made of the trunk and of the policy head
+        policy_weights = agent.get_network_weights('Policy')
+        self.assertEqual(np.array_equal(policy_weights['W1'], weights['Trunk/W1:0']), True)
+        self.assertEqual(np.array_equal(policy_weights['W3'], weights['Policy/W3:0']), True)
+
+        agent.learn_from_episode(env, False)
+        new_weights = agent.get_weights()
+        for name in ['Trunk/W1:0', 'Policy/W3:0', 'QValues/W3:0', 'VValues/W3:0']:
+            self.assertEqual(np.array_equal(weights[name], new_weights[name]), False)
+        self.assertEqual(agent.sess.run(agent.q_global_step) > 0, True)
+
+    def test_shared_trunk_head_lr(self):
+        # Each head keeps its own learning rate: a null q_lr freezes the Q head only
+        agent, env = self.get_agent('ActorCriticAgent', q_scale_lr=0.)
+        weights = agent.get_weights()
+        agent.learn_from_episode(env, False)
+        new_weights = agent.get_weights()
+
+        self.assertEqual(np.array_equal(weights['QValues/W3:0'], new_weights['QValues/W3:0']), True)
+        self.assertEqual(np.array_equal(weights['Policy/W3:0'], new_weights['Policy/W3:0']), False)
+        self.assertEqual(np.array_equal(weights['Trunk/W1:0'], new_weights['Trunk/W1:0']), False)
+
+    def test_host_acting(self):
+        # Acting on the host with K=1 samples the same actions as acting with the session
+        agents = []
+        for host_sync_every in [0, 1]:
+            config = {
+                'agent_name': 'DeepMCPolicyAgent'
+                , 'env_name': 'CartPole-v0'
+                , 'random_seed': 0
+                , 'result_dir': dir + '/results/host-' + str(host_sync_every)
+                , 'lr': 1e-2
+                , 'discount': .99
+                , 'nb_units': 8
+                , 'initial_mean': 0.
+                , 'initial_stddev': .1
+                , 'host_sync_every': host_sync_every
+            }
+            env = gym.make(config['env_name'])
+            env.seed(0)
+            agent = make_agent(config, env)
+            agents.append((agent, env, record_actions(agent)))
+
+        for i in range(3):
+            scores = [ agent.learn_from_episode(env, False) for agent, env, actions in agents ]
+            self.assertEqual(scores[0], scores[1])
+        self.assertEqual(agents[0][2], agents[1][2])
+        self.assertEqual(len(set(agents[1][2])), 2)
 
 if __name__ == "__main__":
-    unittest.main()
\ No newline at end of file
+    unittest.main()
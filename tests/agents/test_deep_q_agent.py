@@ -0,0 +1,105 @@
+import gym, os, sys, unittest, shutil
+import numpy as np
+import tensorflow as tf
+
+dir = os.path.dirname(os.path.realpath(__file__))
+sys.path.append(dir + '/../..')
+
+from agents import make_agent
+
+# Silent gym logger
+import logging
+logging.getLogger("gym").setLevel(logging.WARNING)
+
+def record_actions(agent):
+    actions = []
+    act = agent.act
+    def recorded_act(obs):
+        result = act(obs)
+        actions.append(int(result[0]))
+        return result
+    agent.act = recorded_act
+
+    return actions
+
+class TestDeepQAgent(unittest.TestCase):
+
+    def tearDown(self):
+        if os.path.isdir(dir + '/results/'):
+            shutil.rmtree(dir + '/results/')
+
+    def get_agent(self, host_sync_every):
+        config = {
+            'agent_name': 'DeepTDAgent'
+            , 'env_name': 'CartPole-v0'
+            , 'random_seed': 0
+            , 'result_dir': dir + '/results/host-' + str(host_sync_every)
+            , 'lr': 1e-2
+            , 'discount': .99
+            , 'N0': 20
+            , 'min_eps': .01
+            , 'nb_units': 8
+            , 'initial_mean': 0.
+            , 'initial_stddev': .1
+            , 'host_sync_every': host_sync_every
+        }
+        env = gym.make(config['env_name'])
+        env.seed(0)
+
+        return make_agent(config, env), env
+
+    def test_host_acting(self):
+        # Acting on the host with K=1 picks the same actions as acting with the session
+        session_agent, session_env = self.get_agent(0)
+        host_agent, host_env = self.get_agent(1)
+        session_actions = record_actions(session_agent)
+        host_actions = record_actions(host_agent)
+
+        for i in range(3):
+            session_score = session_agent.learn_from_episode(session_env, False)
+            host_score = host_agent.learn_from_episode(host_env, False)
+            self.assertEqual(session_score, host_score)
+        self.assertEqual(session_actions, host_actions)
+        self.assertEqual(len(set(host_actions)), 2)
+
+        # The exploration schedule is the same
+        self.assertEqual(session_agent.sess.run(session_agent.get_eps_counter()), host_agent.host_N)
+
+    def test_reopened_memory_segment(self):
+        # A memory saved in the middle of a segment is not continued by the next episode
+        config = {
+            'agent_name': 'DQNAgent'
+            , 'env_name': 'CartPole-v0'
+            , 'random_seed': 0
+            , 'result_dir': dir + '/results/memmap'
+            , 'lr': 1e-2
+            , 'discount': .99
+            , 'N0': 20
+            , 'min_eps': .01
+            , 'nb_units': 8
+            , 'initial_mean': 0.
+            , 'initial_stddev': .1
+            , 'er_every': 20
+            , 'er_batch_size': 16
+            , 'er_rm_size': 1000
+            , 'er_memmap': True
+        }
+        env = gym.make(config['env_name'])
+        env.seed(0)
+        agent = make_agent(config, env)
+        pending_obs = np.full(env.observation_space.shape, 100.)
+        agent.replayMemory.append(np.zeros(env.observation_space.shape), 0, 1., pending_obs, False)
+        agent.save()
+        agent.close()
+
+        agent = make_agent(dict(config), env)
+        self.assertEqual(agent.replayMemory.continuing, True)
+        agent.learn_from_episode(env, False)
+        samples = agent.replayMemory.sample(1000, np.random.RandomState(0))
+        # The saved transition still goes to its own next observation
+        saved = np.all(samples['observations'] == 0, 1)
+        self.assertEqual(bool(np.any(saved)), True)
+        self.assertEqual(bool(np.all(samples['next_observations'][saved] == pending_obs)), True)
+
+if __name__ == "__main__":
+    unittest.main()
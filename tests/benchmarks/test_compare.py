@@ -0,0 +1,51 @@
+import os, sys, unittest
+
+dir = os.path.dirname(os.path.realpath(__file__))
+sys.path.append(dir + '/../..')
+
+from benchmarks import compare
+
+def get_result(agent_name, steps_per_sec, construction_seconds, iqr=0.):
+    return {
+        'agent_name': agent_name
+        , 'env_name': 'CartPole-v0'
+        , 'steps_per_sec': steps_per_sec
+        , 'steps_per_sec_distribution': {'median': steps_per_sec, 'q1': steps_per_sec - iqr / 2, 'q3': steps_per_sec + iqr / 2}
+        , 'construction_seconds': construction_seconds
+    }
+
+class TestCompare(unittest.TestCase):
+
+    def test_compare(self):
+        baseline = {'results': [
+            get_result('DQNAgent', 1000, 1.)
+            , get_result('TabularQAgent', 1000, 1., iqr=200)
+            , get_result('A2CAgent', 1000, 1.)
+            , get_result('TDACAgent', 1000, 1.)
+        ]}
+        current = {'results': [
+            get_result('DQNAgent', 800, 1.)
+            , get_result('TabularQAgent', 800, 1., iqr=100)
+            , get_result('A2CAgent', 1000, 1.5)
+        ]}
+        rows = compare.compare(baseline, current, tolerance=.1)
+        statuses = { (row['key'][0], row['metric']): row['status'] for row in rows }
+
+        self.assertEqual(statuses[('DQNAgent', 'steps_per_sec')], 'regression')
+        # The drop is within the measure noise
+        self.assertEqual(statuses[('TabularQAgent', 'steps_per_sec')], 'ok')
+        self.assertEqual(statuses[('A2CAgent', 'steps_per_sec')], 'ok')
+        self.assertEqual(statuses[('A2CAgent', 'construction_seconds')], 'regression')
+        self.assertEqual(statuses[('TDACAgent', None)], 'missing')
+        self.assertEqual(len(compare.get_failures(rows)), 3)
+
+    def test_compare_error(self):
+        baseline = {'results': [get_result('DQNAgent', 1000, 1.)]}
+        current = {'results': [{'agent_name': 'DQNAgent', 'env_name': 'CartPole-v0', 'error': 'NameError', 'error_message': 'oops'}]}
+        rows = compare.compare(baseline, current)
+
+        self.assertEqual(rows[0]['status'], 'regression')
+        self.assertEqual('oops' in compare.format_row(rows[0]), True)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,42 @@
+import os, sys, unittest, tempfile
+
+dir = os.path.dirname(os.path.realpath(__file__))
+sys.path.append(dir + '/../..')
+
+from benchmarks import utils
+
+class TestBenchmarksUtils(unittest.TestCase):
+
+    def test_write_markdown_table(self):
+        columns = [('Agent', 'agent_name', '{}'), ('Steps/s', 'steps_per_sec', '{:.1f}')]
+        rows = [
+            {'agent_name': 'DQNAgent', 'steps_per_sec': 123.456}
+            , {'agent_name': 'DeepTDAgent', 'error': 'NameError'}
+        ]
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = tmp_dir + '/table.md'
+            utils.write_markdown_table(path, columns, rows)
+            with open(path) as f:
+                lines = f.read().splitlines()
+
+        self.assertEqual(lines, [
+            '| Agent | Steps/s |'
+            , '|---|---|'
+            , '| DQNAgent | 123.5 |'
+            , '| DeepTDAgent | error |'
+        ])
+
+    def test_get_distribution(self):
+        self.assertEqual(utils.get_distribution([]), None)
+        distribution = utils.get_distribution([1, 2, 3, 4, 5])
+        self.assertEqual(distribution['median'], 3)
+        self.assertEqual(distribution['q1'], 2)
+        self.assertEqual(distribution['q3'], 4)
+        self.assertEqual(distribution['min'], 1)
+        self.assertEqual(distribution['count'], 5)
+
+    def test_get_peak_rss_mb(self):
+        self.assertEqual(utils.get_peak_rss_mb() > 0, True)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,78 @@
+import os, sys, unittest, shutil, tempfile
+import numpy as np
+import tensorflow as tf
+
+dir = os.path.dirname(os.path.realpath(__file__))
+sys.path.append(dir + '/../..')
+
+from hpsearch import cache
+
+class TestTrialCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.config = {
+            'agent_name': 'TabularQAgent'
+            , 'env_name': 'CartPole-v0'
+            , 'random_seed': 0
+            , 'lr': np.float64(.1)
+            , 'N0': 10
+            , 'result_dir': self.tmp_dir + '/run-000'
+        }
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_config_key(self):
+        config = dict(self.config)
+        config['result_dir'] = self.tmp_dir + '/run-001'
+        config['nb_process'] = 8
+        self.assertEqual(cache.get_config_key(config), cache.get_config_key(self.config))
+
+        config['random_seed'] = 1
+        self.assertNotEqual(cache.get_config_key(config), cache.get_config_key(self.config))
+
+    def test_get_put(self):
+        trial_cache = cache.TrialCache(self.tmp_dir + '/cache.sqlite')
+        self.assertEqual(trial_cache.get(self.config, 100), None)
+
+        trial_cache.put(self.config, 100, {'mean_score': np.float64(20.), 'stddev_score': 1.})
+        self.assertEqual(trial_cache.get(self.config, 100), {'mean_score': 20., 'stddev_score': 1.})
+        self.assertEqual(trial_cache.get(self.config, 200), None)
+
+        # The cache is persistent
+        trial_cache = cache.TrialCache(self.tmp_dir + '/cache.sqlite')
+        self.assertEqual(trial_cache.get(self.config, 100)['mean_score'], 20.)
+
+    def test_errors_are_not_cached(self):
+        trial_cache = cache.TrialCache(self.tmp_dir + '/cache.sqlite')
+        trial_cache.put(self.config, 100, {'mean_score': 0, 'error': 'Exception'})
+        self.assertEqual(trial_cache.get(self.config, 100), None)
+        self.assertEqual(trial_cache.get_warm_start(self.config, 200), None)
+
+    def save_checkpoint(self, checkpoint_dir):
+        with tf.Graph().as_default():
+            tf.Variable(1., name='W')
+            saver = tf.train.Saver()
+            with tf.Session() as sess:
+                sess.run(tf.global_variables_initializer())
+                saver.save(sess, checkpoint_dir + '/agent-model')
+
+    def test_warm_start(self):
+        trial_cache = cache.TrialCache(self.tmp_dir + '/cache.sqlite')
+        self.save_checkpoint(self.tmp_dir + '/run-000')
+        self.save_checkpoint(self.tmp_dir + '/run-001')
+
+        # Without the scores of its games, a trial can not be continued on a bigger budget
+        trial_cache.put(self.config, 50, {'mean_score': 10.}, checkpoint_dir=self.tmp_dir + '/run-000')
+        self.assertEqual(trial_cache.get_warm_start(self.config, 200), None)
+
+        trial_cache.put(self.config, 100, {'mean_score': 15., 'scores': [10., 20.]}, checkpoint_dir=self.tmp_dir + '/run-001')
+        warm_budget, checkpoint_dir, scores = trial_cache.get_warm_start(self.config, 200)
+        self.assertEqual(warm_budget, 100)
+        self.assertEqual(scores, [10., 20.])
+        self.assertNotEqual(tf.train.get_checkpoint_state(checkpoint_dir), None)
+        self.assertEqual(trial_cache.get_warm_start(self.config, 100), None)
+
+if __name__ == "__main__":
+    unittest.main()
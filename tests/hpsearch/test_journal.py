@@ -0,0 +1,44 @@
+import os, sys, unittest, shutil, tempfile
+import numpy as np
+
+dir = os.path.dirname(os.path.realpath(__file__))
+sys.path.append(dir + '/../..')
+
+from hpsearch.journal import Journal
+
+class TestJournal(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.path = self.tmp_dir + '/search/journal.jsonl'
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_append_and_reload(self):
+        journal = Journal(self.path)
+        journal.append({'type': 'bracket', 's': 4, 'configs': [{'lr': np.float64(.1), 'id': 0}]})
+        journal.append({'type': 'run', 's': 4, 'i': 0, 'id': 0, 'result': {'loss': -10.}})
+        journal.append({'type': 'run', 's': 4, 'i': 1, 'id': 0, 'result': {'loss': -20.}})
+
+        journal = Journal(self.path)
+        self.assertEqual(journal.get('bracket', s=4)[0]['configs'], [{'lr': .1, 'id': 0}])
+        self.assertEqual(len(journal.get('run')), 2)
+        self.assertEqual(journal.get('run', s=4, i=1)[0]['result']['loss'], -20.)
+        self.assertEqual(journal.get('bracket', s=3), [])
+
+    def test_partial_entry(self):
+        journal = Journal(self.path)
+        journal.append({'type': 'run', 'counter': 0, 'result': {'mean_score': 1.}})
+        with open(self.path, 'a') as f:
+            f.write('{"type": "run", "coun')
+
+        journal = Journal(self.path)
+        self.assertEqual(len(journal.get('run')), 1)
+        journal.append({'type': 'run', 'counter': 1, 'result': {'mean_score': 2.}})
+
+        journal = Journal(self.path)
+        self.assertEqual([entry['counter'] for entry in journal.get('run')], [0, 1])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,55 @@
+import os, sys, unittest
+import numpy as np
+
+dir = os.path.dirname(os.path.realpath(__file__))
+sys.path.append(dir + '/../..')
+
+from hpsearch import pbt
+
+def get_params(fixed_params={}):
+    random_config = {
+        'lr': 1e-4 + (1 - 1e-4) * np.random.random(1)[0]
+        , 'nb_units': np.random.randint(10, 100)
+    }
+    random_config.update(fixed_params)
+
+    return random_config
+
+class TestPBT(unittest.TestCase):
+
+    def test_perturb(self):
+        np.random.seed(0)
+        bounds = {'lr': (1e-4, 1.), 'nb_units': (10, 99)}
+        params = {'lr': .9, 'nb_units': 50}
+        for i in range(100):
+            new_params = pbt.perturb(params, get_params, {}, bounds)
+            self.assertEqual(new_params['nb_units'], 50)
+            self.assertEqual(bounds['lr'][0] <= new_params['lr'] <= bounds['lr'][1], True)
+
+    def test_perturb_fixed_params(self):
+        np.random.seed(0)
+        bounds = {'lr': (1e-4, 1.), 'nb_units': (10, 99)}
+        params = {'lr': .5, 'nb_units': 50}
+        new_params = pbt.perturb(params, get_params, {'lr': .5}, bounds)
+        self.assertEqual(new_params['lr'], .5)
+
+    def test_exploit_and_explore(self):
+        np.random.seed(0)
+        bounds = {'lr': (1e-4, 1.), 'nb_units': (10, 99)}
+        population = [{'lr': .1, 'nb_units': 20 + i} for i in range(4)]
+        weights = ['w0', 'w1', 'w2', 'w3']
+        results = [
+            {'mean_score': 10}
+            , {'mean_score': 40}
+            , {'mean_score': 0, 'error': 'Exception'}
+            , {'mean_score': 30}
+        ]
+        population, weights = pbt.exploit_and_explore(results, population, weights, get_params, {}, bounds, .25)
+
+        # The errored member is replaced by the best one
+        self.assertEqual(weights, ['w0', 'w1', 'w1', 'w3'])
+        self.assertEqual(population[2]['nb_units'], 21)
+        self.assertEqual(population[3]['nb_units'], 23)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,77 @@
+import os, sys, unittest
+import numpy as np
+
+dir = os.path.dirname(os.path.realpath(__file__))
+sys.path.append(dir + '/../..')
+
+from hpsearch import tpe
+
+def get_params(fixed_params={}):
+    random_config = {
+        'lr': 1e-4 + (1 - 1e-4) * np.random.random(1)[0]
+        , 'discount': 0.5 + (1 - 0.5) * np.random.random(1)[0]
+    }
+    random_config.update(fixed_params)
+
+    return random_config
+
+class TestTPE(unittest.TestCase):
+
+    def test_median_stop(self):
+        intermediates = {0: [10, 20], 1: [12, 22], 2: [8], 3: [1, 2]}
+        self.assertEqual(tpe.median_stop(intermediates, 3, 1, min_trials=2), True)
+        self.assertEqual(tpe.median_stop(intermediates, 1, 1, min_trials=2), False)
+        # Not enough trials reached this step
+        self.assertEqual(tpe.median_stop(intermediates, 3, 1, min_trials=3), False)
+
+    def test_median_stop_condition(self):
+        intermediates = { trial: [10, 20] for trial in range(5) }
+        condition = tpe.MedianStop(intermediates, 5, 2)
+        self.assertEqual(condition.update(14), False)
+        self.assertEqual(condition.update(16), False)
+        self.assertEqual(intermediates[5], [15])
+        self.assertEqual(condition.update(1), False)
+        self.assertEqual(condition.update(1), True)
+        self.assertEqual(intermediates[5], [15, 8])
+
+    def test_suggest(self):
+        np.random.seed(0)
+        bounds = {'lr': (1e-4, 1.), 'discount': (.5, 1.)}
+        # The score only depends on the discount, the best configs have a high one
+        results = []
+        for i in range(40):
+            params = get_params()
+            results.append({'params': params, 'mean_score': params['discount']})
+
+        suggestions = [ tpe.suggest(results, get_params, {}, bounds, nb_startup=20)['discount'] for i in range(20) ]
+        self.assertEqual(np.mean(suggestions) > .85, True)
+
+    def test_suggest_empty_group(self):
+        np.random.seed(0)
+        bounds = {'lr': (1e-4, 1.), 'discount': (.5, 1.)}
+        # Without startup trials, the first suggestions are random until both groups are filled
+        results = []
+        for i in range(3):
+            params = tpe.suggest(results, get_params, {}, bounds, nb_startup=0)
+            self.assertEqual(set(params.keys()), set(['lr', 'discount']))
+            results.append({'params': params, 'mean_score': params['discount']})
+
+        params = tpe.suggest(results[:1], get_params, {}, bounds, nb_startup=1, gamma=1.)
+        self.assertEqual(set(params.keys()), set(['lr', 'discount']))
+
+    def test_suggest_categorical(self):
+        np.random.seed(0)
+        bounds = {'lr': (1e-4, 1.), 'discount': (.5, 1.)}
+        choices = {'double': [False, True]}
+        get_categorical_params = lambda fixed_params={}: dict(get_params(fixed_params), double=bool(np.random.randint(2)))
+        # The score only depends on the categorical param
+        results = []
+        for i in range(40):
+            params = get_categorical_params()
+            results.append({'params': params, 'mean_score': float(params['double'])})
+
+        suggestions = [ tpe.suggest(results, get_categorical_params, {}, bounds, nb_startup=20, choices=choices)['double'] for i in range(20) ]
+        self.assertEqual(np.mean(suggestions) > .9, True)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,75 @@
+import os, sys, unittest, asyncio, tempfile
+
+dir = os.path.dirname(os.path.realpath(__file__))
+sys.path.append(dir + '/../..')
+
+from serving.server import BatchingServer
+from serving.load_generator import run_load
+
+class FakeAgent(object):
+    def __init__(self):
+        self.batch_sizes = []
+
+    def act_batch(self, observations):
+        self.batch_sizes.append(len(observations))
+        return [ int(obs[0] > 0) for obs in observations ]
+
+class TestServer(unittest.TestCase):
+
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+
+    def tearDown(self):
+        for task in asyncio.all_tasks(self.loop):
+            task.cancel()
+        self.loop.run_until_complete(asyncio.sleep(0))
+        self.loop.close()
+
+    def test_micro_batching(self):
+        agent = FakeAgent()
+        server = BatchingServer(agent, max_batch_size=4, window=.05)
+
+        async def run():
+            results = await asyncio.gather(*[ server.act([ value ]) for value in [-1, 1, -1, 1, 1] ])
+            return results
+        asyncio.ensure_future(server.run_batches())
+        results = self.loop.run_until_complete(run())
+
+        self.assertEqual(results, [0, 1, 0, 1, 1])
+        self.assertEqual(agent.batch_sizes, [4, 1])
+        self.assertEqual(server.get_stats()['nb_requests'], 5)
+
+    def test_malformed_observation(self):
+        # Only the malformed request of the micro-batch gets the error
+        agent = FakeAgent()
+        server = BatchingServer(agent, max_batch_size=4, window=.05)
+
+        async def run():
+            results = await asyncio.gather(*[ server.act(obs) for obs in [[-1], [], [1]] ], return_exceptions=True)
+            return results
+        asyncio.ensure_future(server.run_batches())
+        results = self.loop.run_until_complete(run())
+
+        self.assertEqual(results[0], 0)
+        self.assertEqual(isinstance(results[1], IndexError), True)
+        self.assertEqual(results[2], 1)
+        self.assertEqual(server.get_stats()['nb_requests'], 3)
+
+    def test_load_generator(self):
+        agent = FakeAgent()
+        server = BatchingServer(agent, max_batch_size=64, window=.005)
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            socket_path = tmp_dir + '/agent.sock'
+            unix_server = self.loop.run_until_complete(server.start(socket_path=socket_path))
+            report = self.loop.run_until_complete(run_load(None, None, socket_path, [[-1.], [1.]], 8, 10))
+            unix_server.close()
+            self.loop.run_until_complete(unix_server.wait_closed())
+
+        self.assertEqual(report['nb_requests'], 80)
+        self.assertEqual(report['server']['nb_requests'], 80)
+        self.assertEqual(report['server']['mean_batch_size'] > 1, True)
+        self.assertEqual(report['p99_ms'] >= report['p50_ms'], True)
+
+if __name__ == "__main__":
+    unittest.main()
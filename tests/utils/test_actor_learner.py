@@ -0,0 +1,77 @@
+import os, sys, unittest, threading, queue, time
+
+dir = os.path.dirname(os.path.realpath(__file__))
+sys.path.append(dir + '/../..')
+
+from utils.actor_learner import Actor, ActorLearnerStats, drain
+
+class FakeEnv(object):
+    def __init__(self, episode_length):
+        self.episode_length = episode_length
+
+    def reset(self):
+        self.t = 0
+        return 0
+
+    def step(self, action):
+        self.t += 1
+        return self.t, 1, self.t >= self.episode_length, {}
+
+class TestActorLearner(unittest.TestCase):
+
+    def test_actor(self):
+        transitions = queue.Queue(10)
+        stop_event = threading.Event()
+        actor = Actor(FakeEnv(5), lambda obs: 0, transitions, stop_event, segment_length=2)
+        actor.start()
+
+        items = []
+        while len([ item for item in items if item[0] == 'episode' ]) < 2:
+            items += drain(transitions, block=True)
+        stop_event.set()
+        actor.join(1.)
+        self.assertEqual(actor.thread.is_alive(), False)
+
+        # Segments of consecutive steps, cut at the end of the episodes
+        self.assertEqual([ (kind, len(value) if kind == 'segment' else value) for kind, value in items[:8] ], [
+            ('segment', 2), ('segment', 2), ('segment', 1), ('episode', 5)
+            , ('segment', 2), ('segment', 2), ('segment', 1), ('episode', 5)
+        ])
+        self.assertEqual(items[0][1][1], (1, 0, 1, 2, False))
+        self.assertEqual(items[2][1][0], (4, 0, 1, 5, True))
+
+    def test_actor_error(self):
+        transitions = queue.Queue(10)
+        stop_event = threading.Event()
+        def act(obs):
+            raise ValueError('no weights')
+        actor = Actor(FakeEnv(5), act, transitions, stop_event)
+        actor.start()
+
+        kind, value = transitions.get(timeout=1.)
+        stop_event.set()
+        self.assertEqual(kind, 'error')
+        self.assertEqual(isinstance(value, ValueError), True)
+
+    def test_drain(self):
+        transitions = queue.Queue()
+        self.assertEqual(drain(transitions, block=True, timeout=.01), [])
+        for i in range(3):
+            transitions.put(i)
+        self.assertEqual(drain(transitions), [0, 1, 2])
+
+    def test_stats(self):
+        stats = ActorLearnerStats(2, 32)
+        stats.nb_steps = 64
+        stats.nb_updates = 4
+        stats.add_depth(3)
+        stats.add_depth(1)
+        report = stats.report()
+
+        self.assertEqual(report['replay_ratio'], 2.)
+        self.assertEqual(report['queue_depth_mean'], 2.)
+        self.assertEqual(report['queue_depth_max'], 3)
+        self.assertEqual(report['nb_actors'], 2)
+
+if __name__ == "__main__":
+    unittest.main()
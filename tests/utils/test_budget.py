@@ -0,0 +1,60 @@
+import os, sys, unittest
+
+dir = os.path.dirname(os.path.realpath(__file__))
+sys.path.append(dir + '/../..')
+
+from utils.budget import BudgetEnv
+
+class FakeEnv(object):
+    def __init__(self, episode_length):
+        self.episode_length = episode_length
+        self.name = 'fake'
+
+    def reset(self):
+        self.t = 0
+        return 0
+
+    def step(self, action):
+        self.t += 1
+        return self.t, 1, self.t >= self.episode_length, {}
+
+class TestBudgetEnv(unittest.TestCase):
+
+    def test_budget_env_no_limit(self):
+        env = BudgetEnv(FakeEnv(3))
+        env.reset()
+        done = False
+        while not done:
+            obs, reward, done, info = env.step(0)
+
+        self.assertEqual(env.total_steps, 3)
+        self.assertFalse(env.truncated)
+        self.assertFalse(env.exhausted())
+
+    def test_budget_env_truncate(self):
+        env = BudgetEnv(FakeEnv(3), max_steps=5)
+        for i in range(2):
+            env.reset()
+            done = False
+            while not done:
+                obs, reward, done, info = env.step(0)
+
+        self.assertEqual(env.total_steps, 5)
+        self.assertTrue(env.truncated)
+        self.assertTrue(env.exhausted())
+
+        env.reset()
+        self.assertFalse(env.truncated)
+
+    def test_budget_env_seconds(self):
+        env = BudgetEnv(FakeEnv(3), max_seconds=1)
+        self.assertFalse(env.exhausted())
+        env.start_time -= 2
+        self.assertTrue(env.exhausted())
+
+    def test_budget_env_getattr(self):
+        env = BudgetEnv(FakeEnv(3))
+        self.assertEqual(env.name, 'fake')
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,98 @@
+import os, sys, unittest, tempfile
+import numpy as np
+
+dir = os.path.dirname(os.path.realpath(__file__))
+sys.path.append(dir + '/../..')
+
+from utils.checkpointer import AsyncCheckpointer, get_latest_checkpoint, load_checkpoint, get_retained, read_index
+
+class TestCheckpointer(unittest.TestCase):
+
+    def test_save_and_load(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            checkpointer = AsyncCheckpointer(tmp_dir + '/checkpoints', fsync=False)
+            weights = { 'QValues/W1:0': np.ones((4, 3)), 'episode_id:0': np.array(12) }
+            checkpointer.save(weights, 12, 100, score=20.)
+            checkpointer.flush()
+
+            checkpoint = get_latest_checkpoint(tmp_dir + '/checkpoints')
+            self.assertEqual(checkpoint['episode_id'], 12)
+            self.assertEqual(checkpoint['global_step'], 100)
+            loaded = load_checkpoint(tmp_dir + '/checkpoints', checkpoint)
+            self.assertEqual(sorted(loaded.keys()), sorted(weights.keys()))
+            np.testing.assert_array_equal(loaded['QValues/W1:0'], weights['QValues/W1:0'])
+
+    def test_close(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            checkpointer = AsyncCheckpointer(tmp_dir, fsync=False)
+            thread = checkpointer.thread
+            checkpointer.save({ 'W:0': np.ones(3) }, 1, 10)
+            checkpointer.close()
+
+            # The pending snapshot is written before the thread stops
+            self.assertEqual(thread.is_alive(), False)
+            self.assertEqual(checkpointer.previous, None)
+            self.assertEqual(get_latest_checkpoint(tmp_dir)['episode_id'], 1)
+            checkpointer.close()
+
+    def test_no_checkpoint(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            self.assertEqual(get_latest_checkpoint(tmp_dir), None)
+
+    def test_retention(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            checkpointer = AsyncCheckpointer(tmp_dir, keep_last=2, keep_best=1)
+            for episode_id, score in enumerate([10., 50., 20., 30., 40.]):
+                checkpointer.save({ 'w': np.array(episode_id) }, episode_id, episode_id, score)
+            checkpointer.flush()
+
+            files = sorted(filename for filename in os.listdir(tmp_dir) if filename.endswith('.npz'))
+            self.assertEqual(files, ['agent-ep_1-1.npz', 'agent-ep_3-3.npz', 'agent-ep_4-4.npz'])
+            self.assertEqual(get_latest_checkpoint(tmp_dir)['episode_id'], 4)
+
+            # The index is reloaded by a new checkpointer
+            checkpointer = AsyncCheckpointer(tmp_dir, keep_last=1, keep_best=0)
+            checkpointer.save({ 'w': np.array(5) }, 5, 5, 0.)
+            checkpointer.flush()
+            files = sorted(filename for filename in os.listdir(tmp_dir) if filename.endswith('.npz'))
+            self.assertEqual(files, ['agent-ep_5-5.npz'])
+
+    def test_retained_without_scores(self):
+        checkpoints = [ { 'filename': str(i), 'score': None } for i in range(4) ]
+        self.assertEqual([ c['filename'] for c in get_retained(checkpoints, 2, 1) ], ['2', '3'])
+
+    def test_write_error(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            open(tmp_dir + '/file', 'w').close()
+            checkpointer = AsyncCheckpointer(tmp_dir + '/file/checkpoints', fsync=False)
+            checkpointer.save({ 'w': np.array(0) }, 0, 0)
+            with self.assertRaises(Exception):
+                checkpointer.flush()
+
+    def test_delta_checkpoints(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            checkpointer = AsyncCheckpointer(tmp_dir, keep_last=2, keep_best=0, fsync=False, full_every=3)
+            Qs = np.zeros((1000, 2))
+            snapshots = []
+            for episode_id in range(7):
+                Qs = Qs.copy()
+                Qs[episode_id * 10] += 1.
+                snapshots.append(Qs)
+                checkpointer.save({ 'Qs:0': Qs, 'episode_id:0': np.array(episode_id) }, episode_id, episode_id)
+            checkpointer.flush()
+
+            checkpoints = read_index(tmp_dir)
+            # The checkpoint of the episode 5 is kept with its chain up to the full snapshot of the episode 3
+            self.assertEqual([ c['episode_id'] for c in checkpoints ], [3, 4, 5, 6])
+            self.assertEqual([ c['base'] for c in checkpoints ], [None, 'agent-ep_3-3.npz', 'agent-ep_4-4.npz', None])
+            self.assertEqual(sorted(filename for filename in os.listdir(tmp_dir) if filename.endswith('.npz')), [ c['filename'] for c in checkpoints ])
+            with np.load(tmp_dir + '/agent-ep_5-5.npz') as data:
+                self.assertEqual(data['delta_values/Qs:0'].shape, (1, 2))
+
+            for c in checkpoints:
+                weights = load_checkpoint(tmp_dir, c)
+                np.testing.assert_array_equal(weights['Qs:0'], snapshots[c['episode_id']])
+                self.assertEqual(int(weights['episode_id:0']), c['episode_id'])
+
+if __name__ == "__main__":
+    unittest.main()
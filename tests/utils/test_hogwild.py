@@ -0,0 +1,56 @@
+import os, sys, unittest
+import multiprocessing
+import numpy as np
+
+dir = os.path.dirname(os.path.realpath(__file__))
+sys.path.append(dir + '/../..')
+
+from utils.hogwild import SharedParams, HogwildStats, get_n_step_returns
+
+def add_ones(shared, stats, worker_id, nb_updates):
+    for i in range(nb_updates):
+        shared.params['W'] += 1
+        stats.add(worker_id, 5)
+
+class TestHogwild(unittest.TestCase):
+
+    def test_get_n_step_returns(self):
+        returns = get_n_step_returns([1, 1, 1], 10., .5)
+        np.testing.assert_allclose(returns, [1 + .5 + .25 + .125 * 10, 1 + .5 + .25 * 10, 1 + .5 * 10])
+
+        returns = get_n_step_returns([1, 2], 0., 1.)
+        np.testing.assert_allclose(returns, [3, 2])
+
+    def test_apply(self):
+        shared = SharedParams({ 'W': np.ones((2, 2)), 'b': np.zeros(2) }, { 'W': .1, 'b': 0. }, decay=.5, epsilon=0.)
+        shared.apply({ 'W': np.full((2, 2), 2.), 'b': np.ones(2) })
+
+        # stats = .5 * 4 = 2, the step is .1 * 2 / sqrt(2)
+        np.testing.assert_allclose(shared.params['W'], np.full((2, 2), 1 - .1 * 2 / np.sqrt(2)), rtol=1e-6)
+        np.testing.assert_allclose(shared.stats['W'], np.full((2, 2), 2.))
+        np.testing.assert_allclose(shared.params['b'], np.zeros(2))
+
+        weights = shared.get()
+        weights['W'][0, 0] = 100
+        self.assertNotEqual(shared.params['W'][0, 0], 100)
+
+    def test_processes(self):
+        shared = SharedParams({ 'W': np.zeros(3) }, { 'W': 1. })
+        stats = HogwildStats(2)
+        # Same start method as train_a3c, the shared arrays must survive the pickling
+        context = multiprocessing.get_context('spawn')
+        processes = [ context.Process(target=add_ones, args=(shared, stats, worker_id, 10)) for worker_id in range(2) ]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+
+        # Without lock, concurrent updates can be lost
+        self.assertGreaterEqual(shared.params['W'][0], 10)
+        self.assertLessEqual(shared.params['W'][0], 20)
+        self.assertEqual(stats.nb_steps(), 100)
+        self.assertEqual(stats.nb_updates(), 20)
+        self.assertEqual(stats.report()['worker_env_steps'], [50, 50])
+
+if __name__ == "__main__":
+    unittest.main()
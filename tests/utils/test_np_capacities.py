@@ -0,0 +1,59 @@
+import os, sys, unittest
+import numpy as np
+
+dir = os.path.dirname(os.path.realpath(__file__))
+sys.path.append(dir + '/../..')
+
+from utils import np_capacities
+
+def get_weights():
+    random_state = np.random.RandomState(0)
+    return {
+        'W1': random_state.normal(size=(3, 4)).astype(np.float32)
+        , 'b1': random_state.normal(size=(4,)).astype(np.float32)
+        , 'W2': random_state.normal(size=(4, 4)).astype(np.float32)
+        , 'b2': random_state.normal(size=(4,)).astype(np.float32)
+        , 'W3': random_state.normal(size=(4, 2)).astype(np.float32)
+        , 'b3': random_state.normal(size=(2,)).astype(np.float32)
+    }
+
+class TestNpCapacities(unittest.TestCase):
+
+    def test_value_f(self):
+        weights = get_weights()
+        inputs = np.array([[1., -2., .5]], dtype=np.float32)
+        a1 = np.maximum(inputs.dot(weights['W1']) + weights['b1'], 0)
+        a2 = np.maximum(a1.dot(weights['W2']) + weights['b2'], 0)
+        values = np_capacities.value_f(weights, inputs)
+
+        self.assertEqual(values.shape, (1, 2))
+        self.assertEqual(np.allclose(values, a2.dot(weights['W3']) + weights['b3']), True)
+
+    def test_policy(self):
+        probs = np_capacities.policy(get_weights(), np.array([[1., -2., .5], [0., 0., 0.]], dtype=np.float32))
+
+        self.assertEqual(probs.shape, (2, 2))
+        self.assertEqual(np.allclose(np.sum(probs, 1), 1.), True)
+
+    def test_eps_greedy(self):
+        random_state = np.random.RandomState(0)
+        q_values = np.array([0., 1., .5])
+        # eps = max(1 / (1 + 1e6), 0) ~ 0: always greedy
+        actions = [ np_capacities.eps_greedy(q_values, 1e6, 1, 0., random_state) for i in range(100) ]
+        self.assertEqual(set(actions), {1})
+        # eps = 1: uniform
+        actions = [ np_capacities.eps_greedy(q_values, 0, 1, 0., random_state) for i in range(300) ]
+        self.assertEqual(set(actions), {0, 1, 2})
+
+        self.assertEqual(np_capacities.get_eps(100, 100, 0.), .5)
+        self.assertEqual(np_capacities.get_eps(1e6, 100, .1), .1)
+
+    def test_sample(self):
+        random_state = np.random.RandomState(0)
+        actions = [ np_capacities.sample(np.array([.2, .8, 0.]), random_state) for i in range(1000) ]
+
+        self.assertEqual(2 in actions, False)
+        self.assertEqual(abs(np.mean(actions) - .8) < .05, True)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,63 @@
+import os, sys, unittest, subprocess, tempfile
+import numpy as np
+
+dir = os.path.dirname(os.path.realpath(__file__))
+sys.path.append(dir + '/../..')
+
+from utils import np_runtime, phis
+
+def get_weights(nb_inputs, nb_outputs):
+    random_state = np.random.RandomState(0)
+    return {
+        'W1': random_state.normal(size=(nb_inputs, 4)).astype(np.float32)
+        , 'b1': np.zeros(4, dtype=np.float32)
+        , 'W2': random_state.normal(size=(4, 4)).astype(np.float32)
+        , 'b2': np.zeros(4, dtype=np.float32)
+        , 'W3': random_state.normal(size=(4, nb_outputs)).astype(np.float32)
+        , 'b3': np.zeros(nb_outputs, dtype=np.float32)
+    }
+
+class TestNpRuntime(unittest.TestCase):
+
+    def test_runtime_without_tensorflow(self):
+        output = subprocess.check_output([
+            sys.executable, '-c', 'import sys; sys.path.append("' + dir + '/../.."); import utils.np_runtime; print("tensorflow" in sys.modules)'
+        ])
+        self.assertEqual(output.decode('utf-8').strip(), 'False')
+
+    def test_q_agent(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            arrays = get_weights(5, 2)
+            np.savez_compressed(tmp_dir + '/agent.npz', kind=np.array('q'), agent_name=np.array('DQNAgent'), env_name=np.array('CartPole-v0'), **arrays)
+            agent = np_runtime.NumpyAgent(tmp_dir + '/agent.npz')
+
+        obs = np.array([.1, -.2, .3, .4])
+        inputs = np.array([ np.concatenate((obs, [0])) ], dtype=np.float32)
+        self.assertEqual(agent.agent_name, 'DQNAgent')
+        self.assertEqual(agent.act(obs), np.argmax(np_runtime.np_capacities.value_f(arrays, inputs)[0]))
+
+        observations = np.random.RandomState(0).normal(size=(8, 4))
+        self.assertEqual(agent.act_batch(observations), [ agent.act(obs) for obs in observations ])
+
+    def test_policy_agent(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            np.savez_compressed(tmp_dir + '/agent.npz', kind=np.array('policy'), agent_name=np.array('A2CAgent'), env_name=np.array('CartPole-v0'), **get_weights(5, 2))
+            agent = np_runtime.NumpyAgent(tmp_dir + '/agent.npz', greedy=False, random_seed=0)
+
+        actions = [ agent.act(np.array([.1, -.2, .3, .4])) for i in range(50) ]
+        self.assertEqual(set(actions) <= {0, 1}, True)
+
+    def test_tabular_agent(self):
+        phi_config = phis.getPhiConfig('CartPole-v0', True)
+        Qs = np.zeros((phi_config['nb_state'], 2), dtype=np.float32)
+        obs = np.array([.1, -.2, .3, .4])
+        Qs[phi_config['phi'](obs), 1] = 1.
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            np.savez_compressed(tmp_dir + '/agent.npz', kind=np.array('tabular'), agent_name=np.array('TabularQAgent'), env_name=np.array('CartPole-v0'), Qs=Qs, debug=np.array(True))
+            agent = np_runtime.NumpyAgent(tmp_dir + '/agent.npz')
+
+        self.assertEqual(agent.act(obs), 1)
+        self.assertEqual(agent.act_batch([obs, obs]), [1, 1])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,54 @@
+import os, sys, unittest, threading
+import numpy as np
+
+dir = os.path.dirname(os.path.realpath(__file__))
+sys.path.append(dir + '/../..')
+
+from utils.prefetcher import Prefetcher
+from utils.replay_memory import ReplayMemory
+
+class TestPrefetcher(unittest.TestCase):
+
+    def test_prefetch(self):
+        memory = ReplayMemory(np.dtype([('values', 'int32')]), 100)
+        random_state = np.random.RandomState(0)
+        prefetcher = Prefetcher(lambda: memory.sample(10, random_state), lambda batch: batch['values'] * 2, depth=2)
+
+        for i in range(50):
+            with prefetcher.lock:
+                memory.append((i,))
+            batch = prefetcher.get()
+            self.assertEqual(batch.shape, (10,))
+            # Batches sampled ahead only contain transitions appended before them
+            self.assertEqual(bool(np.all(batch % 2 == 0)), True)
+            self.assertEqual(bool(np.all(batch <= 2 * i)), True)
+
+    def test_prefetch_error(self):
+        def sample():
+            raise ValueError('empty')
+        prefetcher = Prefetcher(sample)
+
+        with self.assertRaises(Exception):
+            prefetcher.get()
+
+    def test_started_by_first_get(self):
+        prefetcher = Prefetcher(lambda: 1)
+        self.assertEqual(prefetcher.thread, None)
+        self.assertEqual(prefetcher.get(), 1)
+        self.assertEqual(isinstance(prefetcher.thread, threading.Thread), True)
+
+    def test_close(self):
+        prefetcher = Prefetcher(lambda: 1, depth=1)
+        self.assertEqual(prefetcher.get(), 1)
+        thread = prefetcher.thread
+        prefetcher.close()
+        self.assertEqual(thread.is_alive(), False)
+        self.assertEqual(prefetcher.thread, None)
+
+        # The next request starts a new thread
+        self.assertEqual(prefetcher.get(), 1)
+        self.assertEqual(prefetcher.thread.is_alive(), True)
+        prefetcher.close()
+
+if __name__ == "__main__":
+    unittest.main()
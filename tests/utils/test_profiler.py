@@ -0,0 +1,66 @@
+import os, sys, time, unittest
+
+dir = os.path.dirname(os.path.realpath(__file__))
+sys.path.append(dir + '/../..')
+
+from utils.profiler import Profiler
+
+class TestProfiler(unittest.TestCase):
+
+    def test_profiler_exclusive_phases(self):
+        profiler = Profiler()
+        with profiler.phase('act'):
+            time.sleep(.02)
+            with profiler.phase('phi'):
+                time.sleep(.02)
+
+        self.assertEqual(profiler.calls['act'], 1)
+        self.assertEqual(profiler.calls['phi'], 1)
+        self.assertEqual(profiler.seconds['act'] < .035, True)
+        self.assertEqual(profiler.seconds['phi'] >= .02, True)
+
+    def test_profiler_wrap_run(self):
+        profiler = Profiler()
+        run = profiler.wrap_run(lambda x: x)
+        act = profiler.wrap('act', lambda x: run(x))
+
+        self.assertEqual(act(1), 1)
+        self.assertEqual(run(2), 2)
+        self.assertEqual(run(3), 3)
+        self.assertEqual(profiler.sess_runs['act'], 1)
+        self.assertEqual(profiler.sess_runs['train'], 2)
+        self.assertEqual(profiler.calls['train'], 2)
+
+    def test_profiler_fetch_phases(self):
+        profiler = Profiler()
+        run = profiler.wrap_run(lambda fetches: fetches, [('summary_t', 'summary'), (['assign_1', 'assign_2'], 'fixed_net_update')])
+
+        run(['summary_t', 'inc_episode_id'])
+        run(['assign_1', 'assign_2'])
+        run('train_op')
+        run(fetches=['loss', 'train_op'])
+        self.assertEqual(profiler.sess_runs['summary'], 1)
+        self.assertEqual(profiler.sess_runs['fixed_net_update'], 1)
+        self.assertEqual(profiler.sess_runs['train'], 2)
+
+    def test_profiler_report(self):
+        profiler = Profiler()
+        with profiler.phase('env_step'):
+            time.sleep(.01)
+        time.sleep(.01)
+        profiler.count_update()
+        report = profiler.report(2, 10)
+
+        self.assertEqual(report['episodes'], 2)
+        self.assertEqual(report['steps'], 10)
+        self.assertEqual(report['steps_per_sec'] > 0, True)
+        self.assertEqual(report['updates'], 1)
+        self.assertEqual(sorted(report['phases'].keys()), ['env_step', 'other'])
+        self.assertEqual(report['phases']['other']['seconds'] >= .01, True)
+
+        profiler.reset()
+        self.assertEqual(len(profiler.seconds), 0)
+        self.assertEqual(profiler.nb_updates, 0)
+
+if __name__ == "__main__":
+    unittest.main()
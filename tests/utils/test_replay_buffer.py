@@ -64,6 +64,24 @@ class TestReplayBuffer(unittest.TestCase):
         self.assertEqual(len(samples), 3)
         self.assertEqual(len(samples[0]), 5)
 
+    def test_replay_buffer_sample_all(self):
+        templates = [('test1', tf.int32, ())]
+        capacity = 3
+        rep_buf = replay_buffer.ReplayBuffer(templates, capacity)
+        value = tf.placeholder(tf.int32, shape=[])
+        inc_index_op = rep_buf.append([value])
+        with tf.control_dependencies([inc_index_op]):
+            samples_t = rep_buf.sample(100)
+
+        sess = tf.InteractiveSession()
+        sess.run(tf.global_variables_initializer())
+        # The sample is taken after the append of the same run, the last element can be drawn
+        samples = sess.run(samples_t, feed_dict={ value: 1 })
+        self.assertEqual(set(samples[0]), set([1]))
+        sess.run(inc_index_op, feed_dict={ value: 2 })
+        samples = sess.run(samples_t, feed_dict={ value: 3 })
+        self.assertEqual(set(samples[0]), set([1, 2, 3]))
+
     def test_prioritized_replay_buffer(self):
         templates = [('test1', tf.int32, ()), ('test2', tf.int32, (1,)), ('test3', tf.int32, (2, 2))]
         capacity = 5
@@ -0,0 +1,176 @@
+import os, sys, unittest, tempfile
+import numpy as np
+
+dir = os.path.dirname(os.path.realpath(__file__))
+sys.path.append(dir + '/../..')
+
+from utils.replay_memory import ReplayMemory, FrameReplayMemory, get_index_dtype
+
+dtype = np.dtype([
+    ('states', 'float32', (3,))
+    , ('actions', 'int32')
+    , ('rewards', 'float32')
+])
+
+class TestReplayMemory(unittest.TestCase):
+
+    def test_ring(self):
+        memory = ReplayMemory(dtype, 3)
+        self.assertEqual(memory.size(), 0)
+        for i in range(5):
+            memory.append(([i, i, i], i, float(i)))
+
+        self.assertEqual(memory.size(), 3)
+        # The two oldest transitions were overwritten
+        self.assertEqual(sorted(memory.columns['actions'].tolist()), [2, 3, 4])
+        np.testing.assert_array_equal(memory.columns['states'][memory.columns['actions'] == 4], [[4, 4, 4]])
+
+    def test_sample(self):
+        memory = ReplayMemory(dtype, 10)
+        for i in range(4):
+            memory.append(([i, i, i], i, float(i)))
+
+        samples = memory.sample(100, np.random.RandomState(0))
+        self.assertEqual(samples['states'].shape, (100, 3))
+        self.assertEqual(samples['states'].dtype, np.float32)
+        self.assertEqual(set(samples['actions'].tolist()), set([0, 1, 2, 3]))
+        # Columns of a same transition stay aligned
+        np.testing.assert_array_equal(samples['states'][:, 0], samples['actions'])
+        np.testing.assert_array_equal(samples['rewards'], samples['actions'])
+
+    def test_memmap_reopen(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            memory = ReplayMemory(dtype, 4, tmp_dir + '/replay_memory')
+            for i in range(6):
+                memory.append(([i, i, i], i, float(i)))
+            memory.flush()
+            del memory
+
+            memory = ReplayMemory(dtype, 4, tmp_dir + '/replay_memory')
+            self.assertEqual(memory.index, 6)
+            self.assertEqual(memory.size(), 4)
+            self.assertEqual(sorted(memory.columns['actions'].tolist()), [2, 3, 4, 5])
+            memory.append(([6, 6, 6], 6, 6.))
+            self.assertEqual(sorted(memory.columns['actions'].tolist()), [3, 4, 5, 6])
+
+            with self.assertRaises(Exception):
+                ReplayMemory(dtype, 8, tmp_dir + '/replay_memory')
+
+class TestIndexDtype(unittest.TestCase):
+
+    def test_get_index_dtype(self):
+        self.assertEqual(get_index_dtype(2), np.uint8)
+        self.assertEqual(get_index_dtype(256), np.uint8)
+        self.assertEqual(get_index_dtype(257), np.uint16)
+        self.assertEqual(get_index_dtype(2**10 + 1), np.uint16)
+        self.assertEqual(get_index_dtype(2**16 + 1), np.uint32)
+
+def play_episodes(memory, lengths):
+    # Observations are [episode_id, t], the transitions are kept to compare them with the samples
+    transitions = []
+    for episode_id, length in enumerate(lengths):
+        for t in range(length):
+            done = t == length - 1
+            transition = ([episode_id, t], t % 2, float(t), [episode_id, t + 1], done)
+            memory.append(*transition)
+            transitions.append(transition)
+
+    return transitions
+
+class TestFrameReplayMemory(unittest.TestCase):
+
+    def check_samples(self, samples, transitions):
+        expected = set((tuple(obs), action, reward, tuple(next_obs), int(done)) for obs, action, reward, next_obs, done in transitions)
+        for i in range(len(samples['actions'])):
+            transition = (
+                tuple(samples['observations'][i].tolist())
+                , int(samples['actions'][i])
+                , float(samples['rewards'][i])
+                , tuple(samples['next_observations'][i].tolist())
+                , int(samples['dones'][i])
+            )
+            self.assertIn(transition, expected)
+
+    def test_sample(self):
+        memory = FrameReplayMemory((2,), 100)
+        transitions = play_episodes(memory, [3, 5, 1, 4])
+
+        self.assertEqual(memory.size(), 13)
+        samples = memory.sample(500, np.random.RandomState(0))
+        self.check_samples(samples, transitions)
+        # Every transition is drawn, the terminal ones included
+        self.assertEqual(int(samples['dones'].sum() > 0), 1)
+        self.assertEqual(len(set(zip(samples['observations'][:, 0].tolist(), samples['observations'][:, 1].tolist()))), 13)
+
+    def test_ring(self):
+        memory = FrameReplayMemory((2,), 12)
+        transitions = play_episodes(memory, [4, 4, 4, 4])
+
+        samples = memory.sample(500, np.random.RandomState(0))
+        # Only the transitions whose both observations are still stored can be sampled,
+        # the last transition of the second episode is kept with its terminal observation
+        self.check_samples(samples, transitions[-9:])
+        self.assertEqual(memory.size(), 9)
+
+    def test_cut(self):
+        memory = FrameReplayMemory((2,), 100)
+        # Two environments appending interleaved segments
+        transitions = []
+        for t in range(6):
+            for env_id in [0, 1]:
+                transition = ([env_id, t], env_id, float(t), [env_id, t + 1], t == 5)
+                memory.cut()
+                memory.append(*transition)
+                transitions.append(transition)
+
+        self.assertEqual(memory.size(), 12)
+        self.check_samples(memory.sample(500, np.random.RandomState(0)), transitions)
+
+    def test_compact(self):
+        memory = FrameReplayMemory((2,), 10, obs_dtype='float16', action_dtype='uint8')
+        transitions = play_episodes(memory, [3])
+
+        samples = memory.sample(10, np.random.RandomState(0))
+        self.assertEqual(samples['observations'].dtype, np.float16)
+        self.assertEqual(samples['actions'].dtype, np.uint8)
+        self.check_samples(samples, transitions)
+
+    def test_memmap_reopen(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            memory = FrameReplayMemory((2,), 20, tmp_dir + '/replay_memory')
+            transitions = play_episodes(memory, [3, 2])
+            memory.flush()
+            del memory
+
+            memory = FrameReplayMemory((2,), 20, tmp_dir + '/replay_memory')
+            self.assertEqual(memory.size(), 5)
+            transitions += play_episodes(memory, [0, 0, 2])
+            self.check_samples(memory.sample(100, np.random.RandomState(0)), transitions)
+            self.assertEqual(memory.size(), 7)
+
+    def test_memmap_reopen_continuing(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            memory = FrameReplayMemory((2,), 20, tmp_dir + '/replay_memory')
+            memory.append([0, 0], 0, 1., [0, 1], False)
+            memory.flush()
+            del memory
+
+            # The next observation of the reopened memory still waits for its transition
+            memory = FrameReplayMemory((2,), 20, tmp_dir + '/replay_memory')
+            self.assertEqual(memory.continuing, True)
+            memory.cut()
+            self.assertEqual(memory.frames.index, 2)
+
+    def test_capacity(self):
+        with self.assertRaises(Exception):
+            FrameReplayMemory((2,), 1)
+
+        memory = FrameReplayMemory((2,), 2)
+        with self.assertRaises(Exception):
+            memory.sample(4, np.random.RandomState(0))
+        transitions = play_episodes(memory, [3])
+        self.assertEqual(memory.size(), 1)
+        self.check_samples(memory.sample(4, np.random.RandomState(0)), transitions[-1:])
+
+if __name__ == "__main__":
+    unittest.main()
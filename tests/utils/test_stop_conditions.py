@@ -0,0 +1,41 @@
+import os, sys, unittest
+
+dir = os.path.dirname(os.path.realpath(__file__))
+sys.path.append(dir + '/../..')
+
+from utils import stop_conditions
+
+class TestStopConditions(unittest.TestCase):
+
+    def test_moving_average(self):
+        average = stop_conditions.MovingAverage(3)
+        self.assertEqual(average.update(3), 3)
+        self.assertEqual(average.update(6), 4.5)
+        self.assertEqual(average.full(), False)
+        self.assertEqual(average.update(9), 6)
+        self.assertEqual(average.update(12), 9)
+        self.assertEqual(average.full(), True)
+
+    def test_score_threshold(self):
+        condition = stop_conditions.ScoreThreshold(195, window=3)
+        self.assertEqual(condition.update(200), False)
+        self.assertEqual(condition.update(200), False)
+        self.assertEqual(condition.update(180), False)
+        self.assertEqual(condition.update(200), False)
+        self.assertEqual(condition.update(200), False)
+        self.assertEqual(condition.update(200), True)
+
+    def test_plateau(self):
+        condition = stop_conditions.Plateau(2, window=1, min_delta=1)
+        self.assertEqual(condition.update(10), False)
+        self.assertEqual(condition.update(20), False)
+        self.assertEqual(condition.update(20.5), False)
+        self.assertEqual(condition.update(19), True)
+
+    def test_get_stop_conditions(self):
+        self.assertEqual(stop_conditions.get_stop_conditions({}), [])
+        conditions = stop_conditions.get_stop_conditions({'stop_score': 195, 'stop_patience': 100})
+        self.assertEqual([ condition.name for condition in conditions ], ['solved', 'plateau'])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,16 @@
+import os, sys, unittest
+
+dir = os.path.dirname(os.path.realpath(__file__))
+sys.path.append(dir + '/../..')
+
+from utils.tracer import parse_episodes
+
+class TestTracer(unittest.TestCase):
+
+    def test_parse_episodes(self):
+        self.assertEqual(parse_episodes(''), set())
+        self.assertEqual(parse_episodes('3'), {3})
+        self.assertEqual(parse_episodes('3, 10-12'), {3, 10, 11, 12})
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,16 +1,19 @@
 agentList="
+  TabularMCAgent
+  TabularTD0Agent
+  TabularNStepTD0Agent
+  TabularTDLambdaAgent
   TabularQAgent
-  BackwardTabularQAgent
+  TabularQLambdaBackwardAgent
   TabularQERAgent
-  TabularFixedQERAgent
-  TabularQOfflineERAgent
-  TabularFixedQOfflineERAgent
-  BackwardTabularFixedQOfflineERAgent
+  TabularQDoubleERAgent
+  TabularExpectedSarsaAgent
+  TabularSigmaAgent
+  TabularSigmaLambdaBackwardAgent
 
   DeepTDAgent
   DQNAgent
   DDQNAgent
-  DeepFixedQOfflineERAgent
 
   DeepMCPolicyAgent
   MCActorCriticAgent
@@ -20,5 +23,5 @@ agentList="
 "
 
 for agent in $agentList; do
-  python3 main.py --best --agent_name "$agent"
+  python3 main.py --best --agent_name "$agent" --stop_score 195 --stop_window 100
 done
\ No newline at end of file
@@ -0,0 +1,114 @@
+import threading, queue, time
+
+class Actor(object):
+    """
+    Steps its own environment in a thread and pushes its transitions to the learner queue
+    by segments of consecutive steps: ('segment', [(obs, act, reward, next_obs, done), ...])
+    at most every segment_length steps and ('episode', score) at the end of each episode.
+    act must not use the session (e.g. a NumPy copy of the network).
+    """
+    def __init__(self, env, act, transitions, stop_event, segment_length=20):
+        self.env = env
+        self.act = act
+        self.transitions = transitions
+        self.stop_event = stop_event
+        self.segment_length = segment_length
+        self.nb_steps = 0
+        self.nb_episodes = 0
+
+        self.thread = threading.Thread(target=self.run, name='actor')
+        self.thread.daemon = True
+
+    def start(self):
+        self.thread.start()
+
+    def join(self, timeout=None):
+        self.thread.join(timeout)
+
+    def put(self, item):
+        # A full queue blocks the actor until the learner catches up or the training stops
+        while not self.stop_event.is_set():
+            try:
+                self.transitions.put(item, timeout=.1)
+                return True
+            except queue.Full:
+                continue
+
+        return False
+
+    def run(self):
+        try:
+            while not self.stop_event.is_set():
+                obs = self.env.reset()
+                score = 0
+                done = False
+                segment = []
+                while not done:
+                    act = self.act(obs)
+                    next_obs, reward, done, info = self.env.step(act)
+                    score += reward
+                    self.nb_steps += 1
+                    segment.append((obs, act, reward, next_obs, done))
+                    if done or len(segment) >= self.segment_length:
+                        if not self.put(('segment', segment)):
+                            return
+                        segment = []
+                    obs = next_obs
+
+                self.nb_episodes += 1
+                if not self.put(('episode', score)):
+                    return
+        except Exception as e:
+            self.put(('error', e))
+
+def drain(transitions, block=False, timeout=1.):
+    # Every item available in the queue, waiting for the first one if block is set
+    items = []
+    if block:
+        try:
+            items.append(transitions.get(timeout=timeout))
+        except queue.Empty:
+            return items
+    while True:
+        try:
+            items.append(transitions.get_nowait())
+        except queue.Empty:
+            return items
+
+class ActorLearnerStats(object):
+    """
+    Rates of the actors and of the learner, the replay ratio is the number of sampled
+    transitions per transition produced by the actors.
+    """
+    def __init__(self, nb_actors, batch_size):
+        self.nb_actors = nb_actors
+        self.batch_size = batch_size
+        self.start_time = time.perf_counter()
+        self.nb_steps = 0
+        self.nb_updates = 0
+        self.nb_depths = 0
+        self.depth_sum = 0
+        self.depth_max = 0
+
+    def seconds(self):
+        return time.perf_counter() - self.start_time
+
+    def add_depth(self, depth):
+        self.nb_depths += 1
+        self.depth_sum += depth
+        self.depth_max = max(self.depth_max, depth)
+
+    def report(self):
+        seconds = self.seconds()
+
+        return {
+            'nb_actors': self.nb_actors
+            , 'seconds': seconds
+            , 'env_steps': self.nb_steps
+            , 'updates': self.nb_updates
+            , 'env_steps_per_sec': self.nb_steps / seconds if seconds > 0 else 0.
+            , 'updates_per_sec': self.nb_updates / seconds if seconds > 0 else 0.
+            , 'replay_ratio': self.nb_updates * self.batch_size / self.nb_steps if self.nb_steps > 0 else 0.
+            , 'queue_depth_mean': self.depth_sum / self.nb_depths if self.nb_depths > 0 else 0.
+            , 'queue_depth_max': self.depth_max
+        }
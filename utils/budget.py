@@ -0,0 +1,41 @@
+import time
+
+class BudgetEnv(object):
+    """
+    Environment wrapper ending the current episode as soon as the step or time budget
+    is exhausted (a budget of 0 means no limit). The agent sees the truncation as a
+    regular end of episode.
+    """
+    def __init__(self, env, max_steps=0, max_seconds=0):
+        self.env = env
+        self.max_steps = max_steps
+        self.max_seconds = max_seconds
+
+        self.total_steps = 0
+        self.start_time = time.time()
+        self.truncated = False
+
+    def exhausted(self):
+        if self.max_steps > 0 and self.total_steps >= self.max_steps:
+            return True
+        if self.max_seconds > 0 and time.time() - self.start_time >= self.max_seconds:
+            return True
+
+        return False
+
+    def reset(self):
+        self.truncated = False
+        return self.env.reset()
+
+    def step(self, action):
+        obs, reward, done, info = self.env.step(action)
+        self.total_steps += 1
+
+        if not done and self.exhausted():
+            done = True
+            self.truncated = True
+
+        return obs, reward, done, info
+
+    def __getattr__(self, name):
+        return getattr(self.env, name)
@@ -0,0 +1,196 @@
+import os, json, time, threading, queue
+import numpy as np
+
+index_filename = 'checkpoints.json'
+
+def fsync_dir(path):
+    # The renames are only durable once the directory entry itself is synced
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+def read_index(checkpoint_dir):
+    path = checkpoint_dir + '/' + index_filename
+    if not os.path.isfile(path):
+        return []
+    with open(path, 'r') as f:
+        return json.load(f)['checkpoints']
+
+def get_latest_checkpoint(checkpoint_dir):
+    # Returns the index entry of the most recent checkpoint written by an AsyncCheckpointer
+    checkpoints = read_index(checkpoint_dir)
+    if len(checkpoints) == 0:
+        return None
+
+    return checkpoints[-1]
+
+def get_delta(previous, weights):
+    # Only the rows changed since the previous checkpoint are stored, the arrays
+    # which can not be compared (scalars, new or reshaped variables) are stored in full
+    arrays = {}
+    for name, value in weights.items():
+        base = previous.get(name)
+        if base is None or value.ndim == 0 or base.shape != value.shape or base.dtype != value.dtype:
+            arrays[name] = value
+            continue
+
+        rows = np.flatnonzero(np.any((value != base).reshape(len(value), -1), axis=1))
+        arrays['delta_rows/' + name] = rows
+        arrays['delta_values/' + name] = value[rows]
+
+    return arrays
+
+def load_checkpoint(checkpoint_dir, checkpoint):
+    # A delta checkpoint is rebuilt by applying the chain of deltas on its last full snapshot
+    checkpoints = { c['filename']: c for c in read_index(checkpoint_dir) }
+    chain = [checkpoint]
+    while chain[-1].get('base') is not None:
+        if chain[-1]['base'] not in checkpoints:
+            raise Exception('The base {} of the checkpoint {} is missing'.format(chain[-1]['base'], chain[-1]['filename']))
+        chain.append(checkpoints[chain[-1]['base']])
+
+    weights = {}
+    for c in reversed(chain):
+        with np.load(checkpoint_dir + '/' + c['filename']) as data:
+            for key in data.files:
+                if key.startswith('delta_rows/'):
+                    name = key[len('delta_rows/'):]
+                    weights[name][data[key]] = data['delta_values/' + name]
+                elif not key.startswith('delta_values/'):
+                    weights[key] = data[key]
+
+    return weights
+
+def get_retained(checkpoints, keep_last, keep_best):
+    # The last keep_last checkpoints are kept along with the keep_best ones with the highest score
+    retained = set(checkpoint['filename'] for checkpoint in checkpoints[-max(keep_last, 1):])
+    scored = [ checkpoint for checkpoint in checkpoints if checkpoint['score'] is not None ]
+    for checkpoint in sorted(scored, key=lambda checkpoint: checkpoint['score'], reverse=True)[:keep_best]:
+        retained.add(checkpoint['filename'])
+
+    # The deltas need every checkpoint of their chain up to the full snapshot
+    by_filename = { checkpoint['filename']: checkpoint for checkpoint in checkpoints }
+    for filename in list(retained):
+        base = by_filename[filename].get('base')
+        while base is not None and base in by_filename:
+            retained.add(base)
+            base = by_filename[base].get('base')
+
+    return [ checkpoint for checkpoint in checkpoints if checkpoint['filename'] in retained ]
+
+class AsyncCheckpointer(object):
+    """
+    Writes snapshots of the variables of an agent from a background thread. The training
+    loop only pays for the snapshot (one session run), the disk is never waited for
+    unless max_pending snapshots are already waiting to be written.
+    Each checkpoint is written in a temporary file renamed once complete, an interrupted
+    write never corrupts the last checkpoint.
+    With full_every > 1, only one checkpoint out of full_every is a full snapshot, the
+    others store the rows changed since the previous checkpoint.
+    """
+    def __init__(self, checkpoint_dir, keep_last=5, keep_best=1, fsync=True, max_pending=2, full_every=1):
+        self.checkpoint_dir = checkpoint_dir
+        self.keep_last = keep_last
+        self.keep_best = keep_best
+        self.fsync = fsync
+        self.full_every = full_every
+
+        # Last snapshot written, the deltas of the next one are computed against it
+        self.previous = None
+        self.previous_filename = None
+        self.nb_deltas = 0
+
+        self.checkpoints = read_index(checkpoint_dir)
+        self.error = None
+        self.queue = queue.Queue(max_pending)
+        self.thread = threading.Thread(target=self.run, name='checkpointer')
+        self.thread.daemon = True
+        self.thread.start()
+
+    def check_error(self):
+        if self.error is not None:
+            error, self.error = self.error, None
+            raise Exception('Writing a checkpoint in {} failed: {}'.format(self.checkpoint_dir, error))
+
+    def save(self, weights, episode_id, global_step, score=None):
+        self.check_error()
+        self.queue.put({
+            'weights': weights
+            , 'episode_id': int(episode_id)
+            , 'global_step': int(global_step)
+            , 'score': None if score is None else float(score)
+        })
+
+    def flush(self):
+        # Blocks until every pending snapshot is written
+        self.queue.join()
+        self.check_error()
+
+    def close(self):
+        # Writes the pending snapshots and stops the thread, the last snapshot is released
+        if self.thread is None:
+            return
+
+        self.queue.put(None)
+        self.thread.join()
+        self.thread = None
+        self.previous = None
+        self.check_error()
+
+    def run(self):
+        while True:
+            snapshot = self.queue.get()
+            if snapshot is None:
+                self.queue.task_done()
+                break
+            try:
+                self.write(snapshot)
+            except Exception as e:
+                self.error = e
+            finally:
+                self.queue.task_done()
+
+    def write_file(self, path, write):
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            write(f)
+            if self.fsync:
+                f.flush()
+                os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+
+    def write(self, snapshot):
+        if not os.path.exists(self.checkpoint_dir):
+            os.makedirs(self.checkpoint_dir)
+
+        filename = 'agent-ep_%d-%d.npz' % (snapshot['episode_id'], snapshot['global_step'])
+        full = self.previous is None or filename == self.previous_filename or self.nb_deltas + 1 >= self.full_every
+        arrays = snapshot['weights'] if full else get_delta(self.previous, snapshot['weights'])
+        self.write_file(self.checkpoint_dir + '/' + filename, lambda f: np.savez(f, **arrays))
+
+        checkpoint = {
+            'filename': filename
+            , 'base': None if full else self.previous_filename
+            , 'episode_id': snapshot['episode_id']
+            , 'global_step': snapshot['global_step']
+            , 'score': snapshot['score']
+            , 'time': time.time()
+        }
+        checkpoints = [ c for c in self.checkpoints if c['filename'] != filename ] + [checkpoint]
+        retained = get_retained(checkpoints, self.keep_last, self.keep_best)
+
+        # The index is updated before removing the files, it never references a missing checkpoint
+        self.write_file(self.checkpoint_dir + '/' + index_filename, lambda f: f.write(json.dumps({ 'checkpoints': retained }).encode('utf-8')))
+        if self.fsync:
+            fsync_dir(self.checkpoint_dir)
+        self.checkpoints = retained
+        self.previous = snapshot['weights']
+        self.previous_filename = filename
+        self.nb_deltas = 0 if full else self.nb_deltas + 1
+
+        retained_filenames = set(c['filename'] for c in retained)
+        for c in checkpoints:
+            if c['filename'] not in retained_filenames and os.path.isfile(self.checkpoint_dir + '/' + c['filename']):
+                os.remove(self.checkpoint_dir + '/' + c['filename'])
@@ -0,0 +1,108 @@
+import time
+import multiprocessing
+import numpy as np
+
+def get_n_step_returns(rewards, bootstrap, discount):
+    # Discounted returns of a segment of consecutive steps, bootstrapped with the value
+    # of the state following its last step (0 at the end of an episode)
+    returns = np.zeros(len(rewards), dtype=np.float32)
+    expected_return = bootstrap
+    for t in range(len(rewards) - 1, -1, -1):
+        expected_return = rewards[t] + discount * expected_return
+        returns[t] = expected_return
+
+    return returns
+
+class SharedParams(object):
+    """
+    Variables shared by the worker processes in multiprocessing.RawArray buffers, each
+    process reads and updates them in place through NumPy views, without any lock (Hogwild).
+    The updates use RMSProp with statistics shared the same way, lrs gives the learning
+    rate of each variable.
+    Pass it to multiprocessing.Process at its creation, the buffers can not go through a queue.
+    """
+    def __init__(self, weights, lrs, decay=.99, epsilon=1e-6):
+        self.shapes = { name: np.shape(value) for name, value in weights.items() }
+        self.lrs = lrs
+        self.decay = decay
+        self.epsilon = epsilon
+
+        self.buffers = {}
+        self.stat_buffers = {}
+        for name, shape in self.shapes.items():
+            size = int(np.prod(shape))
+            self.buffers[name] = multiprocessing.RawArray('f', size)
+            self.stat_buffers[name] = multiprocessing.RawArray('f', size)
+        self.set_views()
+        self.set(weights)
+
+    def set_views(self):
+        self.params = { name: np.frombuffer(buffer, dtype=np.float32).reshape(self.shapes[name]) for name, buffer in self.buffers.items() }
+        self.stats = { name: np.frombuffer(buffer, dtype=np.float32).reshape(self.shapes[name]) for name, buffer in self.stat_buffers.items() }
+
+    def __getstate__(self):
+        # The views are rebuilt on the buffers inherited by the process
+        state = self.__dict__.copy()
+        del state['params']
+        del state['stats']
+
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.set_views()
+
+    def get(self):
+        # A copy, the other processes keep updating the shared values
+        return { name: np.copy(value) for name, value in self.params.items() }
+
+    def set(self, weights):
+        for name, value in weights.items():
+            self.params[name][...] = value
+
+    def apply(self, grads):
+        # Concurrent updates of the same values can overwrite each other, which is rare
+        # and harmless enough with sparse enough gradients
+        for name, grad in grads.items():
+            stats = self.stats[name]
+            stats *= self.decay
+            stats += (1 - self.decay) * np.square(grad)
+            self.params[name] -= self.lrs[name] * grad / np.sqrt(stats + self.epsilon)
+
+class HogwildStats(object):
+    """
+    Number of environment steps and updates of each worker, in a shared buffer where each
+    worker only writes its own slots.
+    """
+    def __init__(self, nb_workers):
+        self.nb_workers = nb_workers
+        self.counters = multiprocessing.RawArray('d', 2 * nb_workers)
+        self.start_time = time.perf_counter()
+
+    def add(self, worker_id, nb_steps):
+        self.counters[2 * worker_id] += nb_steps
+        self.counters[2 * worker_id + 1] += 1
+
+    def nb_steps(self):
+        return int(sum(self.counters[0::2]))
+
+    def nb_updates(self):
+        return int(sum(self.counters[1::2]))
+
+    def seconds(self):
+        return time.perf_counter() - self.start_time
+
+    def report(self):
+        seconds = self.seconds()
+        nb_steps = self.nb_steps()
+        nb_updates = self.nb_updates()
+
+        return {
+            'nb_workers': self.nb_workers
+            , 'seconds': seconds
+            , 'env_steps': nb_steps
+            , 'updates': nb_updates
+            , 'env_steps_per_sec': nb_steps / seconds if seconds > 0 else 0.
+            , 'updates_per_sec': nb_updates / seconds if seconds > 0 else 0.
+            , 'worker_env_steps': [ int(steps) for steps in self.counters[0::2] ]
+        }
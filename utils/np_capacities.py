@@ -0,0 +1,43 @@
+import numpy as np
+
+# NumPy mirrors of the acting part of agents/capacities.py, used to select the actions
+# on the host without a session run. The weights are a dict of the W1..W3, b1..b3
+# variables of a value_f or policy scope.
+
+network_variables = ['W1', 'b1', 'W2', 'b2', 'W3', 'b3']
+
+def value_f(weights, inputs):
+    a1 = np.maximum(np.dot(inputs, weights['W1']) + weights['b1'], 0)
+    a2 = np.maximum(np.dot(a1, weights['W2']) + weights['b2'], 0)
+
+    return np.dot(a2, weights['W3']) + weights['b3']
+
+def policy(weights, inputs):
+    logits = value_f(weights, inputs)
+    exps = np.exp(logits - np.max(logits, axis=-1, keepdims=True))
+
+    return exps / np.sum(exps, axis=-1, keepdims=True)
+
+def get_eps(N, N0, min_eps, dtype=float):
+    return max(dtype(N0) / (dtype(N0) + dtype(N)), dtype(min_eps))
+
+def get_uniform(random_state):
+    # The uniform draws are float32, as when they are fed to the graph
+    return np.float32(random_state.random_sample())
+
+def get_eps_greedy_draws(nb_actions, random_state):
+    # Both draws are made at each step, the graph of capacities.eps_greedy can be fed with them
+    return get_uniform(random_state), random_state.randint(nb_actions)
+
+def eps_greedy(q_values, N, N0, min_eps, random_state):
+    uniform, random_action = get_eps_greedy_draws(len(q_values), random_state)
+    if uniform > get_eps(N, N0, min_eps, np.float32):
+        return int(np.argmax(q_values))
+
+    return random_action
+
+def sample(probs, random_state):
+    cumulative_probs = np.cumsum(probs)
+    action = np.searchsorted(cumulative_probs, get_uniform(random_state) * cumulative_probs[-1], side='right')
+
+    return int(min(action, len(probs) - 1))
@@ -0,0 +1,85 @@
+import argparse, os, sys
+import numpy as np
+
+dir = os.path.dirname(os.path.realpath(__file__))
+sys.path.append(dir + '/..')
+
+from utils import phis, np_capacities
+
+# Inference only runtime of the agents exported with BasicAgent.export,
+# it must never import TensorFlow.
+
+class NumpyAgent(object):
+    def __init__(self, path, greedy=True, random_seed=None):
+        with np.load(path) as data:
+            self.kind = str(data['kind'])
+            self.agent_name = str(data['agent_name'])
+            self.env_name = str(data['env_name'])
+            if self.kind == 'tabular':
+                self.Qs = data['Qs']
+                self.phi = phis.getPhiConfig(self.env_name, bool(data['debug']))['phi']
+            elif self.kind == 'q' or self.kind == 'policy':
+                self.weights = { name: data[name] for name in np_capacities.network_variables }
+            else:
+                raise Exception('Unknown kind of exported agent: %s' % self.kind)
+
+        # Policy agents sample their action unless greedy, the others always act greedily
+        self.greedy = greedy
+        self.random_state = np.random.RandomState(random_seed)
+
+    def act(self, obs, done=False):
+        if self.kind == 'tabular':
+            return int(np.argmax(self.Qs[self.phi(obs, done)]))
+
+        inputs = np.array([ np.concatenate((obs, [0])) ], dtype=np.float32)
+        if self.kind == 'q':
+            return int(np.argmax(np_capacities.value_f(self.weights, inputs)[0]))
+
+        probs = np_capacities.policy(self.weights, inputs)[0]
+        if self.greedy:
+            return int(np.argmax(probs))
+        return np_capacities.sample(probs, self.random_state)
+
+    def act_batch(self, observations):
+        # One forward pass for all the observations
+        if self.kind == 'tabular':
+            state_ids = [ self.phi(obs) for obs in observations ]
+            return [ int(action) for action in np.argmax(self.Qs[state_ids], 1) ]
+
+        observations = np.array(observations, dtype=np.float32)
+        inputs = np.concatenate((observations, np.zeros((len(observations), 1), dtype=np.float32)), 1)
+        if self.kind == 'q':
+            return [ int(action) for action in np.argmax(np_capacities.value_f(self.weights, inputs), 1) ]
+
+        probs = np_capacities.policy(self.weights, inputs)
+        if self.greedy:
+            return [ int(action) for action in np.argmax(probs, 1) ]
+        return [ np_capacities.sample(action_probs, self.random_state) for action_probs in probs ]
+
+    def play(self, env, render=False):
+        obs = env.reset()
+        score = 0
+        done = False
+        while not done:
+            if render:
+                env.render()
+            obs, reward, done, info = env.step(self.act(obs))
+            score += reward
+
+        return score
+
+
+if __name__ == '__main__':
+    import gym
+
+    parser = argparse.ArgumentParser(description='Play an exported agent without TensorFlow')
+    parser.add_argument('path', help='.npz file written by main.py --export')
+    parser.add_argument('--play_nb', type=int, default=10, help='Number of games to play')
+    parser.add_argument('--render', action='store_true', help='Render the games')
+    parser.add_argument('--sample', action='store_true', help='Sample the actions of the policy agents instead of taking the most probable one')
+    args = parser.parse_args()
+
+    agent = NumpyAgent(args.path, greedy=not args.sample)
+    env = gym.make(agent.env_name)
+    scores = [ agent.play(env, args.render) for i in range(args.play_nb) ]
+    print('{} on {}: mean score {} over {} games'.format(agent.agent_name, agent.env_name, np.mean(scores), len(scores)))
@@ -79,6 +79,9 @@ def Acrobot1phi(obs, done=False):
         + 2**4 * phi[8] + 2**5 * phi[9]
     )
 
+# Environments having a feature mapping function for the tabular agents
+supported_envs = ['CartPole-v0', 'CartPole-v1', 'MountainCar-v0', 'Acrobot-v1']
+
 def getPhiConfig(env_name, debug=False):
     if env_name == 'CartPole-v0' or env_name == 'CartPole-v1':
         if debug:
@@ -0,0 +1,61 @@
+import threading, queue
+
+class Prefetcher(object):
+    """
+    Samples the next minibatches in a background thread while the current update runs.
+    sample is called holding the lock, which must also be held to write in the sampled
+    memory, prepare (e.g. building the feed_dict) is called without it.
+    The batches can miss the transitions appended while they were waiting in the queue.
+    close stops the thread, the next get starts a new one with an empty queue.
+    """
+    def __init__(self, sample, prepare=None, depth=2):
+        self.sample = sample
+        self.prepare = prepare
+        self.lock = threading.Lock()
+        self.depth = depth
+        self.queue = queue.Queue(depth)
+        self.stop_event = threading.Event()
+        self.thread = None
+
+    def start(self):
+        self.stop_event.clear()
+        self.queue = queue.Queue(self.depth)
+        self.thread = threading.Thread(target=self.run, name='prefetcher')
+        self.thread.daemon = True
+        self.thread.start()
+
+    def run(self):
+        while not self.stop_event.is_set():
+            try:
+                with self.lock:
+                    batch = self.sample()
+                if self.prepare is not None:
+                    batch = self.prepare(batch)
+            except Exception as e:
+                batch = e
+            # The queue is full most of the time, the stop event is checked while waiting
+            while not self.stop_event.is_set():
+                try:
+                    self.queue.put(batch, timeout=.1)
+                    break
+                except queue.Full:
+                    pass
+
+    def close(self):
+        if self.thread is None:
+            return
+
+        self.stop_event.set()
+        self.thread.join()
+        self.thread = None
+
+    def get(self):
+        # The thread is started by the first request, once the memory can be sampled
+        if self.thread is None:
+            self.start()
+
+        batch = self.queue.get()
+        if isinstance(batch, Exception):
+            raise Exception('Prefetching a minibatch failed: {}'.format(batch))
+
+        return batch
@@ -0,0 +1,115 @@
+import collections, time
+
+def get_fetch_list(fetches):
+    return list(fetches) if isinstance(fetches, (list, tuple)) else [fetches]
+
+class Profiler(object):
+    """
+    Accumulates the time spent in each phase of the training. Phases can be nested,
+    the time of a phase excludes the one of its sub-phases so that the phases add up
+    to the training time. The time left is reported as 'other'.
+    """
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.seconds = collections.defaultdict(float)
+        self.calls = collections.defaultdict(int)
+        self.sess_runs = collections.defaultdict(int)
+        # Learning updates reported by the agent, whatever the number of session runs they take
+        self.nb_updates = 0
+        # Running phases: [name, start time, time spent in sub-phases]
+        self.stack = []
+        self.start_time = time.perf_counter()
+
+    def start(self, name):
+        self.stack.append([name, time.perf_counter(), 0.])
+
+    def stop(self):
+        name, start_time, children_seconds = self.stack.pop()
+        elapsed = time.perf_counter() - start_time
+        self.seconds[name] += elapsed - children_seconds
+        self.calls[name] += 1
+        if len(self.stack) > 0:
+            self.stack[-1][2] += elapsed
+
+    def count_update(self):
+        self.nb_updates += 1
+
+    def phase(self, name):
+        return Phase(self, name)
+
+    def wrap(self, name, fn):
+        def wrapped(*args, **kwargs):
+            self.start(name)
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                self.stop()
+
+        return wrapped
+
+    def wrap_run(self, run, fetch_phases=[], default_phase='train'):
+        # Session runs are counted in their enclosing phase (e.g. act or save). The ones made outside
+        # of any phase are timed in the phase given to one of their fetches by fetch_phases, a list
+        # of (fetches, phase) (e.g. the summaries), the others are the learning updates
+        phases = {}
+        for fetches, name in fetch_phases:
+            for fetch in get_fetch_list(fetches):
+                phases[fetch] = name
+
+        def wrapped(*args, **kwargs):
+            if len(self.stack) > 0:
+                self.sess_runs[self.stack[-1][0]] += 1
+                return run(*args, **kwargs)
+
+            fetches = args[0] if len(args) > 0 else kwargs.get('fetches')
+            phase = next(( phases[fetch] for fetch in get_fetch_list(fetches) if fetch in phases ), default_phase)
+            self.sess_runs[phase] += 1
+            self.start(phase)
+            try:
+                return run(*args, **kwargs)
+            finally:
+                self.stop()
+
+        return wrapped
+
+    def report(self, nb_episodes, nb_steps):
+        seconds = time.perf_counter() - self.start_time
+        phases = {
+            name: {
+                'seconds': self.seconds[name]
+                , 'calls': self.calls[name]
+                , 'sess_runs': self.sess_runs[name]
+            } for name in self.seconds
+        }
+        phases['other'] = {
+            'seconds': max(0., seconds - sum(self.seconds.values()))
+            , 'calls': 0
+            , 'sess_runs': 0
+        }
+
+        return {
+            'seconds': seconds
+            , 'episodes': nb_episodes
+            , 'steps': nb_steps
+            , 'episodes_per_sec': nb_episodes / seconds if seconds > 0 else 0.
+            , 'steps_per_sec': nb_steps / seconds if seconds > 0 else 0.
+            , 'updates': self.nb_updates
+            , 'updates_per_sec': self.nb_updates / seconds if seconds > 0 else 0.
+            , 'sess_runs': sum(self.sess_runs.values())
+            , 'phases': phases
+        }
+
+class Phase(object):
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.profiler.start(self.name)
+        return self
+
+    def __exit__(self, *args):
+        self.profiler.stop()
+        return False
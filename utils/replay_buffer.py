@@ -1,3 +1,4 @@
+import collections
 import tensorflow as tf
 
 # Inspired by http://web.stanford.edu/class/cs20si/lectures/slides_14.pdf
@@ -7,10 +8,11 @@ class ReplayBuffer:
     def __init__(self, templates, capacity):
         self.capacity = capacity
         self.buffers = self._create_buffers(templates)
-        self.index = tf.Variable(0, dtype=tf.int32, trainable=False)
+        self.index = tf.Variable(0, dtype=tf.int32, trainable=False, name='index')
 
     def _create_buffers(self, templates):
-        buffers = {}
+        # Ordered as the templates, append zips the buffers with the given tensors
+        buffers = collections.OrderedDict()
         for name, dtype, shape in templates:
             final_shape = tf.TensorShape([self.capacity]).concatenate(shape)
             buf = tf.Variable(
@@ -23,10 +25,11 @@ class ReplayBuffer:
         return buffers
 
     def reset(self):
-        return [b.assign([0] * self.capacity) for key,b in self.buffers.items()] + [self.index.assign(0)]
+        return [b.assign(tf.zeros_like(b)) for key,b in self.buffers.items()] + [self.index.assign(0)]
 
     def size(self):
-        return tf.minimum(self.index, self.capacity)
+        # The index is read when the op is created, under the control dependencies of the caller
+        return tf.minimum(self.index.read_value(), self.capacity)
 
     def append(self, tensors):
         position = tf.mod(self.index, self.capacity)
@@ -37,8 +40,9 @@ class ReplayBuffer:
         return inc_index_op
 
     def sample(self, nb_samples):
-        positions = tf.random_uniform( (nb_samples,), 0, self.size() - 1, tf.int32 )
-        samples = [tf.gather(b, positions) for key,b in self.buffers.items()]
+        # maxval is excluded, every stored element can be drawn
+        positions = tf.random_uniform( (nb_samples,), 0, self.size(), tf.int32 )
+        samples = [tf.gather(b.read_value(), positions) for key,b in self.buffers.items()]
 
         return samples
 
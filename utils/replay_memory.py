@@ -0,0 +1,182 @@
+import os, json
+import numpy as np
+
+def get_index_dtype(nb_values):
+    # Smallest unsigned integer dtype holding the values 0..nb_values - 1
+    for dtype in [np.uint8, np.uint16, np.uint32]:
+        if nb_values - 1 <= np.iinfo(dtype).max:
+            return np.dtype(dtype)
+
+    return np.dtype(np.uint64)
+
+class ReplayMemory(object):
+    """
+    Ring buffer of transitions stored column by column, one array per field of a
+    structured dtype. Once the capacity is reached, the oldest transitions are overwritten.
+    With a path, the columns are np.memmap files (.npy) and the memory can be reopened
+    after a restart: its capacity is then only bounded by the disk.
+    """
+    def __init__(self, dtype, capacity, path=None):
+        self.dtype = np.dtype(dtype)
+        self.capacity = capacity
+        self.path = path
+        # Number of transitions appended since the creation of the memory
+        self.index = 0
+        # Values of the owner of the memory, saved along with the index
+        self.meta = {}
+
+        if path is None:
+            self.columns = { name: np.zeros((capacity,) + self.dtype[name].shape, self.dtype[name].base) for name in self.dtype.names }
+        else:
+            self.columns = self.open_columns(path)
+
+    def open_columns(self, path):
+        if not os.path.exists(path):
+            os.makedirs(path)
+
+        state = None
+        if os.path.isfile(path + '/state.json'):
+            with open(path + '/state.json', 'r') as f:
+                state = json.load(f)
+            if state['capacity'] != self.capacity or state['dtype'] != str(self.dtype.descr):
+                raise Exception('The replay memory in {} has a capacity {} and dtype {}, {} and {} were expected'.format(
+                    path, state['capacity'], state['dtype'], self.capacity, str(self.dtype.descr)
+                ))
+            self.index = state['index']
+            self.meta = state.get('meta', {})
+
+        columns = {}
+        for name in self.dtype.names:
+            filename = path + '/' + name + '.npy'
+            shape = (self.capacity,) + self.dtype[name].shape
+            if state is not None and os.path.isfile(filename):
+                columns[name] = np.lib.format.open_memmap(filename, mode='r+')
+            else:
+                columns[name] = np.lib.format.open_memmap(filename, mode='w+', dtype=self.dtype[name].base, shape=shape)
+
+        return columns
+
+    def size(self):
+        return min(self.index, self.capacity)
+
+    def append(self, values):
+        # values are given in the order of the dtype fields
+        position = self.index % self.capacity
+        for name, value in zip(self.dtype.names, values):
+            self.columns[name][position] = value
+        self.index += 1
+
+    def sample(self, batch_size, random_state=np.random):
+        # Sorted positions gather each column in one forward pass over its pages,
+        # the order of the transitions in a minibatch does not matter to the loss
+        positions = np.sort(random_state.randint(self.size(), size=batch_size))
+
+        return { name: column[positions] for name, column in self.columns.items() }
+
+    def flush(self):
+        # Makes the memory reopenable in its current state
+        if self.path is None:
+            return
+
+        for column in self.columns.values():
+            column.flush()
+        tmp_path = self.path + '/state.json.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump({ 'index': self.index, 'capacity': self.capacity, 'dtype': str(self.dtype.descr), 'meta': self.meta }, f)
+        os.replace(tmp_path, self.path + '/state.json')
+
+class FrameReplayMemory(object):
+    """
+    Replay memory of the transitions of consecutive steps, storing each observation once.
+    The transition of the slot k goes from the observation k to the observation k + 1,
+    the last observation of an episode takes its own slot which starts no transition.
+    The done and valid flags are packed in bits.
+    """
+    def __init__(self, obs_shape, capacity, path=None, obs_dtype='float32', action_dtype='int32'):
+        # A transition takes the slot of its observation and the one of its next observation
+        if capacity < 2:
+            raise Exception('The capacity of a FrameReplayMemory must be at least 2, got {}'.format(capacity))
+
+        self.capacity = capacity
+        self.frames = ReplayMemory(np.dtype([
+            ('observations', obs_dtype, tuple(obs_shape))
+            , ('actions', action_dtype)
+            , ('rewards', 'float32')
+        ]), capacity, path)
+        # Whether the last next observation waits for the transition starting from it
+        self.continuing = self.frames.meta.get('continuing', False)
+        self.flags = ReplayMemory(np.dtype([
+            ('valid', 'uint8')
+            , ('dones', 'uint8')
+        ]), (capacity + 7) // 8, path + '/flags' if path is not None else None)
+        # Number of stored transitions, kept up to date by append
+        self.nb_valid = int(np.unpackbits(np.asarray(self.flags.columns['valid']))[:self.capacity].sum())
+
+    def get_bits(self, name, positions):
+        return (self.flags.columns[name][positions >> 3] >> (7 - (positions & 7))) & 1
+
+    def set_bit(self, name, position, value):
+        mask = 128 >> (position & 7)
+        if value:
+            self.flags.columns[name][position >> 3] |= mask
+        else:
+            self.flags.columns[name][position >> 3] &= ~mask & 255
+
+    def size(self):
+        # Number of stored transitions
+        return self.nb_valid
+
+    def append(self, obs, action, reward, next_obs, done):
+        # frames.index is the slot where the next transition starts
+        position = self.frames.index % self.capacity
+        next_position = (self.frames.index + 1) % self.capacity
+        columns = self.frames.columns
+
+        columns['observations'][position] = obs
+        columns['actions'][position] = action
+        columns['rewards'][position] = reward
+        self.nb_valid += 1 - int(self.get_bits('valid', position))
+        self.set_bit('valid', position, True)
+        self.set_bit('dones', position, done)
+        # The next observation starts the next transition, or is kept alone after the end of an episode.
+        # The oldest transition it overwrites is lost
+        columns['observations'][next_position] = next_obs
+        self.nb_valid -= int(self.get_bits('valid', next_position))
+        self.set_bit('valid', next_position, False)
+
+        self.frames.index += 2 if done else 1
+        self.continuing = not done
+
+    def cut(self):
+        # The next transition does not start from the last next observation (e.g. it comes
+        # from another environment), this observation is kept in its own slot
+        if self.continuing:
+            self.frames.index += 1
+            self.continuing = False
+
+    def sample(self, batch_size, random_state=np.random):
+        if self.nb_valid == 0:
+            raise Exception('Can not sample an empty replay memory')
+
+        # Slots holding no transition are rejected and drawn again, at least one slot is valid
+        nb_slots = min(self.frames.index + 1, self.capacity)
+        positions = np.zeros(0, dtype=np.int64)
+        while len(positions) < batch_size:
+            candidates = random_state.randint(nb_slots, size=batch_size)
+            positions = np.concatenate([ positions, candidates[self.get_bits('valid', candidates) == 1] ])
+        positions = np.sort(positions[:batch_size])
+        next_positions = (positions + 1) % self.capacity
+
+        observations = self.frames.columns['observations']
+        return {
+            'observations': observations[positions]
+            , 'actions': self.frames.columns['actions'][positions]
+            , 'rewards': self.frames.columns['rewards'][positions]
+            , 'next_observations': observations[next_positions]
+            , 'dones': self.get_bits('dones', positions)
+        }
+
+    def flush(self):
+        self.frames.meta['continuing'] = self.continuing
+        self.frames.flush()
+        self.flags.flush()
@@ -0,0 +1,73 @@
+import collections
+
+# A stop condition is fed the score of each finished episode through update(score)
+# and returns True when the training should stop, its name is recorded as the stop reason.
+
+class MovingAverage(object):
+    def __init__(self, window=100):
+        self.window = window
+        self.scores = collections.deque()
+        self.total = 0.
+
+    def update(self, score):
+        self.scores.append(score)
+        self.total += score
+        if len(self.scores) > self.window:
+            self.total -= self.scores.popleft()
+
+        return self.total / len(self.scores)
+
+    def full(self):
+        return len(self.scores) == self.window
+
+class ScoreThreshold(object):
+    """
+    Stops once the mean score over the last window episodes reaches the threshold
+    (CartPole-v0 is solved with 195 over 100 episodes).
+    """
+    name = 'solved'
+
+    def __init__(self, threshold, window=100):
+        self.threshold = threshold
+        self.average = MovingAverage(window)
+
+    def update(self, score):
+        mean_score = self.average.update(score)
+
+        return self.average.full() and mean_score >= self.threshold
+
+class Plateau(object):
+    """
+    Stops when the mean score over the last window episodes did not improve by
+    more than min_delta for patience episodes.
+    """
+    name = 'plateau'
+
+    def __init__(self, patience, window=100, min_delta=0.):
+        self.patience = patience
+        self.min_delta = min_delta
+        self.average = MovingAverage(window)
+        self.best_score = None
+        self.nb_waiting = 0
+
+    def update(self, score):
+        mean_score = self.average.update(score)
+        if not self.average.full():
+            return False
+
+        if self.best_score is None or mean_score > self.best_score + self.min_delta:
+            self.best_score = mean_score
+            self.nb_waiting = 0
+        else:
+            self.nb_waiting += 1
+
+        return self.nb_waiting >= self.patience
+
+def get_stop_conditions(config):
+    conditions = []
+    if config.get('stop_score') is not None:
+        conditions.append(ScoreThreshold(config['stop_score'], config.get('stop_window', 100)))
+    if config.get('stop_patience', 0) > 0:
+        conditions.append(Plateau(config['stop_patience'], config.get('stop_window', 100), config.get('stop_min_delta', 0.)))
+
+    return conditions
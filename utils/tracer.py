@@ -0,0 +1,78 @@
+import os, cProfile, pstats
+import tensorflow as tf
+from tensorflow.core.framework import step_stats_pb2
+from tensorflow.python.client import timeline
+
+def parse_episodes(episodes):
+    # '3,10-12' -> {3, 10, 11, 12}
+    episode_ids = set()
+    for part in episodes.split(','):
+        part = part.strip()
+        if part == '':
+            continue
+        if '-' in part:
+            first, last = part.split('-')
+            episode_ids.update(range(int(first), int(last) + 1))
+        else:
+            episode_ids.add(int(part))
+
+    return episode_ids
+
+class EpisodeTracer(object):
+    """
+    Traces every sess.run of an episode with FULL_TRACE run options while recording
+    a cProfile of the Python loop. For each traced episode, the merged timeline is written
+    in the Chrome trace format (open it in chrome://tracing) next to the cProfile stats.
+    """
+    def __init__(self, sess, trace_dir):
+        self.sess = sess
+        self.trace_dir = trace_dir
+        self.run = None
+        self.step_stats = None
+        self.devices = None
+        self.profile = None
+
+    def start(self):
+        self.step_stats = step_stats_pb2.StepStats()
+        self.devices = {}
+        self.run = self.sess.run
+        self.sess.run = self.traced_run
+
+        self.profile = cProfile.Profile()
+        self.profile.enable()
+
+    def traced_run(self, fetches, feed_dict=None, options=None, run_metadata=None):
+        if options is None:
+            options = tf.RunOptions()
+        options.trace_level = tf.RunOptions.FULL_TRACE
+        if run_metadata is None:
+            run_metadata = tf.RunMetadata()
+
+        result = self.run(fetches, feed_dict=feed_dict, options=options, run_metadata=run_metadata)
+        self.merge(run_metadata.step_stats)
+
+        return result
+
+    def merge(self, step_stats):
+        # The node stats have absolute timestamps, the runs of an episode can be merged by device
+        for dev_stats in step_stats.dev_stats:
+            if dev_stats.device not in self.devices:
+                self.devices[dev_stats.device] = self.step_stats.dev_stats.add(device=dev_stats.device)
+            self.devices[dev_stats.device].node_stats.extend(dev_stats.node_stats)
+
+    def stop(self, episode_id):
+        self.profile.disable()
+        self.sess.run = self.run
+
+        if not os.path.exists(self.trace_dir):
+            os.makedirs(self.trace_dir)
+        prefix = self.trace_dir + '/episode-' + str(episode_id).zfill(5)
+
+        with open(prefix + '.timeline.json', 'w') as f:
+            f.write(timeline.Timeline(self.step_stats).generate_chrome_trace_format())
+        self.profile.dump_stats(prefix + '.prof')
+        with open(prefix + '.pstats.txt', 'w') as f:
+            pstats.Stats(self.profile, stream=f).sort_stats('cumulative').print_stats(50)
+
+        self.profile = None
+        self.step_stats = None